@@ -10,10 +10,12 @@ import csv
 import datetime as dt
 import operator
 import os
+import re
 import shutil
 import stat
 import subprocess
 import tempfile
+import time
 from collections import OrderedDict
 from pathlib import Path
 from typing import Union
@@ -21,18 +23,19 @@ from typing import Union
 import numpy as np
 import xarray as xr
 
-import ravenpy
-
+from .profiling import NULL_PHASE, Profiler
+from .progress import Checkpoint, OstModelReader, terminate
+from .result_cache import default_cache, simulation_key
 from .rv import (
     RV,
     RVI,
     Ost,
     RavenNcData,
     RVFile,
-    get_states,
     isinstance_namedtuple,
-    parse_solution,
 )
+from .solution import read_solution
+from .state import BasinStateArray, HRUStateArray
 
 RAVEN_EXEC_PATH = os.getenv("RAVENPY_RAVEN_BINARY_PATH") or shutil.which("raven")
 OSTRICH_EXEC_PATH = os.getenv("RAVENPY_OSTRICH_BINARY_PATH") or shutil.which("ostrich")
@@ -54,6 +57,9 @@ class Raven:
     # Allowed configuration file extensions
     _rvext = ("rvi", "rvp", "rvc", "rvh", "rvt")
 
+    # Whether simulation outputs can be stored in and restored from the result cache.
+    _cacheable = True
+
     # Dictionary of potential variable names, keyed by CF standard name.
     # http://cfconventions.org/Data/cf-standard-names/60/build/cf-standard-name-table.html
     # PET is the potential evapotranspiration, while evspsbl is the actual evap.
@@ -123,6 +129,7 @@ class Raven:
         self.raven_simg = None  # ravenpy.raven_simg
         self._name = None
         self._defaults = {}
+        self._routes = None
         self.rvfiles = {}
 
         # Configuration file extensions + rvd for derived parameters.
@@ -143,6 +150,26 @@ class Raven:
         self._psim = 0
         self._pdim = None  # Parallel dimension (either initparam, params or region)
 
+        # Opt-in instrumentation of the run phases, see `enable_profiling`.
+        self.profiler = None
+
+        # Launches the simulations, limiting the number of concurrent processes if `max_workers` is set.
+        self.launcher = ProcessLauncher()
+
+        # Cache of simulation outputs, see `ravenpy.models.result_cache`. If None, the cache set by the
+        # `RAVENPY_RESULT_CACHE` environment variable is used, if any. If False, simulations are always run.
+        self.result_cache = None
+        self._cache_misses = []
+
+    @property
+    def max_workers(self):
+        """Maximum number of simulations running at the same time, or None for no limit."""
+        return self.launcher.max_workers
+
+    @max_workers.setter
+    def max_workers(self, value):
+        self.launcher.max_workers = value
+
     @property
     def output_path(self):
         return self.model_path / self.output_dir
@@ -230,16 +257,71 @@ class Raven:
     @property
     def parameters(self):
         """Dictionary storing all parameters."""
-        params = {}
-        for key, val in self.configuration.items():
-            params.update(val)
-        return params
+        return {key: getattr(objs[-1], key) for key, objs in self.routes.items()}
+
+    @property
+    def routes(self):
+        """Dictionary mapping each configuration key to the RV objects defining it, in `_rvext` order.
+
+        The table is rebuilt only when RV objects are replaced, or when keys are added to or removed from them.
+        """
+        objs = tuple(getattr(self, ext) for ext in self._rvext)
+        versions = tuple(obj.keys_version() for obj in objs)
+
+        if (
+            self._routes is None
+            or len(self._routes[0]) != len(objs)
+            or any(a is not b for (a, b) in zip(self._routes[0], objs))
+            or self._routes[1] != versions
+        ):
+            routes = {}
+            for obj in objs:
+                for key in obj.keys():
+                    routes.setdefault(key, []).append(obj)
+            self._routes = (objs, versions, routes)
+
+        return self._routes[2]
 
     @property
     def rvobjs(self):
         """Generator for (ext, rv object)."""
         return {ext: getattr(self, ext) for ext in self._rvext}
 
+    def enable_profiling(self, callback=None, tracer=None):
+        """Record the resources used by each phase of the following model runs.
+
+        Parameters
+        ----------
+        callback : callable, optional
+          Function called with each `PhaseTiming` as soon as a phase ends.
+        tracer : optional
+          OpenTelemetry-style tracer used to emit one span per phase.
+
+        Returns
+        -------
+        Profiler
+          The profiler storing the timings, also accessible through `timings`.
+        """
+        self.profiler = Profiler(callback=callback, tracer=tracer)
+        return self.profiler
+
+    def disable_profiling(self):
+        """Stop recording phase timings."""
+        self.profiler = None
+
+    @property
+    def timings(self):
+        """List of `PhaseTiming` recorded during the last call to the model, empty if profiling is disabled."""
+        if self.profiler is None:
+            return []
+        return self.profiler.timings
+
+    def _phase(self, name, run=None, **attributes):
+        """Return a context manager measuring a phase of the model run if profiling is enabled."""
+        if self.profiler is None:
+            return NULL_PHASE
+        return self.profiler.phase(name, model=self.identifier, run=run, **attributes)
+
     def configure(self, fns):
         """Read configuration files."""
         for fn in fns:
@@ -262,35 +344,46 @@ class Raven:
     def assign(self, key, value):
         """Assign parameter to rv object that has a key with the same name."""
 
-        assigned = False
-        for ext, obj in self.rvobjs.items():
-            if hasattr(obj, key):
-                att = getattr(obj, key)
-
-                # If att is a namedtuple, we get its class and try to instantiate it with the values passed.
-                if isinstance_namedtuple(att) and isinstance(
-                    value, (list, tuple, np.ndarray)
-                ):
-                    p = att.__class__(*value)
-                    setattr(obj, key, p)
-                # If att is a RavenNcData, we expect a dict
-                elif isinstance(att, RavenNcData):
-                    att.update(value)
-                else:
-                    setattr(obj, key, value)
-                assigned = True
+        # Attributes that are not keys (e.g. private attributes) are only searched if no object has the key.
+        objs = self.routes.get(key) or [
+            obj for obj in self.rvobjs.values() if hasattr(obj, key)
+        ]
 
-        if not assigned:
+        if not objs:
             raise AttributeError("No configuration key named {}".format(key))
 
+        for obj in objs:
+            att = getattr(obj, key)
+
+            # If att is a namedtuple, we get its class and try to instantiate it with the values passed.
+            if isinstance_namedtuple(att) and isinstance(
+                value, (list, tuple, np.ndarray)
+            ):
+                p = att.__class__(*value)
+                setattr(obj, key, p)
+            # If att is a RavenNcData, we expect a dict
+            elif isinstance(att, RavenNcData):
+                att.update(value)
+            else:
+                setattr(obj, key, value)
+
     def derived_parameters(self):
         """Subclassed by emulators. Defines model parameters that are a function of other parameters."""
         return
 
+    def _template_parameters(self, fields):
+        """Return the parameters filling the given template fields.
+
+        Values are the same as in `parameters`, but only the requested ones are evaluated.
+        """
+        routes = self.routes
+        return {key: getattr(routes[key][-1], key) for key in fields if key in routes}
+
     def _dump_rv(self):
         """Write configuration files to disk."""
 
-        params = self.parameters
+        fields = set().union(*(rvf.template.fields for rvf in self.rvfiles.values()))
+        params = self._template_parameters(fields)
 
         for rvf in self.rvfiles.values():
             p = self.exec_path if rvf.is_tpl else self.model_path
@@ -336,19 +429,22 @@ class Raven:
           Run index.
         """
         # Create configuration information from input files
-        ncvars = self._assign_files(ts)
+        with self._phase("_assign_files", self.psim):
+            ncvars = self._assign_files(ts)
         self.rvt.update(ncvars)
         self.check_units()
         self.check_inputs()
 
         # Compute derived parameters
-        self.derived_parameters()
+        with self._phase("derived_parameters", self.psim):
+            self.derived_parameters()
 
         # Write configuration files in model directory
         if not self.model_path.exists():
             os.makedirs(self.model_path)
             os.makedirs(self.output_path)
-        self._dump_rv()
+        with self._phase("_dump_rv", self.psim):
+            self._dump_rv()
 
         # Create symbolic link to input files
         for fn in ts:
@@ -393,6 +489,9 @@ class Raven:
         if isinstance(ts, (str, Path)):
             ts = [ts]
 
+        # Configuration files written by this run.
+        self._rvs = []
+
         # Case for potentially parallel parameters
         pdict = {}
         for p in self._parallel_parameters:
@@ -400,6 +499,9 @@ class Raven:
 
             if a is not None and p in ["params"]:
                 pdict[p] = np.atleast_2d(a)
+            elif isinstance(a, (HRUStateArray, BasinStateArray)):
+                # One simulation per member.
+                pdict[p] = a.members()
             else:
                 pdict[p] = np.atleast_1d(a)
 
@@ -418,6 +520,8 @@ class Raven:
                 "basin_state": "state",
                 "nc_index": "nbasins",
             }[longer]
+        else:
+            self._pdim = None
 
         for key, val in pdict.items():
             if len(val) not in [1, nloops]:
@@ -452,6 +556,9 @@ class Raven:
             self.handle_date_defaults(ts)
             self.set_calendar(ts)
 
+        cache = self._get_result_cache()
+        self._cache_misses = []
+
         # Loop over parallel parameters - sets self.rvi.run_index
         procs = []
         for self.psim in range(nloops):
@@ -459,24 +566,44 @@ class Raven:
                 if val[self.psim] is not None:
                     self.assign(key, val[self.psim])
 
+            nrvs = len(self._rvs)
             cmd = self.setup_model_run(tuple(map(Path, ts)))
-            procs.append(
-                subprocess.Popen(cmd, cwd=self.cmd_path, stdout=subprocess.PIPE)
-            )
+
+            # Simulations found in the result cache get their outputs restored instead of being run.
+            if cache:
+                with self._phase("result_cache", self.psim):
+                    key = simulation_key(self._rvs[nrvs:], ts, self.raven_exec)
+                    if cache.get(key, self.output_path):
+                        continue
+                self._cache_misses.append((cache, key, self.output_path))
+
+            # The subprocess phase runs from the first launch until all simulations are completed.
+            if self.profiler is not None:
+                self.profiler.open("subprocess", model=self.identifier)
+
+            procs.append(self.launcher.popen(cmd, cwd=self.cmd_path))
 
         return procs
 
     def __call__(self, ts, overwrite=False, **kwds):
+        if self.profiler is not None:
+            self.profiler.reset()
+
         self.setup(overwrite)
         procs = self.run(ts, overwrite, **kwds)
+        self._wait(procs)
+        self._store_results()
+
+        if self.profiler is not None:
+            self.profiler.close(
+                "subprocess",
+                written_bytes=self._output_size(),
+                nprocs=len(procs),
+            )
 
-        for proc in procs:
-            proc.wait()
-            # Julie: For debugging
-            # for line in iter(proc.stdout.readline, b''):
-            #    print(line)
         try:
-            self.parse_results()
+            with self._phase("parse_results"):
+                self.parse_results()
             err = self.parse_errors()
             if "ERROR" in err:
                 raise UserWarning("Simulation error")
@@ -494,6 +621,28 @@ class Raven:
             print(msg)
             raise e
 
+    def _get_result_cache(self):
+        """Return the result cache used by the model, or None."""
+        if not self._cacheable or self.result_cache is False:
+            return None
+        return self.result_cache or default_cache()
+
+    def _store_results(self):
+        """Store the outputs of the simulations missing from the result cache, unless they failed."""
+        for cache, key, path in self._cache_misses:
+            errors = path / "Raven_errors.txt"
+            if errors.exists() and "ERROR" not in errors.read_text():
+                cache.put(key, path)
+        self._cache_misses = []
+
+    def _wait(self, procs):
+        """Wait for the simulations to complete."""
+        for proc in procs:
+            proc.wait()
+            # Julie: For debugging
+            # for line in iter(proc.stdout.readline, b''):
+            #    print(line)
+
     def resume(self, solution=None):
         """Set the initial state to the state at the end of the last run.
 
@@ -507,7 +656,7 @@ class Raven:
         else:
             fn = solution
 
-        self.rvc.parse(Path(fn).read_text())
+        self.rvc.hru_states, self.rvc.basin_states = read_solution(fn).get_states()
 
     def parse_results(self, path=None, run_name=None):
         """Store output files in the self.outputs dictionary."""
@@ -532,16 +681,17 @@ class Raven:
                 else:
                     continue
 
-            fns.sort()
+            # Sort numerically so that outputs follow the order of the parallel simulations (p2 before p10).
+            fns.sort(key=natural_sort_key)
             self.ind_outputs[key] = fns
-            self.outputs[key] = self._merge_output(fns, pattern[1:])
+            with self._phase("_merge_output", output=key, nfiles=len(fns)):
+                self.outputs[key] = self._merge_output(fns, pattern[1:])
 
-        self.outputs["rv_config"] = self._merge_output(self.rvs, "rv.zip")
+        with self._phase("_merge_output", output="rv_config", nfiles=len(self.rvs)):
+            self.outputs["rv_config"] = self._merge_output(self.rvs, "rv.zip")
 
     def _merge_output(self, files, name):
         """Merge multiple output files into one if possible, otherwise return a list of files."""
-        import zipfile
-
         # If there is only one file, return its name directly.
         if len(files) == 1:
             return files[0]
@@ -549,9 +699,7 @@ class Raven:
         # Otherwise try to create a new file aggregating all files.
         outfn = self.final_path / name
 
-        if name.endswith(".nc") and not isinstance(
-            self, ravenpy.models.RavenMultiModel
-        ):
+        if name.endswith(".nc"):
             ds = [xr.open_dataset(fn) for fn in files]
             try:
                 # We aggregate along the pdim dimensions.
@@ -561,8 +709,13 @@ class Raven:
             except (ValueError, KeyError):
                 pass
 
-        # Let's zip the files that could not be merged.
-        outfn = outfn.with_suffix(".zip")
+        return self._zip_output(files, name)
+
+    def _zip_output(self, files, name):
+        """Zip files that could not be merged."""
+        import zipfile
+
+        outfn = (self.final_path / name).with_suffix(".zip")
 
         # Find the lower file parts level at which there are differences among files.
         i = get_diff_level(files)
@@ -575,6 +728,15 @@ class Raven:
 
         return outfn
 
+    def _output_size(self):
+        """Return the total size of the files written in the output directories."""
+        return sum(
+            f.stat().st_size
+            for f in self.exec_path.rglob("*")
+            if self.output_dir in f.relative_to(self.exec_path).parts[:-1]
+            and f.is_file()
+        )
+
     def parse_errors(self):
         files = self._get_output("Raven_errors.txt", self.exec_path)
         out = ""
@@ -717,12 +879,17 @@ class Raven:
 
     @property
     def solution(self):
+        solution = self._read_solution()
+        if isinstance(solution, list):
+            return [s.to_dict() for s in solution]
+        return solution.to_dict()
+
+    def _read_solution(self):
+        """Return the parsed solution files. Parsed files are cached until they are modified."""
         if self.outputs["solution"].suffix == ".rvc":
-            return parse_solution(self.outputs["solution"].read_text())
+            return read_solution(self.outputs["solution"])
         elif self.outputs["solution"].suffix == ".zip":
-            return [
-                parse_solution(fn.read_text()) for fn in self.ind_outputs["solution"]
-            ]
+            return [read_solution(fn) for fn in self.ind_outputs["solution"]]
 
     def get_final_state(self, hru_index=1, basin_index=1):
         """Return model state at the end of simulation.
@@ -734,11 +901,26 @@ class Raven:
         basin_index : None, int
           Set index value or None to get all basin states.
         """
-        solution = self.solution
-        if isinstance(solution, dict):
-            return get_states(solution, hru_index, basin_index)
+        solution = self._read_solution()
+        if isinstance(solution, list):
+            return zip(*[s.get_states(hru_index, basin_index) for s in solution])
         else:
-            return zip(*[get_states(s, hru_index, basin_index) for s in solution])
+            return solution.get_states(hru_index, basin_index)
+
+    def get_final_state_arrays(self):
+        """Return the model states at the end of the simulations as arrays, with one member per simulation.
+
+        Returns
+        -------
+        HRUStateArray, BasinStateArray
+          HRU and basin states.
+        """
+        solution = self._read_solution()
+        solutions = solution if isinstance(solution, list) else [solution]
+        return (
+            HRUStateArray.from_solutions(solutions),
+            BasinStateArray.from_solutions(solutions),
+        )
 
     @property
     def diagnostics(self):
@@ -824,8 +1006,77 @@ class Ostrich(Raven):
 
     identifier = "generic-ostrich"
     _rvext = ("rvi", "rvp", "rvc", "rvh", "rvt", "txt")
+    _cacheable = False  # Calibrations depend on the Ostrich run, not only on the Raven configuration.
     txt = RV()
 
+    def __init__(self, *args, **kwds):
+        super().__init__(*args, **kwds)
+        self.progress = None  # Callback, stopping criterion and polling interval, see `enable_progress`.
+        # Path to the file storing the evaluations, see `progress.Checkpoint`.
+        self.checkpoint = None
+        self.stopped_early = False
+        self._ostmodel = None
+        self._resumed = 0  # Last evaluation number read from the checkpoint.
+
+    def enable_progress(self, callback=None, stop=None, interval=1.0):
+        """Monitor the evaluations of the following calibrations while Ostrich runs.
+
+        Parameters
+        ----------
+        callback : callable, optional
+          Function called with each `Evaluation` as soon as it is written by Ostrich.
+        stop : callable, optional
+          Function called with the `history` of evaluations after each new evaluation. If it returns True, Ostrich is
+          terminated and the best parameter set found so far is used. See `EarlyStopping`.
+        interval : float
+          Time between reads of the Ostrich output [s].
+        """
+        self.progress = (callback, stop, interval)
+
+    def disable_progress(self):
+        """Stop monitoring calibrations."""
+        self.progress = None
+
+    def _ostmodel_reader(self):
+        """Return the reader of the evaluations performed by Ostrich.
+
+        Once the results are parsed, evaluations are read from the `params_seq` output. While a calibration is
+        running, they are read from `OstModel0.txt` in the execution directory.
+        """
+        path = self.outputs.get("params_seq")
+        if not isinstance(path, Path):
+            path = self.exec_path / "OstModel0.txt"
+        if self._ostmodel is None or self._ostmodel.path != path:
+            self._ostmodel = OstModelReader(path)
+        return self._ostmodel
+
+    def _wait(self, procs):
+        """Wait for Ostrich to complete, following its progress if enabled."""
+        self.stopped_early = False
+        self._ostmodel = None
+
+        # The outputs of a previous calibration are not those of this run.
+        self.outputs.pop("params_seq", None)
+        if self.progress is None and self.checkpoint is None:
+            return Raven._wait(self, procs)
+
+        callback, stop, interval = self.progress or (None, None, 1.0)
+        checkpoint = Checkpoint(self.checkpoint) if self.checkpoint else None
+        reader = self._ostmodel_reader()
+        for proc in procs:
+            for evaluation in reader.follow(proc, interval):
+                # Evaluations read from the checkpoint are already saved. A warm-started Ostrich numbers its new
+                # evaluations after those of the model file it was given, so rows it re-emits from the copied
+                # checkpoint, if any, have an evaluation number no larger than the last saved one.
+                if checkpoint is not None and evaluation.iteration > self._resumed:
+                    checkpoint.append([evaluation], reader.names)
+                if callback is not None:
+                    callback(evaluation)
+                if stop is not None and not self.stopped_early:
+                    if stop(reader.history):
+                        terminate(proc)
+                        self.stopped_early = True
+
     @property
     def model_path(self):
         return self.exec_path / self.model_dir
@@ -880,6 +1131,16 @@ class Ostrich(Raven):
         # Create symbolic link to executable
         os.symlink(self.ostrich_exec, str(self.cmd))
 
+        # Resume from the evaluations saved in the checkpoint, if any.
+        self._resumed = 0
+        if self.checkpoint is not None and Path(self.checkpoint).exists():
+            history = Checkpoint(self.checkpoint).load()[1]
+            if len(history):
+                self._resumed = int(history[:, 0].max())
+                shutil.copyfile(self.checkpoint, self.exec_path / "OstModel0.txt")
+        if isinstance(self.txt, Ost):
+            self.txt.warm_start = self._resumed > 0
+
     def parse_results(self):
         """Store output files in the self.outputs dictionary."""
         # Output files default names. The actual output file names will be composed of the run_name and the default
@@ -891,6 +1152,10 @@ class Ostrich(Raven):
             "calibration": "OstOutput?.txt",
         }
 
+        # Ostrich does not write its output file when it is terminated early.
+        if self.stopped_early:
+            patterns.pop("calibration")
+
         # Store output file names in dict
         for key, pattern in patterns.items():
             fns = self._get_output(pattern, path=self.exec_path)
@@ -956,20 +1221,88 @@ class Ostrich(Raven):
         else:
             return ops.values()
 
+    def raven2ost(self, params):
+        """Return the parameters calibrated by Ostrich for a set of model parameters.
+
+        Notes
+        -----
+        This is the inverse of `ost2raven`, and should be subclassed along with it.
+        """
+        n = len(self.params._fields)
+        pattern = "par_x{}" if n < 8 else "par_x{:02}"
+        names = [pattern.format(i + 1) for i in range(n)]
+        return OrderedDict(zip(names, params))
+
     @property
     def calibrated_params(self):
         """The dictionary of optimal parameters estimated by Ostrich."""
-        ops = self.parse_optimal_parameter_set()
+        if self.stopped_early:
+            from .calibration import ParameterSpace
+
+            ops = ParameterSpace.from_ostrich(self).values(self.optimized_parameters)
+        else:
+            ops = self.parse_optimal_parameter_set()
         return self.ost2raven(ops)
 
+    @property
+    def history(self):
+        """Evaluations performed by Ostrich, one row per evaluation.
+
+        The columns are the evaluation number, the objective function and the calibrated parameters. The content of `OstModel0.txt` is cached, and only lines appended since the last access are parsed.
+        """
+        return self._ostmodel_reader().history
+
+    def _optimal_row(self):
+        # Ostrich ends with the optimal parameter set, unless it was terminated early.
+        history = self.history
+        if self.stopped_early:
+            return history[history[:, 1].argmin()]
+        return history[-1]
+
     @property
     def obj_func(self):
-        return np.loadtxt(self.outputs["params_seq"], skiprows=1)[-1, 1]
+        return self._optimal_row()[1]
 
     @property
     def optimized_parameters(self):
         """These are the raw parameters returned by Ostrich."""
-        return np.loadtxt(self.outputs["params_seq"], skiprows=1)[-1, 2:]
+        return self._optimal_row()[2:]
+
+
+class ProcessLauncher:
+    """Launch simulation processes, limiting the number of processes running at the same time.
+
+    Models sharing a launcher share its limit, e.g. the sub-models of `RavenMultiModel`.
+
+    Parameters
+    ----------
+    max_workers : int, None
+      Maximum number of processes running at the same time, or None for no limit.
+    poll_interval : float
+      Time between checks for completed processes when the limit is reached [s].
+    """
+
+    def __init__(self, max_workers: int = None, poll_interval: float = 0.01):
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self._running = []
+
+    def popen(self, cmd, cwd):
+        """Launch a process once fewer than `max_workers` processes launched by this instance are running."""
+        self._running = [p for p in self._running if p.poll() is None]
+        if self.max_workers is not None:
+            while len(self._running) >= self.max_workers:
+                time.sleep(self.poll_interval)
+                self._running = [p for p in self._running if p.poll() is None]
+
+        proc = subprocess.Popen(cmd, cwd=cwd, stdout=subprocess.PIPE)
+        self._running.append(proc)
+        return proc
+
+
+def natural_sort_key(fn):
+    """Key sorting paths in natural order, comparing the numbers they contain by value."""
+    return [int(t) if t.isdigit() else t for t in re.split(r"(\d+)", str(fn))]
 
 
 def get_diff_level(files):
@@ -0,0 +1,363 @@
+"""
+Calibration
+-----------
+
+Native calibration of the Raven emulators, as an alternative to Ostrich.
+
+Ostrich runs Raven serially, one parameter set at a time. `ParallelDDS` instead proposes batches of candidate
+parameter sets and evaluates each batch concurrently through the parallel `params` dimension of `Raven.run`, so that
+a batch of `n` candidates launches `n` Raven processes at once.
+
+The calibration problem is the one solved by the Ostrich emulators: the calibrated parameters, their bounds and the
+tied parameters are read from the `ostIn.txt` template of the emulator, the candidates are converted to model
+parameters with its `ost2raven` method, and the objective function is read from the Raven diagnostics::
+
+    dds = ParallelDDS(GR4JCN_OST(), batch_size=8)
+    dds(
+        ts,
+        lowerBounds=(0.01, -15.0, 10.0, 0.0, 1.0, 0.0),
+        upperBounds=(2.5, 10.0, 700.0, 7.0, 30.0, 1.0),
+        max_iterations=400,
+        random_seed=0,
+        **config,
+    )
+    dds.calibrated_params
+"""
+import os
+import re
+from collections import OrderedDict, namedtuple
+from typing import Sequence
+
+import numpy as np
+
+from .base import Ostrich, Raven
+from .progress import Checkpoint, Evaluation
+
+TiedParameter = namedtuple("TiedParameter", ("name", "parents", "kind", "coefs"))
+
+
+def _ostin_section(text, name):
+    """Return the non-empty lines between `Begin<name>` and `End<name>`, without comments."""
+    match = re.search(rf"^\s*Begin{name}\s*$(.*?)^\s*End{name}", text, re.S | re.M)
+    if match is None:
+        return []
+    lines = (line.split("#")[0].strip() for line in match.group(1).splitlines())
+    return [line for line in lines if line]
+
+
+def _tied_value(kind, coefs, x):
+    """Compute the value of a tied parameter from the values of its parents, following Ostrich conventions."""
+    if kind == "linear":
+        if len(x) == 1:
+            c1, c0 = coefs
+            return c1 * x[0] + c0
+        c3, c2, c1, c0 = coefs
+        return c3 * x[0] * x[1] + c2 * x[1] + c1 * x[0] + c0
+    if kind == "ratio":
+        if len(coefs) == 4:
+            c3, c2, c1, c0 = coefs
+            return (c3 * x[0] + c2) / (c1 * x[0] + c0)
+        c5, c4, c3, c2, c1, c0 = coefs
+        return (c5 * x[0] + c4 * x[1] + c3) / (c2 * x[0] + c1 * x[1] + c0)
+    if kind == "exp":
+        base, c2, c1, c0 = coefs
+        return c2 * base ** (c1 * x[0]) + c0
+    raise ValueError(f"Tied parameter type {kind} is not supported.")
+
+
+class ParameterSpace:
+    """Calibrated parameters, their bounds and the parameters tied to them.
+
+    Parameters
+    ----------
+    names : sequence
+      Names of the calibrated parameters.
+    low, high : sequence
+      Lower and upper bounds of the calibrated parameters.
+    tied : sequence
+      `TiedParameter` computed from the calibrated parameters.
+    """
+
+    def __init__(self, names: Sequence[str], low, high, tied=()):
+        self.names = list(names)
+        self.low = np.asarray(low, dtype=float)
+        self.high = np.asarray(high, dtype=float)
+        self.tied = list(tied)
+
+        if not (self.low.shape == self.high.shape == (len(self.names),)):
+            raise ValueError("There should be one lower and upper bound per parameter.")
+        if (self.low > self.high).any():
+            raise ValueError("Lower bounds should not be larger than upper bounds.")
+
+    @classmethod
+    def from_ostrich(cls, model: Ostrich):
+        """Return the parameter space of the `ostIn.txt` template of an Ostrich emulator.
+
+        The bounds are filled from the `lowerBounds` and `upperBounds` of the emulator, as when the template is
+        written for Ostrich.
+        """
+        text = model.rvfiles["ostIn"].content
+        bounds = dict(
+            lowerBounds=model.txt.lowerBounds, upperBounds=model.txt.upperBounds
+        )
+
+        names, low, high = [], [], []
+        for line in _ostin_section(text, "Params"):
+            name, _, lower, upper = line.format(**bounds).split()[:4]
+            names.append(name)
+            low.append(float(lower))
+            high.append(float(upper))
+
+        tied = []
+        for line in _ostin_section(text, "TiedParams"):
+            name, n, *values = line.split()
+            n = int(n)
+            coefs = [float(c) for c in values[n + 1 :] if c != "free"]
+            tied.append(TiedParameter(name, values[:n], values[n], coefs))
+
+        return cls(names, low, high, tied)
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def span(self):
+        return self.high - self.low
+
+    def values(self, x) -> OrderedDict:
+        """Return the values of the calibrated and tied parameters for one candidate."""
+        out = OrderedDict(zip(self.names, map(float, x)))
+        for name, parents, kind, coefs in self.tied:
+            out[name] = _tied_value(kind, coefs, [out[p] for p in parents])
+        return out
+
+    def initial(self, ops) -> np.ndarray:
+        """Return the candidate of a calibrated parameter set, e.g. from `Ostrich.raven2ost`, clipped to the bounds."""
+        x = np.array([ops[name] for name in self.names], dtype=float)
+        return np.clip(x, self.low, self.high)
+
+    def sample(self, rng, n: int) -> np.ndarray:
+        """Return `n` candidates drawn uniformly within the bounds."""
+        return rng.uniform(self.low, self.high, size=(n, len(self)))
+
+    def reflect(self, x) -> np.ndarray:
+        """Reflect values that fall outside the bounds back inside them."""
+        x = np.where(x < self.low, 2 * self.low - x, x)
+        x = np.where(x > self.high, 2 * self.high - x, x)
+        return np.clip(x, self.low, self.high)
+
+
+def _perturbation_value(model: Ostrich, default: float = 0.2) -> float:
+    """Return the DDS `PerturbationValue` of the `ostIn.txt` template of an Ostrich emulator."""
+    for line in _ostin_section(model.rvfiles["ostIn"].content, "DDSAlg"):
+        key, *values = line.split()
+        if key == "PerturbationValue" and values:
+            return float(values[0])
+    return default
+
+
+def raven_emulator(model: Ostrich):
+    """Return the Raven emulator class calibrated by an Ostrich emulator, e.g. `GR4JCN` for `GR4JCN_OST`."""
+    for cls in type(model).__mro__:
+        if issubclass(cls, Raven) and not issubclass(cls, Ostrich):
+            return cls
+    raise TypeError(f"{type(model).__name__} does not calibrate a Raven emulator.")
+
+
+class ParallelDDS:
+    """Parallel Dynamically Dimensioned Search (Tolson & Shoemaker, 2007).
+
+    Each iteration perturbs the best parameter set found so far to create a batch of candidates, and runs the
+    candidates concurrently. Like in DDS, the probability of perturbing each parameter decreases with the number of
+    model evaluations, so the search goes from global to local as the evaluation budget is used.
+
+    Parameters
+    ----------
+    model : Ostrich
+      Ostrich emulator defining the calibration problem, e.g. `GR4JCN_OST()`.
+    workdir : str, Path
+      Directory of the model runs. If None, a temporary directory is created.
+    batch_size : int
+      Number of candidates evaluated concurrently. Defaults to the number of CPUs.
+    perturbation : float, optional
+      Standard deviation of the perturbations, as a fraction of the parameter ranges. The default is the
+      `PerturbationValue` of the `ostIn.txt` template, or 0.2 if it is not set.
+    objective : str
+      Raven diagnostic used as objective function.
+    maximize : bool
+      Whether the objective should be maximized. The default, as in the Ostrich templates, is to maximize the
+      Nash-Sutcliffe efficiency by minimizing its negative.
+    checkpoint : str, Path, optional
+      File storing the evaluations as they are performed. If it already holds evaluations, for example from an
+      interrupted calibration, they are not run again: the search resumes from the best parameter set they contain
+      and only the remaining evaluation budget is used.
+
+    Attributes
+    ----------
+    model : Raven
+      Emulator running the candidates. After calibration, its outputs are those of the best parameter set.
+    space : ParameterSpace
+      Parameter space read from the Ostrich template.
+    history : ndarray
+      One row per evaluation, with the evaluation number, the cost and the calibrated parameters, as in the
+      `OstModel0.txt` file written by Ostrich.
+    """
+
+    def __init__(
+        self,
+        model: Ostrich,
+        workdir=None,
+        batch_size: int = None,
+        perturbation: float = None,
+        objective: str = "DIAG_NASH_SUTCLIFFE",
+        maximize: bool = True,
+        checkpoint=None,
+    ):
+        self.ost = model
+        self.model = raven_emulator(model)(workdir=workdir)
+        # Candidates are rarely evaluated twice, so storing their outputs would only fill the result cache.
+        self.model.result_cache = False
+        self.batch_size = batch_size or os.cpu_count() or 1
+        if perturbation is None:
+            perturbation = _perturbation_value(model)
+        self.perturbation = perturbation
+        self.objective = objective
+        self.maximize = maximize
+        self.checkpoint = Checkpoint(checkpoint) if checkpoint else None
+        self.space = None
+        self.history = None
+
+    def __call__(self, ts, random_seed: int = None, **kwds):
+        """Run the calibration.
+
+        Parameters
+        ----------
+        ts : path or sequence
+          Input files, including the observed streamflow.
+        random_seed : int
+          Seed of the random number generator.
+        **kwds
+          Configuration of the Ostrich emulator (`lowerBounds`, `upperBounds`, `max_iterations`) and of the model.
+          As with the Ostrich `UseInitialParamValues` option, the model `params`, if given, are the first candidate
+          and the search starts from them. Otherwise, the first candidates are drawn at random.
+        """
+        params = kwds.pop("params", None)
+        for key in list(kwds):
+            if key in self.ost.txt.keys():
+                self.ost.assign(key, kwds.pop(key))
+
+        self.space = ParameterSpace.from_ostrich(self.ost)
+        budget = self.ost.txt.max_iterations
+        rng = np.random.default_rng(random_seed)
+
+        x0 = None if params is None else self.space.initial(self.ost.raven2ost(params))
+
+        rows = self._resume()
+        x_best, f_best = None, np.inf
+        for row in rows:
+            if row[1] <= f_best:
+                x_best, f_best = np.array(row[2:]), row[1]
+
+        while len(rows) < budget:
+            n = min(self.batch_size, budget - len(rows))
+            if x_best is None and x0 is not None:
+                candidates = np.vstack(
+                    [
+                        x0,
+                        self.perturb(
+                            rng, x0, np.arange(len(rows) + 1, len(rows) + n), budget
+                        ),
+                    ]
+                )
+            elif x_best is None:
+                candidates = self.space.sample(rng, n)
+            else:
+                candidates = self.perturb(
+                    rng, x_best, np.arange(len(rows), len(rows) + n), budget
+                )
+
+            costs = self.evaluate(ts, candidates, **kwds)
+            evaluations = []
+            for x, f in zip(candidates, costs):
+                evaluations.append(Evaluation(len(rows) + 1, f, x))
+                rows.append([len(rows) + 1, f, *x])
+                if f <= f_best:
+                    x_best, f_best = x, f
+
+            if self.checkpoint is not None:
+                self.checkpoint.append(evaluations, self.space.names)
+
+        self.history = np.array(rows)
+
+        # Like Ostrich, leave the model outputs in the state of the best parameter set.
+        self.evaluate(ts, [x_best], **kwds)
+
+    def _resume(self):
+        """Return the evaluations stored in the checkpoint."""
+        if self.checkpoint is None or not self.checkpoint.path.exists():
+            return []
+
+        names, history = self.checkpoint.load()
+        if len(history) and names != self.space.names:
+            raise ValueError(
+                f"Checkpoint parameters {names} do not match the calibrated parameters {self.space.names}."
+            )
+        return history.tolist()
+
+    def perturb(self, rng, x_best, iterations, budget) -> np.ndarray:
+        """Return candidates perturbing the best parameter set.
+
+        Parameters
+        ----------
+        rng : numpy.random.Generator
+          Random number generator.
+        x_best : array
+          Best parameter set found so far.
+        iterations : array
+          Evaluation number of each candidate, setting the probability of perturbing each parameter.
+        budget : int
+          Maximum number of evaluations.
+        """
+        n, d = len(iterations), len(self.space)
+        p = 1 - np.log(iterations) / np.log(budget)
+        mask = rng.random((n, d)) < p[:, np.newaxis]
+
+        # Perturb at least one parameter.
+        empty = ~mask.any(axis=1)
+        mask[empty, rng.integers(d, size=empty.sum())] = True
+
+        x = x_best + mask * self.perturbation * self.space.span * rng.standard_normal(
+            (n, d)
+        )
+        return self.space.reflect(x)
+
+    def evaluate(self, ts, candidates, **kwds) -> np.ndarray:
+        """Run the model for each candidate in parallel and return their costs."""
+        params = [self.ost.ost2raven(self.space.values(x)) for x in candidates]
+        self.model(ts, params=params, overwrite=True, **kwds)
+
+        if "diagnostics" not in self.model.ind_outputs:
+            raise UserWarning(
+                "No diagnostics were written. Calibration requires observed streamflow."
+            )
+
+        diag = self.model.diagnostics
+        if isinstance(diag, dict):
+            diag = [diag]
+        values = np.array([d[self.objective] for d in diag])
+        return -values if self.maximize else values
+
+    @property
+    def obj_func(self):
+        """Cost of the best parameter set."""
+        return self.history[:, 1].min()
+
+    @property
+    def optimized_parameters(self):
+        """Best values of the calibrated parameters."""
+        return self.history[self.history[:, 1].argmin(), 2:]
+
+    @property
+    def calibrated_params(self):
+        """Model parameters of the best parameter set."""
+        return self.ost.ost2raven(self.space.values(self.optimized_parameters))
@@ -1,16 +1,77 @@
+import itertools
 import re
-from dataclasses import asdict, dataclass, field
-from textwrap import dedent
-from typing import Any, Dict, Optional, Tuple
+from dataclasses import asdict, dataclass, field, fields
+from functools import lru_cache
+from operator import attrgetter
+from textwrap import dedent as _dedent
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+# Templates are class attributes, so each of them only needs to be dedented once.
+dedent = lru_cache(maxsize=None)(_dedent)
 
 INDENT = " " * 4
 VALUE_PADDING = 10
 
+# Number of table rows formatted at once when commands are streamed.
+BATCH_SIZE = 1000
+
 
 class RavenConfig:
     def __str__(self):
         return self.to_rv()
 
+    def iter_rv(self) -> Iterator[str]:
+        """Iterate over the pieces of the RV text.
+
+        Commands holding large tables override this to format their rows in batches, so that the whole text is
+        never held in memory.
+        """
+        yield str(self)
+
+    def write(self, f):
+        """Write the RV text to a file handle, piece by piece."""
+        f.writelines(self.iter_rv())
+
+
+def _stream_table(template: str, placeholder: str, rows: Iterable[str]):
+    """Iterate over the text of a command template, with the `placeholder` field filled with `rows`, one per line."""
+    head, tail = dedent(template).split("{" + placeholder + "}")
+    yield head
+    rows = iter(rows)
+    sep = ""
+    while True:
+        batch = list(itertools.islice(rows, BATCH_SIZE))
+        if not batch:
+            break
+        yield sep + "\n".join(batch)
+        sep = "\n"
+    yield tail
+
+
+class CommandList(RavenConfig):
+    """Commands written one after the other, separated by blank lines.
+
+    Parameters
+    ----------
+    commands : sequence
+      Commands, or any objects whose string is a command.
+    """
+
+    def __init__(self, commands):
+        self.commands = commands
+
+    def to_rv(self):
+        return "".join(self.iter_rv())
+
+    def iter_rv(self):
+        for i, cmd in enumerate(self.commands):
+            if i:
+                yield "\n\n"
+            if isinstance(cmd, RavenConfig):
+                yield from cmd.iter_rv()
+            else:
+                yield str(cmd)
+
 
 @dataclass
 class SubBasinsCommand(RavenConfig):
@@ -27,11 +88,17 @@ class SubBasinsCommand(RavenConfig):
         reach_length: float = 0
         gauged: bool = False
 
+        _row = " ".join([f"{{: <{VALUE_PADDING}}}"] * 6)
+
         def to_rv(self):
-            d = asdict(self)
-            d["reach_length"] = d["reach_length"] if d["reach_length"] else "ZERO-"
-            d["gauged"] = int(d["gauged"])
-            return " ".join(f"{v: <{VALUE_PADDING}}" for v in d.values())
+            return self._row.format(
+                self.subbasin_id,
+                self.name,
+                self.downstream_id,
+                self.profile,
+                self.reach_length if self.reach_length else "ZERO-",
+                int(self.gauged),
+            )
 
     subbasins: Tuple[Record] = ()
 
@@ -44,8 +111,11 @@ class SubBasinsCommand(RavenConfig):
     """
 
     def to_rv(self):
-        recs = [f"    {sb}" for sb in self.subbasins]
-        return dedent(self.template).format(subbasin_records="\n".join(recs))
+        return "".join(self.iter_rv())
+
+    def iter_rv(self):
+        recs = (f"    {sb.to_rv()}" for sb in self.subbasins)
+        return _stream_table(self.template, "subbasin_records", recs)
 
 
 @dataclass
@@ -71,8 +141,7 @@ class HRUsCommand(RavenConfig):
         aspect: float = 0.0
 
         def to_rv(self):
-            d = asdict(self)
-            return " ".join(f"{v: <{VALUE_PADDING * 2}}" for v in d.values())
+            return _hru_row.format(*_hru_values(self))
 
     hrus: Tuple[Record] = ()
 
@@ -85,8 +154,15 @@ class HRUsCommand(RavenConfig):
     """
 
     def to_rv(self):
-        recs = [f"    {hru}" for hru in self.hrus]
-        return dedent(self.template).format(hru_records="\n".join(recs))
+        return "".join(self.iter_rv())
+
+    def iter_rv(self):
+        recs = (f"    {hru.to_rv()}" for hru in self.hrus)
+        return _stream_table(self.template, "hru_records", recs)
+
+
+_hru_values = attrgetter(*(f.name for f in fields(HRUsCommand.Record)))
+_hru_row = " ".join([f"{{: <{VALUE_PADDING * 2}}}"] * len(fields(HRUsCommand.Record)))
 
 
 @dataclass
@@ -114,8 +190,7 @@ class ReservoirCommand(RavenConfig):
     """
 
     def to_rv(self):
-        d = asdict(self)
-        return dedent(self.template).format(**d)
+        return dedent(self.template).format(**vars(self))
 
 
 @dataclass
@@ -178,14 +253,16 @@ class ChannelProfileCommand(RavenConfig):
     """
 
     def to_rv(self):
-        d = asdict(self)
-        d["survey_points"] = "\n".join(
-            f"{INDENT * 2}{p[0]} {p[1]}" for p in d["survey_points"]
-        )
-        d["roughness_zones"] = "\n".join(
-            f"{INDENT * 2}{z[0]} {z[1]}" for z in d["roughness_zones"]
+        return dedent(self.template).format(
+            name=self.name,
+            bed_slope=self.bed_slope,
+            survey_points="\n".join(
+                f"{INDENT * 2}{p[0]} {p[1]}" for p in self.survey_points
+            ),
+            roughness_zones="\n".join(
+                f"{INDENT * 2}{z[0]} {z[1]}" for z in self.roughness_zones
+            ),
         )
-        return dedent(self.template).format(**d)
 
 
 @dataclass
@@ -676,6 +753,37 @@ class ObservationDataCommand(RavenConfig):
         return dedent(self.template).format(**d)
 
 
+@dataclass
+class BasinInflowHydrographCommand(RavenConfig):
+    """BasinInflowHydrograph2 command (RVT).
+
+    Inflows read from a netCDF file are added to the flow entering the upstream end of the subbasin.
+    """
+
+    subbasin_id: int = None
+    file_name_nc: str = None
+    var_name_nc: str = None
+    dim_names_nc: Tuple[str, str] = ("?", "?")
+    station_idx: int = None
+
+    template = """
+    :BasinInflowHydrograph2 {subbasin_id}
+        :ReadFromNetCDF
+             :FileNameNC     {file_name_nc}
+             :VarNameNC      {var_name_nc}
+             :DimNamesNC     {dim_names_nc}
+             :StationIdx     {station_idx}
+        :EndReadFromNetCDF
+    :EndBasinInflowHydrograph2
+    """
+
+    def to_rv(self):
+        d = asdict(self)
+        dns = d["dim_names_nc"]
+        d["dim_names_nc"] = f"{dns[0]} {dns[1]}"
+        return dedent(self.template).format(**d)
+
+
 class RainCorrection(BaseValueCommand):
     tag: str = "RainCorrection"
     value: float = 1.0
@@ -1,4 +1,5 @@
-from collections import namedtuple
+import math
+from collections import OrderedDict, namedtuple
 from pathlib import Path
 from dataclasses import dataclass
 
@@ -306,6 +307,26 @@ class HMETS_OST(Ostrich, HMETS):
         out[20] *= 1000
         return self.params(*out)
 
+    def raven2ost(self, params):
+        """Return the parameters calibrated by Ostrich for a set of Raven parameters.
+
+        Parameters
+        ----------
+        params: sequence
+          Parameters expected by Raven.
+
+        Returns
+        -------
+        OrderedDict
+          Parameter set calibrated by Ostrich, the inverse of `ost2raven`.
+        """
+        x = list(params)
+        x[5] -= x[4]
+        x[9] -= x[8]
+        x[19] /= 1000
+        x[20] /= 1000
+        return OrderedDict(("par_x{:02}".format(i + 1), v) for i, v in enumerate(x))
+
 
 class HBVEC(GR4JCN):
     identifier = "hbvec"
@@ -640,6 +661,29 @@ class BLENDED_OST(Ostrich, BLENDED):
         out = [ops[n] for n in names]
         return self.params(*out)
 
+    def raven2ost(self, params):
+        """Return the parameters calibrated by Ostrich for a set of Raven parameters.
+
+        Parameters
+        ----------
+        params: sequence
+          Parameters expected by Raven.
+
+        Returns
+        -------
+        OrderedDict
+          Parameter set calibrated by Ostrich, the inverse of `ost2raven`.
+        """
+        names = ["par_x{:02}".format(i) for i in range(1, 36)]+["par_r{:02}".format(i) for i in range(1, 9)]
+
+        x = list(params)
+        x[3]  = math.log10(x[3])
+        x[9]  -= x[8]
+        x[10] = math.log10(x[10])
+        x[13] -= x[12]
+        x[24] -= x[23]
+        return OrderedDict(zip(names, x))
+
 
 class Routing(Raven):
     """Routing model - no hydrological modeling"""
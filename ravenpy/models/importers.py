@@ -1,8 +1,8 @@
 import warnings
-from collections import defaultdict
 from pathlib import Path
 
 try:
+    import fiona
     import geopandas
     from osgeo import __version__ as osgeo_version  # noqa
     from osgeo import ogr, osr  # noqa
@@ -18,6 +18,9 @@ except (ImportError, ModuleNotFoundError) as e:
 
 import netCDF4 as nc4
 import numpy as np
+import pandas as pd
+
+from ravenpy.utilities.network import RiverNetwork
 
 from . import grid_weight_importer_params
 from .commands import (
@@ -34,12 +37,28 @@ from .commands import (
 HRU_ASPECT_CONVENTION = "GRASS"  # GRASS | ArcGIS
 
 
+def _round_significant(x, digits):
+    """Round values to a number of significant digits."""
+    x = np.asarray(x, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        exp = np.floor(np.log10(np.abs(x)))
+    k = np.where(np.isfinite(exp), digits - 1 - exp, 0)
+
+    # Dividing or multiplying integers by exact powers of ten, so that rounded values print without artifacts.
+    p = 10.0 ** np.abs(k)
+    return np.where(k >= 0, np.round(x * p) / p, np.round(x / p) * p)
+
+
 class RoutingProductShapefileImporter:
 
     """
     This is a class to encapsulate the logic of converting the Routing
     Product into the required data structures to generate the RVH file
     format.
+
+    Only the attributes listed in `COLUMNS` are read from the shapefile, without
+    the geometries, and the values of the Raven commands are computed column-wise
+    for all HRUs at once (see `extract_table`).
     """
 
     MAX_RIVER_SLOPE = 0.00001
@@ -49,17 +68,62 @@ class RoutingProductShapefileImporter:
     USE_MANNING_COEFF = False
     MANNING_DEFAULT = 0.035
 
+    # Shapefile attributes used to build the Raven commands.
+    COLUMNS = (
+        "SubId",
+        "DowSubId",
+        "IsLake",
+        "IsObs",
+        "HyLakeId",
+        "LakeDepth",
+        "Rivlen",
+        "RivSlope",
+        "BkfWidth",
+        "BkfDepth",
+        "MeanElev",
+        "FloodP_n",
+        "Ch_n",
+        "HRU_ID",
+        "HRU_IsLake",
+        "HRU_Area",
+        "HRU_E_mean",
+        "HRU_S_mean",
+        "HRU_A_mean",
+        "HRU_CenX",
+        "HRU_CenY",
+        "LAND_USE_C",
+        "VEG_C",
+        "SOIL_PROF",
+    )
+
     def __init__(self, shapefile_path, hru_aspect_convention=HRU_ASPECT_CONVENTION):
         if Path(shapefile_path).suffix == ".zip":
             shapefile_path = f"zip://{shapefile_path}"
-        self._df = geopandas.read_file(shapefile_path)
+
+        with fiona.open(shapefile_path) as src:
+            fields = list(src.schema["properties"])
+        self._df = geopandas.read_file(
+            shapefile_path,
+            ignore_geometry=True,
+            ignore_fields=[f for f in fields if f not in self.COLUMNS],
+        )
         self.hru_aspect_convention = hru_aspect_convention
 
-    def extract(self):
+    def extract(self, deduplicate_profiles=False, profile_digits=None):
         """
         This will extract the data from the Routing Product shapefile and
         return it as relevant Raven command data objects.
 
+        Parameters
+        ----------
+        deduplicate_profiles : bool
+            If True, subbasins with identical channel profiles share a single
+            `commands.ChannelProfileCommand`. See `extract_table`.
+        profile_digits : int, optional
+            Number of significant digits to which the channel profile
+            dimensions are rounded before deduplication. Implies
+            `deduplicate_profiles`.
+
         Returns
         -------
         dict
@@ -77,102 +141,136 @@ class RoutingProductShapefileImporter:
                Sequence of `commands.HRUsCommand.Record` objects
 
         """
+        tables = self.extract_table(deduplicate_profiles, profile_digits)
 
-        subbasin_recs = []
-        land_sb_ids = []
-        lake_sb_ids = []
-        reservoir_cmds = []  # those are meant to be injected inline in the RVH
-        channel_profile_cmds = []  # those are meant to be injected inline in the RVH
-        hru_recs = []
-
-        # Collect all subbasin_ids for fast lookup in next loop
-        subbasin_ids = {int(row["SubId"]) for _, row in self._df.iterrows()}
-
-        for _, row in self._df.iterrows():
-
-            # HRU
-            hru_recs.append(self._extract_hru(row))
-
-            subbasin_id = int(row["SubId"])
+        def records(df):
+            columns = df.columns.tolist()
+            for values in zip(*(df[c].tolist() for c in columns)):
+                yield dict(zip(columns, values))
 
-            is_lake = False
-
-            if row["IsLake"] > 0 and row["HRU_IsLake"] > 0:
-                lake_sb_ids.append(subbasin_id)
-                reservoir_cmds.append(self._extract_reservoir(row))
-                is_lake = True
-            elif row["IsLake"] > 0:
-                continue
-            else:
-                land_sb_ids.append(subbasin_id)
+        return dict(
+            subbasins=[
+                SubBasinsCommand.Record(**r) for r in records(tables["subbasins"])
+            ],
+            land_subbasins=tables["land_subbasins"],
+            lake_subbasins=tables["lake_subbasins"],
+            reservoirs=[ReservoirCommand(**r) for r in records(tables["reservoirs"])],
+            channel_profiles=[
+                self._channel_profile(**r) for r in records(tables["channel_profiles"])
+            ],
+            hrus=[HRUsCommand.Record(**r) for r in records(tables["hrus"])],
+        )
 
-            # Subbasin
-            sb = self._extract_subbasin(row, is_lake, subbasin_ids)
-            subbasin_recs.append(sb)
+    def extract_table(self, deduplicate_profiles=False, profile_digits=None):
+        """
+        Extract the data from the Routing Product shapefile as tables, with
+        one column per attribute of the Raven commands.
+
+        Parameters
+        ----------
+        deduplicate_profiles : bool
+            If True, channel profiles are identified by a hash of their
+            dimensions, each distinct profile is kept once, under the name of
+            the first subbasin using it, and the `profile` of the subbasins
+            points to the shared profile.
+        profile_digits : int, optional
+            Number of significant digits to which the channel profile
+            dimensions are rounded before deduplication, so that near-identical
+            profiles are merged. Implies `deduplicate_profiles`.
 
-            # ChannelProfile
-            channel_profile_cmds.append(self._extract_channel_profile(row))
+        Returns
+        -------
+        dict
+            "subbasins"
+               DataFrame of the `commands.SubBasinsCommand.Record` attributes
+            "land_subbasins"
+               List of land subbasins ids
+            "lake_subbasins"
+               List of lake subbasins ids
+            "reservoirs"
+               DataFrame of the `commands.ReservoirCommand` attributes
+            "channel_profiles"
+               DataFrame of the channel dimensions from which the
+               `commands.ChannelProfileCommand` survey points are computed
+            "hrus"
+               DataFrame of the `commands.HRUsCommand.Record` attributes
+        """
+        df = self._df
+        subbasin_id = df["SubId"].to_numpy().astype(int)
+
+        is_lake = (df["IsLake"] > 0).to_numpy()
+        lake = is_lake & (df["HRU_IsLake"] > 0).to_numpy()
+        # Lake subbasins are described by their lake HRU only.
+        sb = ~is_lake | lake
+
+        subbasins = self._subbasins_table(df[sb], lake[sb], subbasin_id)
+        channel_profiles = self._channel_profiles_table(df[sb])
+        if deduplicate_profiles or profile_digits is not None:
+            channel_profiles, subbasins["profile"] = self._deduplicate_profiles(
+                channel_profiles, profile_digits
+            )
 
         return dict(
-            subbasins=subbasin_recs,
-            land_subbasins=land_sb_ids,
-            lake_subbasins=lake_sb_ids,
-            reservoirs=reservoir_cmds,
-            channel_profiles=channel_profile_cmds,
-            hrus=hru_recs,
+            subbasins=subbasins,
+            land_subbasins=subbasin_id[~is_lake].tolist(),
+            lake_subbasins=subbasin_id[lake].tolist(),
+            reservoirs=self._reservoirs_table(df[lake]),
+            channel_profiles=channel_profiles,
+            hrus=self._hrus_table(df),
         )
 
-    def _extract_subbasin(self, row, is_lake, subbasin_ids) -> SubBasinsCommand.Record:
-        subbasin_id = int(row["SubId"])
-        # is_lake = row["HRU_IsLake"] >= 0
-        river_length_in_kms = 0 if is_lake else round(row["Rivlen"] / 1000, 5)
-        # river_slope = max(
-        #     row["RivSlope"], RoutingProductShapefileImporter.MAX_RIVER_SLOPE
-        # )
-        # downstream_id
-        downstream_id = int(row["DowSubId"])
-        if downstream_id == subbasin_id:
-            downstream_id = -1
-        elif downstream_id not in subbasin_ids:
-            downstream_id = -1
-        gauged = row["IsObs"] > 0 or (
-            is_lake and RoutingProductShapefileImporter.USE_LAKE_AS_GAUGE
-        )
-        rec = SubBasinsCommand.Record(
-            subbasin_id=subbasin_id,
-            name=f"sub_{subbasin_id}",
-            downstream_id=downstream_id,
-            profile=f"chn_{subbasin_id}",
-            reach_length=river_length_in_kms,
-            gauged=gauged,
-        )
+    def _subbasins_table(self, df, is_lake, subbasin_ids):
+        subbasin_id = df["SubId"].to_numpy().astype(int)
+        downstream_id = df["DowSubId"].to_numpy().astype(int)
+        # Outlets and subbasins draining outside of the routing product
+        outlet = (downstream_id == subbasin_id) | ~np.isin(downstream_id, subbasin_ids)
 
-        return rec
+        river_length_in_kms = [
+            0 if lake else round(length / 1000, 5)
+            for lake, length in zip(is_lake.tolist(), df["Rivlen"].tolist())
+        ]
+        gauged = (df["IsObs"] > 0).to_numpy() | (
+            is_lake & RoutingProductShapefileImporter.USE_LAKE_AS_GAUGE
+        )
 
-    def _extract_reservoir(self, row) -> ReservoirCommand:
-        lake_id = int(row["HyLakeId"])
+        return pd.DataFrame(
+            dict(
+                subbasin_id=subbasin_id,
+                name=[f"sub_{i}" for i in subbasin_id],
+                downstream_id=np.where(outlet, -1, downstream_id),
+                profile=[f"chn_{i}" for i in subbasin_id],
+                reach_length=pd.Series(river_length_in_kms, dtype=object),
+                gauged=gauged,
+            )
+        )
 
-        return ReservoirCommand(
-            subbasin_id=int(row["SubId"]),
-            hru_id=int(row["HRU_ID"]),
-            name=f"Lake_{lake_id}",
-            weir_coefficient=RoutingProductShapefileImporter.WEIR_COEFFICIENT,
-            crest_width=row["BkfWidth"],
-            max_depth=row["LakeDepth"],
-            lake_area=row["HRU_Area"],
+    def _reservoirs_table(self, df):
+        return pd.DataFrame(
+            dict(
+                subbasin_id=df["SubId"].to_numpy().astype(int),
+                hru_id=df["HRU_ID"].to_numpy().astype(int),
+                name=[f"Lake_{i}" for i in df["HyLakeId"].to_numpy().astype(int)],
+                weir_coefficient=RoutingProductShapefileImporter.WEIR_COEFFICIENT,
+                crest_width=df["BkfWidth"].to_numpy(),
+                max_depth=df["LakeDepth"].to_numpy(),
+                lake_area=df["HRU_Area"].to_numpy(),
+            )
         )
 
-    def _extract_channel_profile(self, row) -> ChannelProfileCommand:
-        subbasin_id = int(row["SubId"])
-        slope = max(row["RivSlope"], RoutingProductShapefileImporter.MAX_RIVER_SLOPE)
+    def _channel_profiles_table(self, df):
+        subbasin_id = df["SubId"].to_numpy().astype(int)
+        slope = np.maximum(
+            df["RivSlope"].to_numpy(float),
+            RoutingProductShapefileImporter.MAX_RIVER_SLOPE,
+        )
 
         # SWAT: top width of channel when filled with water; bankfull width W_bnkfull
-        channel_width = max(row["BkfWidth"], 1)
+        channel_width = np.maximum(df["BkfWidth"].to_numpy(float), 1)
         # SWAT: depth of water in channel when filled to top of bank
-        channel_depth = max(row["BkfDepth"], 1)
-        channel_elev = row["MeanElev"]
-        floodn = row["FloodP_n"]
-        channeln = row["Ch_n"]
+        channel_depth = np.maximum(df["BkfDepth"].to_numpy(float), 1)
+        channel_elev = df["MeanElev"].to_numpy(float)
+        floodn = df["FloodP_n"].to_numpy(float)
+        channeln = df["Ch_n"].to_numpy(float)
 
         # channel profile calculations are based on theory SWAT model is based on
         # see: https://swat.tamu.edu/media/99192/swat2009-theory.pdf
@@ -185,16 +283,65 @@ class RoutingProductShapefileImporter:
         # river bottom width W_btm
         botwd = channel_width - 2 * sidwd
 
-        # if derived bottom width is negative, set bottom width to 0.5*bankfull width and recalculate zch
-        if botwd < 0:
-            botwd = 0.5 * channel_width
-            sidwd = 0.5 * 0.5 * channel_width
-            zch = (channel_width - botwd) / (2 * channel_depth)
+        # if derived bottom width is negative, set bottom width to 0.5*bankfull width
+        negative = botwd < 0
+        botwd = np.where(negative, 0.5 * channel_width, botwd)
+        sidwd = np.where(negative, 0.5 * 0.5 * channel_width, sidwd)
 
         # inverse of floodplain side slope; flood plain side slopes assumed to have 4:1 run to rise ratio
         zfld = 4 + channel_elev
         # floodplain bottom width
         zbot = channel_elev - channel_depth
+
+        if RoutingProductShapefileImporter.USE_MANNING_COEFF:
+            mann = channeln
+        else:
+            mann = np.full(len(df), RoutingProductShapefileImporter.MANNING_DEFAULT)
+
+        return pd.DataFrame(
+            dict(
+                name=[f"chn_{i}" for i in subbasin_id],
+                bed_slope=slope,
+                channel_width=channel_width,
+                channel_elev=channel_elev,
+                sidwd=sidwd,
+                botwd=botwd,
+                zfld=zfld,
+                zbot=zbot,
+                floodn=floodn,
+                mann=mann,
+            )
+        )
+
+    @staticmethod
+    def _deduplicate_profiles(table, digits=None):
+        """Return the distinct channel profiles of a table, and the name of the profile of each row."""
+        dims = table.drop(columns="name")
+        if digits is not None:
+            dims = dims.apply(_round_significant, digits=digits)
+
+        # Profiles are numbered in order of first appearance.
+        codes = dims.groupby(list(dims), sort=False, dropna=False).ngroup().to_numpy()
+        _, first = np.unique(codes, return_index=True)
+
+        names = table["name"].to_numpy()
+        unique = dims.iloc[first]
+        unique.insert(0, "name", names[first])
+        return unique.reset_index(drop=True), names[first][codes]
+
+    @staticmethod
+    def _channel_profile(
+        name,
+        bed_slope,
+        channel_width,
+        channel_elev,
+        sidwd,
+        botwd,
+        zfld,
+        zbot,
+        floodn,
+        mann,
+    ) -> ChannelProfileCommand:
         # floodplain side width
         sidwdfp = 4 / 0.25
 
@@ -211,11 +358,6 @@ class RoutingProductShapefileImporter:
             (2 * sidwdfp + 4 * channel_width + 2 * sidwd + botwd, zfld),
         ]
 
-        if RoutingProductShapefileImporter.USE_MANNING_COEFF:
-            mann = channeln
-        else:
-            mann = RoutingProductShapefileImporter.MANNING_DEFAULT
-
         # roughness zones of channel and floodplain
         roughness_zones = [
             (0, floodn),
@@ -224,39 +366,39 @@ class RoutingProductShapefileImporter:
         ]
 
         return ChannelProfileCommand(
-            name=f"chn_{subbasin_id}",
-            bed_slope=slope,
+            name=name,
+            bed_slope=bed_slope,
             survey_points=survey_points,
             roughness_zones=roughness_zones,
         )
 
-    def _extract_hru(self, row) -> HRUsCommand.Record:
-
-        aspect = row["HRU_A_mean"]
+    def _hrus_table(self, df):
+        aspect = df["HRU_A_mean"].to_numpy(float)
 
         if self.hru_aspect_convention == "GRASS":
-            aspect -= 360
-            if aspect < 0:
-                aspect += 360
+            aspect = aspect - 360
+            aspect = np.where(aspect < 0, aspect + 360, aspect)
         elif self.hru_aspect_convention == "ArcGIS":
             aspect = 360 - aspect
         else:
             assert False
 
-        return HRUsCommand.Record(
-            hru_id=int(row["HRU_ID"]),
-            area=row["HRU_Area"] / 1_000_000,
-            elevation=row["HRU_E_mean"],
-            latitude=row["HRU_CenY"],
-            longitude=row["HRU_CenX"],
-            subbasin_id=int(row["SubId"]),
-            land_use_class=row["LAND_USE_C"],
-            veg_class=row["VEG_C"],
-            soil_profile=row["SOIL_PROF"],
-            aquifer_profile="[NONE]",
-            terrain_class="[NONE]",
-            slope=row["HRU_S_mean"],
-            aspect=aspect,
+        return pd.DataFrame(
+            dict(
+                hru_id=df["HRU_ID"].to_numpy().astype(int),
+                area=df["HRU_Area"].to_numpy() / 1_000_000,
+                elevation=df["HRU_E_mean"].to_numpy(),
+                latitude=df["HRU_CenY"].to_numpy(),
+                longitude=df["HRU_CenX"].to_numpy(),
+                subbasin_id=df["SubId"].to_numpy().astype(int),
+                land_use_class=df["LAND_USE_C"].to_numpy(),
+                veg_class=df["VEG_C"].to_numpy(),
+                soil_profile=df["SOIL_PROF"].to_numpy(),
+                aquifer_profile="[NONE]",
+                terrain_class="[NONE]",
+                slope=df["HRU_S_mean"].to_numpy(),
+                aspect=aspect,
+            )
         )
 
 
@@ -377,25 +519,14 @@ class RoutingProductGridWeightImporter:
 
         if self._sub_ids:
             # Here we want to extract the network of connected subbasins by going upstream via their DowSubId,
-            # starting from the list supplied by the user (either directly, or via their gauge IDs).. We first
-            # build a map of downSubID -> subID for efficient lookup
-            downsubid_to_subids = defaultdict(set)
-            for _, r in self._routing_data.iterrows():
-                downsubid_to_subids[r.DowSubId].add(r.SubId)
-
-            expanded_sub_ids = set(self._sub_ids)
-            prev = expanded_sub_ids.copy()
-            while True:
-                curr = set()
-                for did in prev:
-                    curr |= downsubid_to_subids[did]
-                if curr:
-                    expanded_sub_ids |= curr
-                    prev = curr
-                else:
-                    break
-
-            self._sub_ids = expanded_sub_ids
+            # starting from the list supplied by the user (either directly, or via their gauge IDs).
+            network = RiverNetwork.from_dataframe(
+                self._routing_data, "SubId", "DowSubId"
+            )
+            known = np.intersect1d(list(self._sub_ids), network.ids)
+            self._sub_ids = set(self._sub_ids) | set(
+                network.upstream_ids(known).tolist()
+            )
 
         # Reduce the initial dataset with the target Sub IDs
         if self._sub_ids:
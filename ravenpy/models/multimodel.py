@@ -1,3 +1,7 @@
+import numpy as np
+import pandas as pd
+import xarray as xr
+
 from .base import Raven
 from .emulators import GR4JCN, HBVEC, HMETS, MOHYSE, get_model
 from .rv import RV, RVI
@@ -87,6 +91,10 @@ class RavenMultiModel(Raven):
 
         procs = []
         for m in self._models:
+            # Sub-models record their phases with the multi-model profiler, and share its worker limit.
+            m.profiler = self.profiler
+            m.launcher = self.launcher
+
             # Add params to kwds if passed in run.
             kw = kwds.copy()
             if p[m.identifier]:
@@ -95,3 +103,56 @@ class RavenMultiModel(Raven):
             procs.extend(m.run(ts, **kw))
 
         return procs
+
+    def _store_results(self):
+        for m in self._models:
+            m._store_results()
+
+    def _merge_output(self, files, name):
+        """Merge the netCDF outputs of all models along a `model` dimension.
+
+        The outputs of the parallel simulations of each model are first merged along their parallel dimension (e.g.
+        `params`). Models with fewer parallel simulations are padded with NaNs, so that multi-model ensembles, e.g.
+        several models times several parameter sets, are stored in a single array.
+        """
+        if len(files) == 1:
+            return files[0]
+
+        if name.endswith(".nc"):
+            ds = []
+            for m in self._models:
+                fns = [f for f in files if m.model_dir in f.parts]
+                if fns:
+                    ds.append((m.identifier, self._merge_model(m, fns)))
+
+            # Models with a single simulation get a parallel dimension of length one, so they are padded with NaNs
+            # rather than broadcast along the parallel dimension of the other models.
+            pdims = {m._pdim for m in self._models if m._pdim is not None}
+            ds = [
+                (i, d.expand_dims({p: [0] for p in pdims if p not in d.dims}))
+                for (i, d) in ds
+            ]
+
+            try:
+                out = xr.concat(
+                    [d for (_, d) in ds],
+                    pd.Index([i for (i, _) in ds], name="model"),
+                    data_vars="all",
+                    join="outer",
+                )
+                outfn = self.final_path / name
+                out.to_netcdf(outfn)
+                return outfn
+            except (ValueError, KeyError):
+                pass
+
+        return self._zip_output(files, name)
+
+    @staticmethod
+    def _merge_model(m, files):
+        """Merge the outputs of the parallel simulations of one model."""
+        ds = [xr.open_dataset(fn) for fn in files]
+        if len(ds) == 1:
+            return ds[0]
+        out = xr.concat(ds, m._pdim, data_vars="all")
+        return out.assign_coords({m._pdim: np.arange(len(ds))})
@@ -0,0 +1,392 @@
+"""
+Partitioning of routing networks.
+
+The `Routing` emulator simulates the whole network described by its RVH in a single Raven process, using a single
+core. Yet watersheds draining to distinct outlets are independent, and an upstream part of a watershed is only
+coupled to the rest of the network through the flow at its outlet. `partition_network` follows the `downstream_id`
+links of the sub-basins to split the network into:
+
+* connected components, i.e. watersheds draining to distinct outlets, which are independent;
+* subtrees of the components larger than a maximum size, each draining into a single sub-basin downstream.
+
+`run_partitioned` runs each partition as its own Raven simulation. Partitions are grouped in tiers, such that the
+partitions draining into a partition all belong to lower tiers. Partitions of the same tier run in parallel, tier
+after tier, and the simulated outflows of each partition are added to the partition downstream as basin inflow
+hydrographs. The hydrographs of the gauged sub-basins are finally stitched back together::
+
+    partitions = partition_network(model.rvh.subbasins, max_size=5000)
+    hydrograph = run_partitioned(model, ts, partitions)
+"""
+
+import copy
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import List, Sequence, Tuple, Union
+
+import numpy as np
+import xarray as xr
+
+from ravenpy.utilities.network import RiverNetwork
+
+from .base import Raven
+from .commands import (
+    BasinInflowHydrographCommand,
+    CommandList,
+    RavenConfig,
+    SubBasinsCommand,
+)
+
+
+@dataclass
+class Partition:
+    """Sub-basins simulated together.
+
+    Attributes
+    ----------
+    subbasin_ids : tuple
+      IDs of the sub-basins of the partition, in the order of the original network.
+    outlets : tuple
+      IDs of the sub-basins of the partition draining out of it.
+    downstream_id : int
+      ID of the sub-basin receiving the outflow of the partition, or -1 if the partition drains out of the network.
+    tier : int
+      Tier of the partition. Partitions only receive inflows from partitions of lower tiers.
+    """
+
+    subbasin_ids: Tuple[int, ...]
+    outlets: Tuple[int, ...]
+    downstream_id: int = -1
+    tier: int = 0
+
+
+def partition_network(
+    subbasins: Sequence[SubBasinsCommand.Record], max_size: int = None
+) -> List[Partition]:
+    """Split a river network into partitions that can be simulated separately.
+
+    Parameters
+    ----------
+    subbasins : sequence of SubBasinsCommand.Record
+      Sub-basins of the network. Sub-basins whose `downstream_id` is not in the network are outlets.
+    max_size : int, None
+      Maximum number of sub-basins per partition. If None, each connected component of the network is a partition.
+      Otherwise, components larger than `max_size` are cut into subtrees, cutting the largest upstream subtrees first,
+      and small components are packed together.
+
+    Returns
+    -------
+    list of Partition
+      Partitions, sorted by tier.
+    """
+    if max_size is not None and max_size < 1:
+        raise ValueError("The maximum partition size should be at least 1.")
+
+    ids = np.array([sb.subbasin_id for sb in subbasins], dtype=np.int64)
+    down_ids = np.array([sb.downstream_id for sb in subbasins], dtype=np.int64)
+
+    net = RiverNetwork(ids, down_ids)
+    if len(net) != len(ids):
+        raise ValueError("Sub-basin IDs should be unique.")
+    n = len(ids)
+
+    # Work with the positions of the sub-basins in the original order, -1 marking the outlets.
+    pos = np.full(n, -1, dtype=np.int64)
+    pos[net.index(ids)] = np.arange(n)
+    linked = np.isin(down_ids, ids) & (down_ids != ids)
+    down = np.full(n, -1, dtype=np.int64)
+    down[linked] = pos[net.index(down_ids[linked])]
+    order = pos[net.index(net.topological_order)]
+
+    # Going downstream, cut the largest upstream subtrees until the subtree of each sub-basin fits in a partition.
+    cut = down < 0
+    if max_size is not None:
+        size = np.ones(n, dtype=np.int64)
+        children = [[] for _ in range(n)]
+        for v in order:
+            kids = children[v]
+            if kids:
+                total = 1 + size[kids].sum()
+                for k in sorted(kids, key=lambda k: size[k], reverse=True):
+                    if total <= max_size:
+                        break
+                    cut[k] = True
+                    total -= size[k]
+                size[v] = total
+            if down[v] >= 0:
+                children[down[v]].append(v)
+
+    # Each sub-basin belongs to the partition of the first cut sub-basin downstream.
+    root = np.empty(n, dtype=np.int64)
+    for v in order[::-1]:
+        root[v] = v if cut[v] else root[down[v]]
+
+    tier = np.zeros(n, dtype=np.int64)
+    for v in order:
+        if cut[v] and down[v] >= 0:
+            r = root[down[v]]
+            tier[r] = max(tier[r], tier[v] + 1)
+
+    members = {}
+    for v in range(n):
+        members.setdefault(root[v], []).append(v)
+
+    # Whole watersheds are independent, so the small ones are packed together, largest first.
+    groups = []
+    bins = []
+    for r, m in sorted(members.items(), key=lambda item: -len(item[1])):
+        if max_size is None or down[r] >= 0 or tier[r] > 0:
+            groups.append(([r], m))
+            continue
+        for roots, m_ in bins:
+            if len(m_) + len(m) <= max_size:
+                roots.append(r)
+                m_.extend(m)
+                break
+        else:
+            bins.append(([r], list(m)))
+    groups.extend(bins)
+
+    out = []
+    for roots, m in sorted(groups, key=lambda g: (tier[g[0][0]], min(g[1]))):
+        r = roots[0]
+        out.append(
+            Partition(
+                subbasin_ids=tuple(ids[sorted(m)].tolist()),
+                outlets=tuple(ids[sorted(roots)].tolist()),
+                downstream_id=int(down_ids[r]) if down[r] >= 0 else -1,
+                tier=int(tier[r]),
+            )
+        )
+
+    return out
+
+
+def _as_commands(obj) -> list:
+    """Return the commands held by an RV attribute, which can be a command, a sequence of commands or None."""
+    if obj is None:
+        return []
+    if isinstance(obj, CommandList):
+        return list(obj.commands)
+    if isinstance(obj, RavenConfig):
+        return [obj]
+    return list(obj)
+
+
+def _partition_model(model: Raven, partition: Partition, workdir: Path) -> Raven:
+    """Return a copy of the model restricted to the sub-basins of a partition."""
+    ids = set(partition.subbasin_ids)
+
+    sub = type(model)(workdir=workdir)
+    sub.rvfiles = model.rvfiles
+    sub.raven_exec = model.raven_exec
+    sub.singularity = model.singularity
+    sub.raven_simg = model.raven_simg
+    sub.result_cache = model.result_cache
+
+    # Partitions share the worker limit of the model.
+    sub.launcher = model.launcher
+
+    for ext in model._rvext:
+        setattr(sub, ext, copy.copy(getattr(model, ext)))
+
+    # The outlet of a partition draining into another one is gauged, so that its outflow is written.
+    subbasins = []
+    for sb in model.rvh.subbasins:
+        if sb.subbasin_id in ids:
+            if partition.downstream_id != -1 and sb.subbasin_id in partition.outlets:
+                sb = replace(sb, downstream_id=-1, gauged=True)
+            subbasins.append(sb)
+
+    hrus = tuple(h for h in model.rvh.hrus if h.subbasin_id in ids)
+    hru_ids = {h.hru_id for h in hrus}
+
+    sub.rvh.subbasins = tuple(subbasins)
+    sub.rvh.hrus = hrus
+    sub.rvh.land_subbasins = tuple(s for s in model.rvh.land_subbasins if s in ids)
+    sub.rvh.lake_subbasins = tuple(s for s in model.rvh.lake_subbasins if s in ids)
+    sub.rvh.reservoirs = tuple(r for r in model.rvh.reservoirs if r.subbasin_id in ids)
+
+    profiles = {sb.profile for sb in subbasins}
+    sub.rvp.channel_profiles = tuple(
+        c for c in model.rvp.channel_profiles if c.name in profiles
+    )
+
+    forcings = []
+    for gf in model.rvt.gridded_forcings:
+        gw = gf.grid_weights
+        data = tuple(d for d in gw.data if d[0] in hru_ids)
+        forcings.append(
+            replace(gf, grid_weights=replace(gw, number_hrus=len(hrus), data=data))
+        )
+    sub.rvt.gridded_forcings = tuple(forcings)
+
+    sub.rvt.observation_data = CommandList(
+        [
+            o
+            for o in _as_commands(getattr(model.rvt, "observation_data", None))
+            if o.subbasin_id in ids
+        ]
+    )
+    return sub
+
+
+def _write_inflows(sub: Raven, partition: Partition, inflows: dict) -> List[Path]:
+    """Write the inflows from upstream partitions to netCDF files, and add them to the partition configuration.
+
+    Inflows into the same sub-basin are summed.
+    """
+    files = []
+    cmds = []
+    for sbid in partition.subbasin_ids:
+        if sbid not in inflows:
+            continue
+
+        q = sum(inflows[sbid])
+        q.attrs = {
+            "units": "m3/s",
+            "long_name": "Inflows from upstream partitions",
+        }
+        fn = sub.workdir / f"inflow_{sbid}.nc"
+        q.rename("inflow").expand_dims("nstations").to_dataset().to_netcdf(fn)
+        files.append(fn)
+
+        cmds.append(
+            BasinInflowHydrographCommand(
+                subbasin_id=sbid,
+                file_name_nc=fn.name,
+                var_name_nc="inflow",
+                dim_names_nc=("nstations", "time"),
+                station_idx=1,
+            )
+        )
+
+    sub.rvt.observation_data = CommandList(sub.rvt.observation_data.commands + cmds)
+    return files
+
+
+def _gauged(sub: Raven) -> List[int]:
+    """Return the IDs of the gauged sub-basins of a model, in the order of the hydrograph `nbasins` dimension."""
+    return [sb.subbasin_id for sb in sub.rvh.subbasins if sb.gauged]
+
+
+def run_partitioned(
+    model: Raven,
+    ts: Union[str, Path, Sequence[Union[str, Path]]],
+    partitions: Sequence[Partition] = None,
+    max_size: int = None,
+    overwrite: bool = False,
+) -> xr.Dataset:
+    """Run a routing model partition by partition, and return the hydrographs of its gauged sub-basins.
+
+    Parameters
+    ----------
+    model : Raven
+      Model configured with RVH sub-basins and HRUs, e.g. `Routing`. Its RVP channel profiles, RVT gridded forcings
+      and observation data are split among partitions.
+    ts : path or sequence
+      Input file paths.
+    partitions : sequence of Partition, None
+      Partitions of the network. If None, they are computed with `partition_network`.
+    max_size : int, None
+      Maximum number of sub-basins per partition, used if `partitions` is None.
+    overwrite : bool
+      Whether or not to overwrite existing model and output files.
+
+    Returns
+    -------
+    xr.Dataset
+      Hydrographs of the gauged sub-basins, in the order of the RVH, with a `subbasin_id` coordinate along `nbasins`.
+      The file is also stored as the model `hydrograph` output, while the outputs of each partition are stored in
+      the `ind_outputs` of the model.
+
+    Notes
+    -----
+    Partitions of a tier are launched together, limited by the model `max_workers`, and each partition runs in its
+    own directory in `workdir/partitions`.
+    """
+    if isinstance(ts, (str, Path)):
+        ts = [ts]
+    ts = [Path(fn) for fn in ts]
+
+    gauged = _gauged(model)
+    if not gauged:
+        raise ValueError("The network has no gauged sub-basin.")
+
+    if partitions is None:
+        partitions = partition_network(model.rvh.subbasins, max_size)
+
+    # All partitions simulate the period set by the forcing files.
+    model.setup(overwrite)
+    if model.rvi:
+        model.handle_date_defaults(ts)
+        model.set_calendar(ts)
+
+    subs = [
+        _partition_model(model, p, model.workdir / "partitions" / f"{i:03}")
+        for (i, p) in enumerate(partitions)
+    ]
+
+    inflows = {}
+    hydrographs = [None] * len(partitions)
+    for tier in sorted({p.tier for p in partitions}):
+        runs = [i for (i, p) in enumerate(partitions) if p.tier == tier]
+
+        procs = []
+        for i in runs:
+            subs[i].setup(overwrite)
+            files = _write_inflows(subs[i], partitions[i], inflows)
+            procs.extend(subs[i].run(ts + files))
+
+        for proc in procs:
+            proc.wait()
+
+        for i in runs:
+            sub = subs[i]
+            sub._store_results()
+            sub.parse_results()
+            err = sub.parse_errors()
+            if "ERROR" in err:
+                raise UserWarning(
+                    f"Simulation error in partition {i} ({sub.cmd_path}):\n{err}"
+                )
+
+            with xr.open_dataset(sub.outputs["hydrograph"]) as ds:
+                hydrographs[i] = ds.load()
+
+            p = partitions[i]
+            if p.downstream_id != -1:
+                q = hydrographs[i].q_sim.isel(nbasins=_gauged(sub).index(p.outlets[0]))
+                inflows.setdefault(p.downstream_id, []).append(
+                    q.reset_coords(drop=True)
+                )
+
+    # Stitch the hydrographs of the originally gauged sub-basins.
+    parts = []
+    for sub, ds in zip(subs, hydrographs):
+        sbids = _gauged(sub)
+        keep = [j for (j, sbid) in enumerate(sbids) if sbid in gauged]
+        if keep:
+            parts.append(
+                ds.isel(nbasins=keep).assign_coords(
+                    subbasin_id=("nbasins", [sbids[j] for j in keep])
+                )
+            )
+
+    # Partitions without observations get missing observed flows.
+    if any("q_obs" in ds for ds in parts):
+        parts = [
+            ds if "q_obs" in ds else ds.assign(q_obs=xr.full_like(ds.q_sim, np.nan))
+            for ds in parts
+        ]
+
+    out = xr.concat(
+        parts, "nbasins", data_vars="minimal", coords="minimal", compat="override"
+    )
+    index = {sbid: j for (j, sbid) in enumerate(out.subbasin_id.values.tolist())}
+    out = out.isel(nbasins=[index[sbid] for sbid in gauged])
+
+    fn = model.final_path / "Hydrographs.nc"
+    out.to_netcdf(fn)
+    model.outputs["hydrograph"] = fn
+    model.ind_outputs["hydrograph"] = [sub.outputs["hydrograph"] for sub in subs]
+    return out
@@ -0,0 +1,210 @@
+"""
+Profiling
+---------
+
+Opt-in instrumentation of the phases of a model run. When profiling is enabled on a model with
+`Raven.enable_profiling`, each phase (`_assign_files`, `derived_parameters`, `_dump_rv`, `subprocess`,
+`parse_results`, `_merge_output`) is timed and the results are stored in `Raven.timings`::
+
+    model = GR4JCN()
+    model.enable_profiling()
+    model(ts, params=...)
+    for t in model.timings:
+        print(t.phase, t.run, t.wall)
+
+Timings can also be forwarded to a callback, or to an OpenTelemetry-style tracer exposing `start_span(name)` and
+returning spans with `set_attribute(key, value)` and `end()` methods, for example `opentelemetry.trace.get_tracer`.
+
+When profiling is disabled, phases resolve to a shared no-op context manager.
+"""
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_PROC_IO = Path("/proc/self/io")
+
+# Shared context manager returned when profiling is disabled.
+NULL_PHASE = nullcontext()
+
+
+@dataclass
+class PhaseTiming:
+    """Resources used by one phase of a model run.
+
+    Attributes
+    ----------
+    phase : str
+      Name of the phase.
+    model : str
+      Identifier of the model.
+    run : int, None
+      Index of the parallel simulation, or None for phases covering all simulations.
+    wall : float
+      Elapsed time [s].
+    cpu : float
+      CPU time (user + system) of the Python process [s].
+    child_cpu : float
+      CPU time of the child processes (Raven, Ostrich) that terminated during the phase [s].
+    read_bytes : int, None
+      Bytes read by the Python process, if reported by the platform.
+    written_bytes : int, None
+      Bytes written by the Python process, if reported by the platform. For the `subprocess` phase, this is the
+      size of the files written in the output directories.
+    attributes : dict
+      Additional information about the phase.
+    """
+
+    phase: str
+    model: str = ""
+    run: Optional[int] = None
+    wall: float = 0.0
+    cpu: float = 0.0
+    child_cpu: float = 0.0
+    read_bytes: Optional[int] = None
+    written_bytes: Optional[int] = None
+    attributes: Dict = field(default_factory=dict)
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def _io_counters() -> Tuple[Optional[int], Optional[int]]:
+    """Return the number of bytes read and written by the process, if available."""
+    try:
+        fields = dict(
+            line.split(": ") for line in _PROC_IO.read_text().splitlines() if line
+        )
+        return int(fields["rchar"]), int(fields["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def _child_cpu() -> float:
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _diff(a, b):
+    if a is None or b is None:
+        return None
+    return b - a
+
+
+class _Span:
+    """Measurement of a phase in progress."""
+
+    def __init__(self, profiler, phase, model, run, attributes):
+        self.profiler = profiler
+        self.timing = PhaseTiming(
+            phase=phase, model=model, run=run, attributes=dict(attributes)
+        )
+        self._otel = None
+        if profiler.tracer is not None:
+            self._otel = profiler.tracer.start_span(phase)
+
+        self._io = _io_counters()
+        self._child_cpu = _child_cpu()
+        self._cpu = time.process_time()
+        self._wall = time.perf_counter()
+
+    def set_attribute(self, key, value):
+        self.timing.attributes[key] = value
+
+    def end(self):
+        t = self.timing
+        t.wall = time.perf_counter() - self._wall
+        t.cpu = time.process_time() - self._cpu
+        t.child_cpu = _child_cpu() - self._child_cpu
+        read, written = _io_counters()
+        t.read_bytes = _diff(self._io[0], read)
+        if t.written_bytes is None:
+            t.written_bytes = _diff(self._io[1], written)
+
+        if self._otel is not None:
+            for key, val in t.to_dict().items():
+                if key != "attributes" and val is not None:
+                    self._otel.set_attribute(f"ravenpy.{key}", val)
+            for key, val in t.attributes.items():
+                self._otel.set_attribute(f"ravenpy.{key}", str(val))
+            self._otel.end()
+
+        self.profiler._record(t)
+        return t
+
+
+class Profiler:
+    """Collect the timings of the phases of model runs.
+
+    Parameters
+    ----------
+    callback : callable, optional
+      Function called with each `PhaseTiming` when a phase ends.
+    tracer : optional
+      OpenTelemetry-style tracer. A span is started with `tracer.start_span(phase)` for each phase, decorated with
+      the measured resources as attributes, and ended at the end of the phase.
+    """
+
+    def __init__(self, callback: Callable = None, tracer=None):
+        self.callback = callback
+        self.tracer = tracer
+        self.timings: List[PhaseTiming] = []
+        self._pending: Dict[str, _Span] = {}
+
+    def reset(self):
+        self.timings = []
+        self._pending = {}
+
+    def start(self, phase, model="", run=None, **attributes) -> _Span:
+        """Start measuring a phase. Call `end` on the returned span to stop."""
+        return _Span(self, phase, model, run, attributes)
+
+    def open(self, phase, model="", run=None, **attributes):
+        """Start measuring a phase spanning multiple method calls, unless it is already pending."""
+        if phase not in self._pending:
+            self._pending[phase] = self.start(phase, model, run, **attributes)
+
+    def close(self, phase, **attributes) -> Optional[PhaseTiming]:
+        """Stop measuring a pending phase started with `open`."""
+        span = self._pending.pop(phase, None)
+        if span is None:
+            return None
+        for key, val in attributes.items():
+            if hasattr(span.timing, key):
+                setattr(span.timing, key, val)
+            else:
+                span.set_attribute(key, val)
+        return span.end()
+
+    @contextmanager
+    def phase(self, phase, model="", run=None, **attributes):
+        """Context manager measuring the resources used by the enclosed block."""
+        span = self.start(phase, model, run, **attributes)
+        try:
+            yield span
+        finally:
+            span.end()
+
+    def _record(self, timing):
+        self.timings.append(timing)
+        if self.callback is not None:
+            self.callback(timing)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Return the total wall time, CPU time and number of occurrences of each phase."""
+        out = {}
+        for t in self.timings:
+            s = out.setdefault(t.phase, dict(count=0, wall=0.0, cpu=0.0, child_cpu=0.0))
+            s["count"] += 1
+            s["wall"] += t.wall
+            s["cpu"] += t.cpu
+            s["child_cpu"] += t.child_cpu
+        return out
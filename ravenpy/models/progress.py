@@ -0,0 +1,210 @@
+"""
+Calibration progress
+--------------------
+
+Ostrich appends one line per model evaluation to its `OstModel0.txt` file, giving the evaluation number, the value
+of the objective function and the calibrated parameters. `OstModelReader` follows this file while Ostrich runs,
+reading only the lines appended since the last read, and keeps the parsed history in memory.
+
+Progress can be monitored with a callback, and a calibration that stopped improving can be terminated early::
+
+    model = GR4JCN_OST()
+    model.enable_progress(
+        callback=lambda e: print(e.iteration, e.objective),
+        stop=EarlyStopping(patience=50, min_delta=1e-4),
+    )
+    model(ts, ...)
+    model.history
+
+Evaluations can also be saved to a `Checkpoint` file as they are performed, so that a calibration that was
+interrupted resumes from the best parameter set found so far instead of starting over::
+
+    model.checkpoint = "/scratch/calibration/gr4jcn.txt"
+"""
+import subprocess
+import time
+from collections import namedtuple
+from pathlib import Path
+from typing import Iterator, List, Sequence, Union
+
+import numpy as np
+
+Evaluation = namedtuple("Evaluation", ("iteration", "objective", "params"))
+Evaluation.__doc__ = """Model evaluation performed during a calibration."""
+
+
+class OstModelReader:
+    """Incremental reader of the `OstModel?.txt` files written by Ostrich.
+
+    Parameters
+    ----------
+    path : str, Path
+      Path to the file. It does not need to exist yet.
+
+    Attributes
+    ----------
+    names : list
+      Names of the calibrated parameters, read from the header.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.names = None
+        self._rows: List[List[float]] = []
+        self._history = None
+        self._offset = 0
+        self._inode = None
+
+    def reset(self):
+        self.names = None
+        self._rows = []
+        self._history = None
+        self._offset = 0
+        self._inode = None
+
+    def read(self) -> List[Evaluation]:
+        """Read the lines appended to the file since the last call and return the new evaluations."""
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return []
+
+        # Start over if the file was replaced or truncated, e.g. by a new calibration.
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            self.reset()
+            self._inode = stat.st_ino
+
+        if stat.st_size == self._offset:
+            return []
+
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read(stat.st_size - self._offset)
+
+        # Only complete lines are parsed, the rest is read again on the next call.
+        end = chunk.rfind(b"\n") + 1
+        self._offset += end
+
+        new = []
+        for line in chunk[:end].decode().splitlines():
+            values = line.split()
+            if not values:
+                continue
+            if self.names is None and not _is_number(values[0]):
+                self.names = values[2:]
+                continue
+            row = [float(v) for v in values]
+            self._rows.append(row)
+            new.append(Evaluation(int(row[0]), row[1], np.array(row[2:])))
+
+        if new:
+            self._history = None
+        return new
+
+    @property
+    def history(self) -> np.ndarray:
+        """All evaluations read so far.
+
+        The columns are the evaluation number, the objective function and the calibrated parameters.
+        """
+        self.read()
+        if self._history is None:
+            n = len(self.names) + 2 if self.names is not None else 2
+            self._history = np.array(self._rows).reshape(-1, n)
+            self._history.setflags(write=False)
+        return self._history
+
+    def follow(self, proc, interval: float = 1.0) -> Iterator[Evaluation]:
+        """Yield evaluations as they are written, until the process writing them exits.
+
+        Parameters
+        ----------
+        proc : subprocess.Popen
+          Process writing the file.
+        interval : float
+          Time between reads [s].
+        """
+        while True:
+            running = proc.poll() is None
+            yield from self.read()
+            if not running:
+                return
+            time.sleep(interval)
+
+
+def _is_number(value: str) -> bool:
+    try:
+        float(value)
+    except ValueError:
+        return False
+    return True
+
+
+class EarlyStopping:
+    """Stopping criterion for calibrations that stopped improving.
+
+    Parameters
+    ----------
+    patience : int
+      Number of evaluations without improvement after which the calibration is stopped.
+    min_delta : float
+      Minimum decrease of the objective function counted as an improvement.
+    """
+
+    def __init__(self, patience: int = 50, min_delta: float = 0.0):
+        self.patience = patience
+        self.min_delta = min_delta
+
+    def __call__(self, history: np.ndarray) -> bool:
+        """Return whether the calibration should stop, given the history of evaluations."""
+        if len(history) <= self.patience:
+            return False
+
+        best = np.minimum.accumulate(history[:, 1])
+        return best[-self.patience - 1] - best[-1] <= self.min_delta
+
+
+class Checkpoint:
+    """Evaluations of a calibration persisted to disk, so that an interrupted calibration can be resumed.
+
+    Evaluations are appended to the file as they are performed, in the format of `OstModel0.txt`, with full precision.
+
+    Parameters
+    ----------
+    path : str, Path
+      Path to the checkpoint file. It should not be inside the `exec` directory of the model, which is erased by
+      `setup(overwrite=True)`.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+
+    def load(self):
+        """Return the names of the parameters and the history of the evaluations stored in the checkpoint."""
+        reader = OstModelReader(self.path)
+        history = reader.history
+        return reader.names, history
+
+    def __len__(self):
+        return len(self.load()[1])
+
+    def append(self, evaluations: Sequence[Evaluation], names: Sequence[str]):
+        """Append evaluations to the checkpoint, creating it if needed."""
+        new = not self.path.exists() or self.path.stat().st_size == 0
+        with open(self.path, "a") as f:
+            if new:
+                f.write("Run   obj.function  " + "  ".join(names) + "\n")
+            for e in evaluations:
+                values = [e.objective] + list(e.params)
+                f.write(f"{e.iteration:<6d}  " + "  ".join(f"{v:.17g}" for v in values))
+                f.write("\n")
+
+
+def terminate(proc, timeout: float = 10):
+    """Terminate a process, and kill it if it does not exit within `timeout` seconds."""
+    proc.terminate()
+    try:
+        proc.wait(timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
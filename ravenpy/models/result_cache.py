@@ -0,0 +1,197 @@
+"""
+Local cache of simulation results.
+
+Services such as the WPS front end often receive identical requests, running the same model with the same
+parameters, forcing and dates. `ResultCache` stores the output files of Raven simulations in a local directory, keyed
+by a hash of the rendered configuration files, of the forcing files and of the Raven executable. When a simulation is
+found in the cache, its outputs (hydrograph, storage, solution, diagnostics) are restored in the output directory and
+Raven is not launched. The least recently used results are removed when the cache exceeds its maximum size.
+
+Models use the cache set by their `result_cache` attribute or, by default, the cache set with the
+`RAVENPY_RESULT_CACHE` environment variable, with a maximum size in bytes set by `RAVENPY_RESULT_CACHE_SIZE`.
+"""
+
+import functools
+import hashlib
+import os
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import Optional, Sequence, Union
+
+# Default maximum size of the cache [bytes].
+MAX_SIZE = 2**30
+
+# Configuration lines that change from one run to the next without changing the results.
+IGNORED_LINES = (b":NetCDFAttribute history",)
+
+
+@functools.lru_cache(maxsize=256)
+def _content_hash(fn: str, size: int, mtime: int) -> str:
+    h = hashlib.sha256()
+    with open(fn, "rb") as f:
+        for chunk in iter(lambda: f.read(2**20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def fingerprint(fn: Union[str, Path]) -> str:
+    """Return the hash of the content of a file.
+
+    Hashes are memoized by path, size and modification time, so that unchanged files are only read once.
+    """
+    fn = os.path.realpath(fn)
+    s = os.stat(fn)
+    return _content_hash(fn, s.st_size, s.st_mtime_ns)
+
+
+def simulation_key(
+    rv_files: Sequence[Union[str, Path]],
+    inputs: Sequence[Union[str, Path]] = (),
+    executable: Union[str, Path] = None,
+) -> str:
+    """Return the key of a simulation.
+
+    Parameters
+    ----------
+    rv_files : sequence
+      Rendered configuration files. Lines listed in `IGNORED_LINES` are not hashed, and the paths of the input files
+      are replaced by their name, so that the key does not depend on the directory holding the inputs.
+    inputs : sequence
+      Input files, e.g. forcing and observation files. Their name and content are hashed.
+    executable : str, Path
+      Raven executable.
+    """
+    # Paths of the input files, longest first so that no path is left partly replaced.
+    paths = {}
+    for fn in inputs:
+        for p in (os.fspath(fn), os.path.abspath(fn), os.path.realpath(fn)):
+            paths[os.fsencode(p)] = os.fsencode(Path(fn).name)
+    paths = sorted(paths.items(), key=lambda p: len(p[0]), reverse=True)
+
+    h = hashlib.sha256()
+    for fn in sorted(map(Path, rv_files), key=lambda f: f.name):
+        h.update(fn.name.encode())
+        with open(fn, "rb") as f:
+            for line in f:
+                if line.lstrip().startswith(IGNORED_LINES):
+                    continue
+                for path, name in paths:
+                    line = line.replace(path, name)
+                h.update(line)
+
+    for fn in sorted(map(Path, inputs), key=lambda f: f.name):
+        h.update(fn.name.encode())
+        h.update(fingerprint(fn).encode())
+
+    if executable is not None:
+        h.update(fingerprint(executable).encode())
+
+    return h.hexdigest()
+
+
+class ResultCache:
+    """Directory of simulation outputs, with least recently used eviction.
+
+    The outputs of each simulation are stored in a zip file named after its key.
+
+    Parameters
+    ----------
+    path : str, Path
+      Cache directory. It is created if it does not exist.
+    max_size : int
+      Maximum size of the files in the cache [bytes].
+    """
+
+    def __init__(self, path: Union[str, Path], max_size: int = MAX_SIZE):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_size = int(max_size)
+
+    def filename(self, key: str) -> Path:
+        """Return the path of the file storing the outputs of a simulation."""
+        return self.path / f"{key}.zip"
+
+    def __contains__(self, key: str) -> bool:
+        return self.filename(key).exists()
+
+    def get(self, key: str, output_path: Union[str, Path]) -> bool:
+        """Restore the outputs of a simulation in a directory, returning False if they are not in the cache."""
+        fn = self.filename(key)
+        try:
+            with zipfile.ZipFile(fn) as z:
+                z.extractall(output_path)
+        except (FileNotFoundError, zipfile.BadZipFile):
+            return False
+
+        # The modification time records the last use of the file.
+        try:
+            os.utime(fn)
+        except FileNotFoundError:
+            pass
+        return True
+
+    def put(self, key: str, output_path: Union[str, Path]):
+        """Store the files of a simulation output directory."""
+        output_path = Path(output_path)
+        fn = self.filename(key)
+
+        # Write to a temporary file first, so that concurrent readers never see partial files.
+        fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=self.path)
+        os.close(fd)
+        try:
+            with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as z:
+                for f in sorted(output_path.rglob("*")):
+                    if f.is_file():
+                        z.write(f, arcname=f.relative_to(output_path))
+            os.replace(tmp, fn)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+        self.evict(keep=fn)
+
+    @property
+    def size(self) -> int:
+        """Total size of the files in the cache [bytes]."""
+        return sum(fn.stat().st_size for fn in self.path.glob("*.zip"))
+
+    def evict(self, keep: Path = None):
+        """Remove the least recently used files until the cache is smaller than its maximum size.
+
+        Parameters
+        ----------
+        keep : Path
+          File that should not be removed, e.g. the file that was just written.
+        """
+        files = []
+        for fn in self.path.glob("*.zip"):
+            try:
+                files.append((fn.stat(), fn))
+            except FileNotFoundError:
+                continue
+
+        total = sum(s.st_size for (s, _) in files)
+        for s, fn in sorted(files, key=lambda f: f[0].st_mtime):
+            if total <= self.max_size:
+                break
+            if fn == keep:
+                continue
+            try:
+                fn.unlink()
+            except FileNotFoundError:
+                pass
+            total -= s.st_size
+
+    def clear(self):
+        """Remove all files from the cache."""
+        for fn in self.path.glob("*.zip"):
+            fn.unlink()
+
+
+def default_cache() -> Optional[ResultCache]:
+    """Return the cache set by the `RAVENPY_RESULT_CACHE` environment variable, or None if it is not set."""
+    path = os.getenv("RAVENPY_RESULT_CACHE")
+    if not path:
+        return None
+    return ResultCache(path, int(os.getenv("RAVENPY_RESULT_CACHE_SIZE", MAX_SIZE)))
@@ -1,12 +1,16 @@
 import collections
 import datetime as dt
+import math
+import re
+import string
 from dataclasses import dataclass
 from pathlib import Path
 from textwrap import dedent
-from typing import Dict, List, Tuple
+from typing import Dict, List, Tuple, Union
 from collections import namedtuple
 
 import cftime
+import numpy as np
 import six
 from xclim.core.units import units2pint
 
@@ -14,6 +18,7 @@ from .commands import (
     BasinIndexCommand,
     BasinStateVariablesCommand,
     ChannelProfileCommand,
+    CommandList,
     HRUsCommand,
     HRUStateVariableTableCommand,
     LandUseClassesCommand,
@@ -26,8 +31,10 @@ from .commands import (
     SubBasinsCommand,
     VegetationClassesCommand,
     RainCorrection,
-    SnowCorrection
+    SnowCorrection,
 )
+from .solution import Solution
+from .state import BasinStateArray, HRUStateArray
 
 HRU = HRUsCommand.Record
 HRUState = HRUStateVariableTableCommand.Record
@@ -111,6 +118,102 @@ calendar_options = (
 )
 
 
+# Types of values that cannot be modified in place, so their formatted text can be reused.
+_immutable_types = (
+    str,
+    int,
+    bool,
+    bytes,
+    type(None),
+    dt.date,
+    dt.timedelta,
+    np.generic,
+)
+
+
+def _freeze(value):
+    """Return a key identifying an immutable value, or None if the value could be modified in place."""
+    if isinstance(value, tuple):
+        items = tuple(_freeze(v) for v in value)
+        return None if None in items else (type(value), items)
+    if isinstance(value, float):
+        # 0.0 == -0.0, but they are not formatted the same way.
+        return type(value), value, math.copysign(1, value)
+    if isinstance(value, _immutable_types + (cftime.datetime,)):
+        return type(value), value
+    return None
+
+
+class RVTemplate:
+    """Template parsed once into literal text and replacement fields.
+
+    Rendering is equivalent to `str.format(**kwds)`, but the text of fields whose value is immutable and unchanged
+    since the previous rendering is reused instead of formatted again, and Raven commands filling a plain field are
+    streamed piece by piece (`RavenConfig.iter_rv`) instead of formatted into a single string.
+
+    Parameters
+    ----------
+    content : str
+      Template content, using the `str.format` syntax.
+    """
+
+    _formatter = string.Formatter()
+
+    def __init__(self, content: str):
+        self.chunks = []
+        for literal, expr, spec, conversion in self._formatter.parse(content):
+            field = None
+            if expr is not None:
+                root = re.match(r"[^.\[]*", expr).group()
+                field = (expr, root, conversion, spec)
+            self.chunks.append((literal, field))
+
+        self.fields = frozenset(f[1] for (_, f) in self.chunks if f is not None)
+        self._cache = {}
+
+    def render(self, kwds: dict):
+        """Iterate over the pieces of the rendered template."""
+        for literal, field in self.chunks:
+            if literal:
+                yield literal
+            if field is not None:
+                expr, root, conversion, spec = field
+                if (
+                    expr == root
+                    and not (conversion or spec)
+                    and isinstance(kwds[root], RavenConfig)
+                ):
+                    yield from kwds[root].iter_rv()
+                else:
+                    yield self._render_field(field, kwds)
+
+    def _render_field(self, field, kwds):
+        expr, root, conversion, spec = field
+        key = _freeze(kwds[root])
+
+        # The same field can appear with different conversions and format specs.
+        name = (expr, conversion, spec)
+
+        # Format specs can themselves include replacement fields.
+        if spec and "{" in spec:
+            spec = "".join(RVTemplate(spec).render(kwds))
+            key = None
+
+        cached = self._cache.get(name)
+        if key is not None and cached is not None and cached[0] == key:
+            return cached[1]
+
+        obj, _ = self._formatter.get_field(expr, (), kwds)
+        obj = self._formatter.convert_field(obj, conversion)
+        text = self._formatter.format_field(obj, spec)
+        if key is not None:
+            self._cache[name] = (key, text)
+        return text
+
+    def substitute(self, **kwds) -> str:
+        return "".join(self.render(kwds))
+
+
 class RVFile:
     def __init__(self, fn):
         """Read the content."""
@@ -128,6 +231,22 @@ class RVFile:
         self.content = ""
         self.content = fn.read_text()
 
+    @property
+    def content(self):
+        return self._content
+
+    @content.setter
+    def content(self, value):
+        self._content = value
+        self._template = None
+
+    @property
+    def template(self):
+        """Compiled template, parsed on first use."""
+        if self._template is None:
+            self._template = RVTemplate(self._content)
+        return self._template
+
     def _store_ext(self, fn):
         try:
             self.ext = fn.suffixes[0][1:]
@@ -143,11 +262,12 @@ class RVFile:
     def write(self, path, **kwds):
         fn = (path / self.stem).with_suffix(self.suffixes)
 
-        content = self.content
-        if kwds:
-            content = content.format(**kwds)
+        with open(fn, "w") as f:
+            if kwds:
+                f.writelines(self.template.render(kwds))
+            else:
+                f.write(self.content)
 
-        fn.write_text(content)
         return fn
 
     @property
@@ -196,24 +316,53 @@ class RV(collections.abc.Mapping, RavenConfig):
 
         setattr(self, key, value)
 
+    def __setattr__(self, key, value):
+        if (
+            not key.startswith("_")
+            and key not in self.__dict__
+            and key not in self._properties()
+        ):
+            self._new_key()
+        super().__setattr__(key, value)
+
+    def __delattr__(self, key):
+        super().__delattr__(key)
+        if not key.startswith("_") and key not in self._properties():
+            self._new_key()
+
+    def _new_key(self):
+        self.__dict__["_keys_version"] = self.keys_version() + 1
+
+    def keys_version(self):
+        """Return the number of times public attributes were added or removed.
+
+        Registries built from `keys` can compare this number to tell whether they are stale.
+        """
+        return self.__dict__.get("_keys_version", 0)
+
     def __len__(self):
         return len(self.__dict__)
 
     def __iter__(self):
         return iter(self.keys())
 
+    @classmethod
+    def _properties(cls):
+        """Return the names of the class properties, computed once per class."""
+        props = cls.__dict__.get("_properties_registry")
+        if props is None:
+            props = tuple(
+                x for x in dir(cls) if isinstance(getattr(cls, x, None), property)
+            )
+            cls._properties_registry = props
+        return props
+
     def keys(self):
         # Attributes
-        a = list(filter(lambda x: not x.startswith("_"), self.__dict__))
+        a = [x for x in self.__dict__ if not x.startswith("_")]
 
         # Properties
-        p = list(
-            filter(
-                lambda x: isinstance(getattr(self.__class__, x, None), property),
-                dir(self),
-            )
-        )
-        return a + p
+        return a + list(self._properties())
 
     def items(self):
         for attribute in self.keys():
@@ -693,8 +842,8 @@ class RVI(RV):
 class RVC(RV):
     def __init__(
         self,
-        hru_states: Dict[int, HRUState] = None,
-        basin_states: Dict[int, BasinIndexCommand] = None,
+        hru_states: Union[Dict[int, HRUState], HRUStateArray] = None,
+        basin_states: Union[Dict[int, BasinIndexCommand], BasinStateArray] = None,
         **kwds,
     ):
         self.hru_states = hru_states or {}
@@ -709,33 +858,62 @@ class RVC(RV):
         path : string
           `solution.rvc` content.
         """
-        objs = parse_solution(rvc)
-        self.hru_states, self.basin_states = get_states(objs)
+        self.hru_states, self.basin_states = Solution(rvc).get_states()
+
+    @staticmethod
+    def _single_member(value):
+        if len(value) > 1:
+            raise ValueError(
+                "Pass state arrays with multiple members to the model call to run them in parallel."
+            )
+        return value
 
     @property
     def hru_state(self):
+        if isinstance(self.hru_states, HRUStateArray):
+            if 1 in self.hru_states.index:
+                return self.hru_states.record(1)
+            return None
         return self.hru_states.get(1, None)
 
     @hru_state.setter
     def hru_state(self, value):
-        self.hru_states[1] = value
+        if isinstance(value, HRUStateArray):
+            self.hru_states = self._single_member(value)
+        else:
+            if isinstance(self.hru_states, HRUStateArray):
+                self.hru_states = self.hru_states.to_dict()
+            self.hru_states[1] = value
 
     @property
     def basin_state(self):
+        if isinstance(self.basin_states, BasinStateArray):
+            if 1 in self.basin_states.index:
+                return self.basin_states.record(1)
+            return None
         return self.basin_states.get(1, None)
 
     @basin_state.setter
     def basin_state(self, value):
-        self.basin_states[1] = value
+        if isinstance(value, BasinStateArray):
+            self.basin_states = self._single_member(value)
+        else:
+            if isinstance(self.basin_states, BasinStateArray):
+                self.basin_states = self.basin_states.to_dict()
+            self.basin_states[1] = value
 
     @property
     def hru_states_cmd(self):
         """Return HRU state values."""
+        if isinstance(self.hru_states, HRUStateArray):
+            return self.hru_states
         return HRUStateVariableTableCommand(self.hru_states)
 
     @property
     def basin_states_cmd(self):
         """Return basin state variables."""
+        if isinstance(self.basin_states, BasinStateArray):
+            return self.basin_states
         return BasinStateVariablesCommand(self.basin_states)
 
 
@@ -757,7 +935,7 @@ class RVH(RV):
 
     {lake_subbasin_group_cmd}
 
-    {reservoir_cmd_list}
+    {reservoirs_cmd}
     """
 
     @property
@@ -772,6 +950,10 @@ class RVH(RV):
     def lake_subbasin_group_cmd(self):
         return SubBasinGroupCommand("Lakes", self.lake_subbasins)
 
+    @property
+    def reservoirs_cmd(self):
+        return CommandList(self.reservoirs)
+
     @property
     def reservoir_cmd_list(self):
         return "\n\n".join(map(str, self.reservoirs))
@@ -788,6 +970,10 @@ class RVH(RV):
         # params = self.items()
         return dedent(self.template).format(**dict(self.items()))
 
+    def write(self, f):
+        """Write the RVH text to a file handle, streaming the subbasin, HRU and reservoir tables."""
+        f.writelines(RVTemplate(dedent(self.template)).render(dict(self.items())))
+
 
 @dataclass
 class RVP(RV):
@@ -814,6 +1000,10 @@ class RVP(RV):
     def land_use_classes_cmd(self):
         return LandUseClassesCommand(self.land_use_classes)
 
+    @property
+    def channel_profiles_cmd(self):
+        return CommandList(self.channel_profiles)
+
     @property
     def channel_profile_cmd_list(self):
         return "\n\n".join(map(str, self.channel_profiles))
@@ -828,6 +1018,7 @@ class Ost(RV):
     def __init__(self, **kwargs):
         self._max_iterations = None
         self._random_seed = None
+        self._warm_start = False
 
         super(Ost, self).__init__(**kwargs)
 
@@ -855,6 +1046,17 @@ class Ost(RV):
         else:
             self._random_seed = None
 
+    @property
+    def warm_start(self):
+        """Whether Ostrich resumes from the evaluations stored in OstModel0.txt."""
+        if self._warm_start:
+            return "OstrichWarmStart yes"
+        return ""
+
+    @warm_start.setter
+    def warm_start(self, value):
+        self._warm_start = bool(value)
+
 
 def isinstance_namedtuple(x):
     a = isinstance(x, tuple)
@@ -887,9 +1089,16 @@ def get_states(solution, hru_index=None, basin_index=None):
 
     Parameters
     ----------
-    solution : dict
+    solution : dict, Solution
       `solution.rvc` parsed content.
+    hru_index : None, int
+      Set index value or None to get all HRUs.
+    basin_index : None, int
+      Set index value or None to get all basin states.
     """
+    if isinstance(solution, Solution):
+        return solution.get_states(hru_index, basin_index)
+
     hru_state = {}
     basin_state = {}
 
@@ -917,51 +1126,4 @@ def parse_solution(rvc):
     rvc : str
       Content of a solution.rvc file.
     """
-    # Create a generator that will consume lines one by one.
-    # tags = ['{i.' + a.lower().replace('[', '').replace(']', '') + '}' for a in atts]
-    lines = iter(rvc.splitlines())
-    return _parser(lines)
-
-
-def _parser(lines, indent="", fmt=str):
-    import itertools
-    import re
-
-    header_pat = re.compile(r"(\s*):(\w+)\s?,?\s*(.*)")
-
-    out = collections.defaultdict(dict)
-    old_key = None
-    for line in lines:
-        header = header_pat.match(line)
-        if header:
-            new_indent, key, value = header.groups()
-            if new_indent > indent:
-                out[old_key] = _parser(itertools.chain([line], lines), new_indent)
-            elif new_indent < indent:
-                return out
-            else:
-                if key == "BasinIndex":
-                    i, name = value.split(",")
-                    i = int(i)
-                    out[key][i] = dict(
-                        index=i, name=name, **_parser(lines, new_indent + "  ", float)
-                    )
-                elif key in ["Qlat", "Qout"]:
-                    n, *values, last = value.split(",")
-                    out[key] = list(map(float, values))
-                    out[key + "Last"] = float(last)
-                elif key == "Qin":
-                    n, *values = value.split(",")
-                    out[key] = list(map(float, values))
-                else:
-                    out[key] = (
-                        list(map(fmt, value.split(","))) if "," in value else fmt(value)
-                    )
-
-            old_key = key
-        else:
-            data = line.split(",")
-            i = int(data.pop(0))
-            out["data"][i] = [i] + list(map(float, data))
-
-    return out
+    return Solution(rvc).to_dict()
@@ -0,0 +1,358 @@
+"""
+Solution files
+--------------
+
+Reader for the `solution.rvc` files written by Raven at the end of a simulation.
+
+The sections of the file are located when a `Solution` is created, but values are only converted on first access:
+the HRU state table is converted to a NumPy array in a single call, and the basin states are stored in a structured
+array with one record per subbasin. Individual `HRUState` and `BasinIndexCommand` objects are only created for the
+HRUs and basins that are requested.
+
+`read_solution` keeps the solutions of recently read files in memory, keyed by path, and only parses a file again if
+its modification time or size changed.
+"""
+import collections
+import re
+from pathlib import Path
+from typing import Dict, List, Union
+
+import numpy as np
+
+from .commands import BasinIndexCommand, HRUStateVariableTableCommand
+
+HRUState = HRUStateVariableTableCommand.Record
+
+# Maximum number of parsed solution files kept in memory by `read_solution`.
+CACHE_SIZE = 32
+
+_cache = collections.OrderedDict()
+
+_timestamp_pat = re.compile(r"^\s*:TimeStamp\s*,?\s*(.*?)\s*$", re.MULTILINE)
+
+# Basin state series: the number of values is given first, and Qout and Qlat are followed by the last value.
+_basin_series = {"Qout": "qoutlast", "Qlat": "qlatlast", "Qin": None}
+
+
+def _section(text, name):
+    """Return the content between the `:<name>` and `:End<name>` lines."""
+    start = re.search(rf"^\s*:{name}\s*$", text, re.MULTILINE)
+    if start is None:
+        return None
+    end = text.find(f":End{name}", start.end())
+    if end == -1:
+        end = len(text)
+    return text[start.end() : end]
+
+
+def _lines(block):
+    """Iterate over the non-empty, non-comment stripped lines of a block."""
+    for line in block.splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line
+
+
+def _split_key(line):
+    """Split a `:Key value` or `:Key, value` line into its key and value."""
+    key = line[1:].split(None, 1)[0].split(",", 1)[0]
+    return key, line[1 + len(key) :].lstrip(" ,")
+
+
+def _to_array(values: List[str], n: int) -> np.ndarray:
+    """Convert comma-separated rows of numbers to a 2D array with `n` columns."""
+    if not values:
+        return np.empty((0, n))
+    out = np.fromstring(",".join(values), sep=",")
+    if out.size != len(values) * n:
+        raise ValueError("Rows do not all have the same number of values.")
+    return out.reshape(len(values), n)
+
+
+def _parse_hru_table(block):
+    attributes, units, rows = [], [], []
+    for line in _lines(block):
+        if line.startswith(":"):
+            key, value = _split_key(line)
+            if key == "Attributes":
+                attributes = value.rstrip(",").split(",")
+            elif key == "Units":
+                units = value.rstrip(",").split(",")
+        else:
+            rows.append(line.rstrip(","))
+
+    ncols = rows[0].count(",") + 1 if rows else len(attributes) + 1
+    table = _to_array(rows, ncols)
+    index = table[:, 0].astype(int)
+    return attributes, units, index, table[:, 1:]
+
+
+def _parse_basin_states(block):
+    basins = []
+    current = None
+    for line in _lines(block):
+        if not line.startswith(":"):
+            continue
+        key, value = _split_key(line)
+        if key == "BasinIndex":
+            i, _, name = value.partition(",")
+            current = dict(index=int(i), name=name.strip())
+            basins.append(current)
+        elif current is None:
+            continue
+        elif key in _basin_series:
+            n, _, values = value.partition(",")
+            current[key] = (int(n), values.rstrip(","))
+        elif key in ("ChannelStorage", "RivuletStorage"):
+            current[key.lower()] = float(value)
+
+    nb = len(basins)
+
+    # Convert each series for all basins at once.
+    series = {}
+    for key, last in _basin_series.items():
+        counts = np.array([b.get(key, (0, ""))[0] for b in basins], dtype=int)
+        present = np.array([key in b for b in basins], dtype=bool)
+        width = counts + present * (last is not None)
+        values = [b[key][1] for b in basins if key in b and b[key][1]]
+        flat = np.fromstring(",".join(values), sep=",") if values else np.empty(0)
+        if flat.size != width.sum():
+            raise ValueError(f"Inconsistent number of values in :{key} records.")
+
+        n = counts.max() if nb else 0
+        if nb and (width == width[0]).all():
+            table = flat.reshape(nb, width[0])
+        else:
+            # Pad the series of basins with fewer values.
+            table = np.full((nb, n + (last is not None)), np.nan)
+            for j, offset in enumerate(np.cumsum(width) - width):
+                table[j, : counts[j]] = flat[offset : offset + counts[j]]
+                if last is not None and present[j]:
+                    table[j, -1] = flat[offset + counts[j]]
+
+        series[key] = n, counts, table
+
+    dtype = basin_state_dtype(
+        max([len(b["name"]) for b in basins] + [1]),
+        *[series[key][0] for key in _basin_series],
+    )
+    out = np.zeros(nb, dtype=dtype)
+    out["index"] = [b["index"] for b in basins]
+    out["name"] = [b["name"] for b in basins]
+    out["channelstorage"] = [b.get("channelstorage", 0) for b in basins]
+    out["rivuletstorage"] = [b.get("rivuletstorage", 0) for b in basins]
+    for key, last in _basin_series.items():
+        n, counts, table = series[key]
+        out[key.lower()] = table[:, :n]
+        if last is not None:
+            out[last] = table[:, -1]
+        out[f"n{key.lower()}"] = counts
+
+    return out
+
+
+def basin_state_dtype(name_width=1, nqout=1, nqlat=3, nqin=20) -> np.dtype:
+    """Return the dtype of the structured arrays storing basin states.
+
+    Parameters
+    ----------
+    name_width : int
+      Maximum length of subbasin names.
+    nqout, nqlat, nqin : int
+      Maximum number of values in the Qout, Qlat and Qin series.
+    """
+    return np.dtype(
+        [
+            ("index", "i8"),
+            ("name", f"U{name_width}"),
+            ("channelstorage", "f8"),
+            ("rivuletstorage", "f8"),
+            ("qout", "f8", (nqout,)),
+            ("qoutlast", "f8"),
+            ("nqout", "i8"),
+            ("qlat", "f8", (nqlat,)),
+            ("qlatlast", "f8"),
+            ("nqlat", "i8"),
+            ("qin", "f8", (nqin,)),
+            ("nqin", "i8"),
+        ]
+    )
+
+
+def to_basin_command(rec) -> BasinIndexCommand:
+    """Convert a record of a basin state structured array to a `BasinIndexCommand`."""
+    return BasinIndexCommand(
+        index=int(rec["index"]),
+        name=str(rec["name"]),
+        channelstorage=float(rec["channelstorage"]),
+        rivuletstorage=float(rec["rivuletstorage"]),
+        qout=rec["qout"][: rec["nqout"]].tolist(),
+        qoutlast=float(rec["qoutlast"]),
+        qlat=rec["qlat"][: rec["nqlat"]].tolist(),
+        qlatlast=float(rec["qlatlast"]),
+        qin=rec["qin"][: rec["nqin"]].tolist(),
+    )
+
+
+class Solution:
+    """Content of a Raven `solution.rvc` file.
+
+    Parameters
+    ----------
+    rvc : str
+      Content of a solution.rvc file.
+
+    Attributes
+    ----------
+    timestamp : str
+      Date of the solution, as written by Raven.
+    """
+
+    def __init__(self, rvc: str):
+        match = _timestamp_pat.search(rvc)
+        self.timestamp = match.group(1) if match else None
+        self._hru_block = _section(rvc, "HRUStateVariableTable") or ""
+        self._basin_block = _section(rvc, "BasinStateVariables") or ""
+        self._hru = None
+        self._basins = None
+        self._hru_rows = None
+        self._basin_rows = None
+
+    def _load_hru(self):
+        if self._hru is None:
+            attributes, units, index, table = _parse_hru_table(self._hru_block)
+            index.setflags(write=False)
+            table.setflags(write=False)
+            self._hru = attributes, units, index, table
+            self._hru_rows = {i: j for (j, i) in enumerate(index.tolist())}
+        return self._hru
+
+    @property
+    def hru_attributes(self) -> List[str]:
+        """Names of the HRU state variables."""
+        return list(self._load_hru()[0])
+
+    @property
+    def hru_units(self) -> List[str]:
+        """Units of the HRU state variables."""
+        return list(self._load_hru()[1])
+
+    @property
+    def hru_index(self) -> np.ndarray:
+        """HRU identifiers, in the order of the rows of `hru_table`."""
+        return self._load_hru()[2]
+
+    @property
+    def hru_table(self) -> np.ndarray:
+        """HRU state variables (HRU, attribute)."""
+        return self._load_hru()[3]
+
+    @property
+    def basin_states(self) -> np.ndarray:
+        """Basin state variables, as a structured array with one record per subbasin.
+
+        The fields are named after the `BasinIndexCommand` attributes. Series (`qout`, `qlat`, `qin`) are padded with
+        NaNs to the longest series, and their actual lengths are stored in the `nqout`, `nqlat` and `nqin` fields.
+        """
+        if self._basins is None:
+            self._basins = _parse_basin_states(self._basin_block)
+            self._basins.setflags(write=False)
+            self._basin_rows = {
+                i: j for (j, i) in enumerate(self._basins["index"].tolist())
+            }
+        return self._basins
+
+    def hru_state(self, index: int) -> HRUState:
+        """Return the state of one HRU."""
+        self._load_hru()
+        row = self.hru_table[self._hru_rows[index]]
+        return HRUState(index, *row.tolist())
+
+    def basin_state(self, index: int) -> BasinIndexCommand:
+        """Return the state of one subbasin."""
+        return to_basin_command(self.basin_states[self._basin_rows[index]])
+
+    def get_states(self, hru_index=None, basin_index=None):
+        """Return state variables.
+
+        Parameters
+        ----------
+        hru_index : None, int
+          HRU identifier, or None to get a dictionary of the states of all HRUs.
+        basin_index : None, int
+          Subbasin identifier, or None to get a dictionary of the states of all subbasins.
+        """
+        if hru_index is None:
+            hru_state = {i: self.hru_state(i) for i in self.hru_index.tolist()}
+        else:
+            hru_state = self.hru_state(hru_index)
+
+        if basin_index is None:
+            basin_state = {
+                i: self.basin_state(i) for i in self.basin_states["index"].tolist()
+            }
+        else:
+            basin_state = self.basin_state(basin_index)
+
+        return hru_state, basin_state
+
+    def to_dict(self) -> Dict:
+        """Return the solution as nested dictionaries, following the structure of the file."""
+        attributes, units, index, table = self._load_hru()
+        data = {i: [i] + row for (i, row) in zip(index.tolist(), table.tolist())}
+
+        basins = {}
+        for i in self.basin_states["index"].tolist():
+            b = self.basin_state(i)
+            basins[i] = dict(
+                index=b.index,
+                name=b.name,
+                ChannelStorage=b.channelstorage,
+                RivuletStorage=b.rivuletstorage,
+                Qout=b.qout,
+                QoutLast=b.qoutlast,
+                Qlat=b.qlat,
+                QlatLast=b.qlatlast,
+                Qin=b.qin,
+            )
+
+        return {
+            "TimeStamp": self.timestamp,
+            "HRUStateVariableTable": {
+                "Attributes": list(attributes),
+                "Units": list(units),
+                "data": data,
+            },
+            "BasinStateVariables": {"BasinIndex": basins},
+        }
+
+
+def read_solution(path: Union[str, Path]) -> Solution:
+    """Return the content of a solution file.
+
+    The result is cached, and the file is only parsed again if its modification time or size changed.
+
+    Parameters
+    ----------
+    path : str, Path
+      Path to a solution.rvc file.
+    """
+    path = Path(path).resolve()
+    stat = path.stat()
+    key = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _cache.get(path)
+    if cached is None or cached[0] != key:
+        cached = key, Solution(path.read_text())
+        _cache[path] = cached
+    _cache.move_to_end(path)
+
+    while len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+
+    return cached[1]
+
+
+def clear_cache():
+    """Empty the cache of solution files used by `read_solution`."""
+    _cache.clear()
@@ -0,0 +1,403 @@
+"""
+Model states
+------------
+
+Array-backed containers for the HRU and basin state variables of an ensemble of simulations.
+
+`HRUStateArray` stores the HRU states in a single `(member, hru, state)` array with named state variables, and
+`BasinStateArray` stores the basin states in a `(member, basin)` structured array. Both can be created in bulk from
+solution files, written to RVC text in bulk, and passed as `hru_state` and `basin_state` to a model call to run one
+simulation per member in parallel::
+
+    hru_states, basin_states = model.get_final_state_arrays()
+    soil = hru_states.sel("soil0", hru=1)
+    model(ts, hru_state=hru_states.replace(soil0=soil + 1), basin_state=basin_states)
+"""
+import re
+from dataclasses import fields
+from typing import Dict, Sequence, Union
+
+import numpy as np
+import xarray as xr
+
+from .commands import BasinIndexCommand, HRUStateVariableTableCommand, RavenConfig
+from .solution import Solution, basin_state_dtype, to_basin_command
+
+HRUState = HRUStateVariableTableCommand.Record
+
+# Names of the HRU state variables, in the order of the `HRUState` fields.
+HRU_STATE_NAMES = tuple(f.name for f in fields(HRUState))[1:]
+
+_indexed_name_pat = re.compile(r"^(.*?)(\d+)$")
+
+
+def raven_name(name: str) -> str:
+    """Return the Raven attribute name of an HRU state variable, e.g. `SOIL[0]` for `soil0`."""
+    match = _indexed_name_pat.match(name)
+    if match:
+        return "{}[{}]".format(match.group(1).upper(), match.group(2))
+    return name.upper()
+
+
+def state_name(attribute: str) -> str:
+    """Return the name of an HRU state variable from its Raven attribute name, e.g. `soil0` for `SOIL[0]`."""
+    return attribute.lower().replace("[", "").replace("]", "")
+
+
+def _default_units(attribute):
+    return {"SNOW_TEMP": "C", "SNOW_COVER": "0-1"}.get(attribute, "mm")
+
+
+def _split_members(states):
+    """Return an object array of single-member views, as expected for parallel parameters."""
+    out = np.empty(len(states), dtype=object)
+    for i in range(len(states)):
+        out[i] = states.member(i)
+    return out
+
+
+def _join(values):
+    return ",".join(map(repr, values))
+
+
+class HRUStateArray(RavenConfig):
+    """HRU state variables of an ensemble of simulations.
+
+    Parameters
+    ----------
+    data : array_like (member, hru, state)
+      State variable values. 2D arrays are interpreted as a single member.
+    index : array_like (hru,), optional
+      HRU identifiers. Defaults to 1, 2, ...
+    names : sequence of str, optional
+      Names of the state variables, following `HRUState` attributes (e.g. `soil0`). Defaults to all `HRUState`
+      attributes.
+    units : sequence of str, optional
+      Units of the state variables.
+
+    Notes
+    -----
+    The RVC representation (`to_rv`) is the `:HRUStateVariableTable` of the first member.
+    """
+
+    def __init__(self, data, index=None, names=None, units=None):
+        data = np.asarray(data, dtype=float)
+        if data.ndim == 2:
+            data = data[np.newaxis]
+        if data.ndim != 3:
+            raise ValueError("`data` should have dimensions (member, hru, state).")
+
+        self.data = data
+        self.index = (
+            np.arange(1, data.shape[1] + 1)
+            if index is None
+            else np.array(index, dtype=int)
+        )
+        self.names = HRU_STATE_NAMES if names is None else tuple(names)
+        self.units = None if units is None else tuple(units)
+
+        if self.index.shape != (data.shape[1],):
+            raise ValueError("`index` should have one value per HRU.")
+        if len(self.names) != data.shape[2]:
+            raise ValueError("`names` should have one value per state variable.")
+        if self.units is not None and len(self.units) != data.shape[2]:
+            raise ValueError("`units` should have one value per state variable.")
+
+    @classmethod
+    def from_solutions(cls, solutions: Sequence[Solution]) -> "HRUStateArray":
+        """Stack the HRU states of solutions, with one member per solution."""
+        first = solutions[0]
+        for s in solutions[1:]:
+            if s.hru_attributes != first.hru_attributes or not np.array_equal(
+                s.hru_index, first.hru_index
+            ):
+                raise ValueError(
+                    "Solutions do not have the same HRUs and state variables."
+                )
+
+        return cls(
+            np.stack([s.hru_table for s in solutions]),
+            index=first.hru_index,
+            names=[state_name(a) for a in first.hru_attributes],
+            units=first.hru_units or None,
+        )
+
+    @classmethod
+    def from_records(
+        cls, records: Sequence[Union[HRUState, Dict[int, HRUState]]]
+    ) -> "HRUStateArray":
+        """Create an array from `HRUState` records.
+
+        Parameters
+        ----------
+        records : sequence
+          One `HRUState`, or one dictionary of `HRUState` keyed by HRU identifier, per member.
+        """
+        if isinstance(records, (HRUState, dict)):
+            records = [records]
+        members = [r if isinstance(r, dict) else {r.index: r} for r in records]
+        index = list(members[0])
+        data = [
+            [[getattr(m[i], n) for n in HRU_STATE_NAMES] for i in index]
+            for m in members
+        ]
+        return cls(data, index=index)
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    def _row(self, index):
+        (rows,) = np.nonzero(self.index == index)
+        if len(rows) == 0:
+            raise KeyError(f"No HRU with index {index}.")
+        return rows[0]
+
+    def _col(self, name):
+        try:
+            return self.names.index(name)
+        except ValueError:
+            raise KeyError(f"No state variable named {name}.")
+
+    def member(self, i: int) -> "HRUStateArray":
+        """Return the states of one member."""
+        return HRUStateArray(self.data[i : i + 1], self.index, self.names, self.units)
+
+    def members(self) -> np.ndarray:
+        """Return an object array of single-member arrays."""
+        return _split_members(self)
+
+    def sel(self, names, hru=None) -> np.ndarray:
+        """Return the values of state variables.
+
+        Parameters
+        ----------
+        names : str, sequence of str
+          Name of one or more state variables.
+        hru : int, optional
+          HRU identifier. If None, values for all HRUs are returned.
+
+        Returns
+        -------
+        ndarray (member, [hru], [state])
+          State values. The state dimension is only present if `names` is a sequence.
+        """
+        cols = (
+            self._col(names) if isinstance(names, str) else list(map(self._col, names))
+        )
+        rows = slice(None) if hru is None else self._row(hru)
+        return self.data[:, rows][..., cols]
+
+    def replace(self, **values) -> "HRUStateArray":
+        """Return a copy with new values for some state variables.
+
+        Parameters
+        ----------
+        **values
+          New values keyed by state variable name, either one value per member (member,) applied to all HRUs, or one
+          value per member and HRU (member, hru).
+        """
+        data = self.data.copy()
+        for name, val in values.items():
+            val = np.asarray(val, dtype=float)
+            if val.ndim == 1:
+                val = val[:, np.newaxis]
+            data[:, :, self._col(name)] = val
+        return HRUStateArray(data, self.index, self.names, self.units)
+
+    def record(self, index: int = 1, member: int = 0) -> HRUState:
+        """Return the state of one HRU as an `HRUState` record."""
+        row = self.data[member, self._row(index)].tolist()
+        values = {n: v for (n, v) in zip(self.names, row) if n in HRU_STATE_NAMES}
+        return HRUState(index=int(index), **values)
+
+    def to_dict(self, member: int = 0) -> Dict[int, HRUState]:
+        """Return the states of one member as `HRUState` records keyed by HRU identifier."""
+        return {i: self.record(i, member) for i in self.index.tolist()}
+
+    def to_dataarray(self) -> xr.DataArray:
+        return xr.DataArray(
+            self.data,
+            dims=("member", "hru", "state"),
+            coords={"hru": self.index, "state": list(self.names)},
+            name="hru_state",
+        )
+
+    def to_rv(self, member: int = 0) -> str:
+        attributes = [raven_name(n) for n in self.names]
+        units = self.units or [_default_units(a) for a in attributes]
+        lines = [
+            ":HRUStateVariableTable",
+            "  :Attributes," + ",".join(attributes),
+            "  :Units," + ",".join(units),
+        ]
+        lines.extend(
+            f"  {i},{_join(row)}"
+            for (i, row) in zip(self.index.tolist(), self.data[member].tolist())
+        )
+        lines.append(":EndHRUStateVariableTable")
+        return "\n".join(lines) + "\n"
+
+
+class BasinStateArray(RavenConfig):
+    """Basin state variables of an ensemble of simulations.
+
+    Parameters
+    ----------
+    data : ndarray (member, basin)
+      Structured array with the `basin_state_dtype` fields. 1D arrays are interpreted as a single member.
+
+    Notes
+    -----
+    The RVC representation (`to_rv`) is the `:BasinStateVariables` block of the first member.
+    """
+
+    def __init__(self, data: np.ndarray):
+        data = np.asarray(data)
+        if data.dtype.names is None or set(data.dtype.names) != set(
+            basin_state_dtype().names
+        ):
+            raise ValueError("`data` should be a structured array of basin states.")
+        if data.ndim == 1:
+            data = data[np.newaxis]
+        if data.ndim != 2:
+            raise ValueError("`data` should have dimensions (member, basin).")
+        self.data = data
+
+    @staticmethod
+    def _common_dtype(arrays):
+        return basin_state_dtype(
+            max(a.dtype["name"].itemsize // 4 for a in arrays),
+            *[
+                max(a.dtype[key].shape[0] for a in arrays)
+                for key in ("qout", "qlat", "qin")
+            ],
+        )
+
+    @staticmethod
+    def _cast(array, dtype):
+        """Copy a structured array of basin states to a dtype with longer names or series."""
+        if array.dtype == dtype:
+            return array
+        out = np.zeros(array.shape, dtype=dtype)
+        for key in dtype.names:
+            if key in ("qout", "qlat", "qin"):
+                out[key] = np.nan
+                out[key][..., : array.dtype[key].shape[0]] = array[key]
+            else:
+                out[key] = array[key]
+        return out
+
+    @classmethod
+    def from_solutions(cls, solutions: Sequence[Solution]) -> "BasinStateArray":
+        """Stack the basin states of solutions, with one member per solution."""
+        arrays = [s.basin_states for s in solutions]
+        for a in arrays[1:]:
+            if not np.array_equal(a["index"], arrays[0]["index"]):
+                raise ValueError("Solutions do not have the same subbasins.")
+
+        dtype = cls._common_dtype(arrays)
+        return cls(np.stack([cls._cast(a, dtype) for a in arrays]))
+
+    @classmethod
+    def from_records(
+        cls, records: Sequence[Union[BasinIndexCommand, Dict[int, BasinIndexCommand]]]
+    ) -> "BasinStateArray":
+        """Create an array from `BasinIndexCommand` records.
+
+        Parameters
+        ----------
+        records : sequence
+          One `BasinIndexCommand`, or one dictionary of `BasinIndexCommand` keyed by subbasin identifier, per member.
+        """
+        if isinstance(records, (BasinIndexCommand, dict)):
+            records = [records]
+        members = [list(r.values()) if isinstance(r, dict) else [r] for r in records]
+        flat = [b for m in members for b in m]
+        if any(len(m) != len(members[0]) for m in members):
+            raise ValueError("Members do not have the same number of subbasins.")
+
+        dtype = basin_state_dtype(
+            max(len(b.name) for b in flat),
+            max(len(b.qout) for b in flat),
+            max(len(b.qlat) for b in flat),
+            max(len(b.qin) for b in flat),
+        )
+        out = np.zeros((len(members), len(members[0])), dtype=dtype)
+        for key in ("qout", "qlat", "qin"):
+            out[key] = np.nan
+
+        for (i, m) in enumerate(members):
+            for (j, b) in enumerate(m):
+                rec = out[i, j]
+                for key in ("index", "name", "channelstorage", "rivuletstorage"):
+                    rec[key] = getattr(b, key)
+                for key in ("qout", "qlat", "qin"):
+                    values = getattr(b, key)
+                    rec[key][: len(values)] = values
+                    rec[f"n{key}"] = len(values)
+                rec["qoutlast"] = b.qoutlast
+                rec["qlatlast"] = b.qlatlast
+
+        return cls(out)
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    @property
+    def index(self) -> np.ndarray:
+        """Subbasin identifiers."""
+        return self.data["index"][0]
+
+    def _col(self, index):
+        (cols,) = np.nonzero(self.index == index)
+        if len(cols) == 0:
+            raise KeyError(f"No subbasin with index {index}.")
+        return cols[0]
+
+    def member(self, i: int) -> "BasinStateArray":
+        """Return the states of one member."""
+        return BasinStateArray(self.data[i : i + 1])
+
+    def members(self) -> np.ndarray:
+        """Return an object array of single-member arrays."""
+        return _split_members(self)
+
+    def sel(self, name: str, basin=None) -> np.ndarray:
+        """Return the values of a state variable (e.g. `qout`) for all members.
+
+        Parameters
+        ----------
+        name : str
+          Field name.
+        basin : int, optional
+          Subbasin identifier. If None, values for all subbasins are returned.
+        """
+        values = self.data[name]
+        return values if basin is None else values[:, self._col(basin)]
+
+    def record(self, index: int = 1, member: int = 0) -> BasinIndexCommand:
+        """Return the state of one subbasin as a `BasinIndexCommand`."""
+        return to_basin_command(self.data[member, self._col(index)])
+
+    def to_dict(self, member: int = 0) -> Dict[int, BasinIndexCommand]:
+        """Return the states of one member as `BasinIndexCommand` keyed by subbasin identifier."""
+        return {i: self.record(i, member) for i in self.index.tolist()}
+
+    def to_rv(self, member: int = 0) -> str:
+        lines = [":BasinStateVariables"]
+        for rec in self.data[member]:
+            nqout, nqlat, nqin = int(rec["nqout"]), int(rec["nqlat"]), int(rec["nqin"])
+            qout = rec["qout"][:nqout].tolist() + [float(rec["qoutlast"])]
+            qlat = rec["qlat"][:nqlat].tolist() + [float(rec["qlatlast"])]
+            lines.extend(
+                [
+                    f"  :BasinIndex {rec['index']},{rec['name']}",
+                    f"    :ChannelStorage, {float(rec['channelstorage'])!r}",
+                    f"    :RivuletStorage, {float(rec['rivuletstorage'])!r}",
+                    f"    :Qout,{nqout},{_join(qout)}",
+                    f"    :Qlat,{nqlat},{_join(qlat)}",
+                    f"    :Qin ,{nqin},{_join(rec['qin'][:nqin].tolist())}",
+                ]
+            )
+        lines.append(":EndBasinStateVariables")
+        return "\n".join(lines) + "\n"
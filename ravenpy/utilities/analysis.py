@@ -2,7 +2,7 @@ import logging
 import math
 import tempfile
 from pathlib import Path
-from typing import List, Optional, Union
+from typing import List, Optional, Sequence, Union
 
 import numpy as np
 
@@ -11,6 +11,8 @@ from . import gis_import_error_message
 try:
     import rasterio
     from osgeo.gdal import Dataset, DEMProcessing
+    from rasterio.features import rasterize
+    from rasterio.windows import Window
     from shapely.geometry import GeometryCollection, MultiPolygon, Polygon, shape
 except (ImportError, ModuleNotFoundError) as e:
     msg = gis_import_error_message.format(Path(__file__).stem)
@@ -115,6 +117,170 @@ def dem_prop(
     return {"elevation": elevation.mean(), "slope": slope.mean(), "aspect": aspect_mean}
 
 
+def dem_zonal_stats(
+    dem: Union[str, Path],
+    geoms: Sequence[Union[Polygon, MultiPolygon]],
+    tile_size: int = 1024,
+    all_touched: bool = False,
+) -> dict:
+    """Return the mean elevation, slope and aspect of the DEM over many geometries at once.
+
+    The DEM is read in tiles covering the geometries. For each tile, the geometries are rasterized into a grid of
+    labels, the slope and aspect are computed with Horn's method, as in `gdal_slope_analysis` and
+    `gdal_aspect_analysis`, and the values are summed for each label. Memory use is set by the tile size, not by the
+    number of geometries or the size of the DEM.
+
+    Parameters
+    ----------
+    dem : Union[str, Path]
+      DEM raster in projected coordinates.
+    geoms : Sequence[Union[Polygon, MultiPolygon]]
+      Geometries, in the coordinates of the DEM, over which properties are computed. Geometries should not overlap:
+      each pixel is attributed to a single geometry.
+    tile_size : int
+      Width and height of the tiles [pixels].
+    all_touched : bool
+      If True, include all pixels touched by the geometries, otherwise only pixels whose center is within them.
+
+    Returns
+    -------
+    dict
+      Arrays of the mean elevation [m], slope [deg] and aspect [deg] of each geometry. Values are NaN for
+      geometries not covering any pixel.
+    """
+    geoms = [shape(g) for g in geoms]
+    n = len(geoms)
+    bounds = np.array([g.bounds for g in geoms]).reshape(n, 4)
+
+    # Sums and counts of the elevation, slope and aspect components for each label, 0 being outside the geometries.
+    sums = np.zeros((7, n + 1))
+
+    with rasterio.open(dem) as src:
+        xres, yres = src.res
+
+        # Only read the part of the raster covering the geometries.
+        r0, c0 = src.index(bounds[:, 0].min(), bounds[:, 3].max())
+        r1, c1 = src.index(bounds[:, 2].max(), bounds[:, 1].min())
+        r0, c0 = max(r0, 0), max(c0, 0)
+        r1, c1 = min(r1 + 1, src.height), min(c1 + 1, src.width)
+
+        for row in range(r0, r1, tile_size):
+            for col in range(c0, c1, tile_size):
+                win = Window(
+                    col, row, min(tile_size, c1 - col), min(tile_size, r1 - row)
+                )
+                transform = src.window_transform(win)
+                left, top = transform * (0, 0)
+                right, bottom = transform * (win.width, win.height)
+
+                # Geometries intersecting the tile.
+                inside = np.flatnonzero(
+                    (bounds[:, 0] <= right)
+                    & (bounds[:, 2] >= left)
+                    & (bounds[:, 1] <= top)
+                    & (bounds[:, 3] >= bottom)
+                )
+                if not len(inside):
+                    continue
+
+                labels = rasterize(
+                    ((geoms[i], i + 1) for i in inside),
+                    out_shape=(win.height, win.width),
+                    transform=transform,
+                    fill=0,
+                    all_touched=all_touched,
+                    dtype="int32",
+                )
+                if not labels.any():
+                    continue
+
+                # Read the tile with a one pixel halo, so that slopes are continuous across tiles.
+                hr0, hc0 = max(row - 1, 0), max(col - 1, 0)
+                hr1 = min(row + win.height + 1, src.height)
+                hc1 = min(col + win.width + 1, src.width)
+                z = src.read(
+                    1, window=Window(hc0, hr0, hc1 - hc0, hr1 - hr0), masked=True
+                )
+                z = z.astype(float).filled(np.nan)
+                slope, aspect = horn_slope_aspect(z, xres, yres)
+
+                crop = (
+                    slice(row - hr0, row - hr0 + win.height),
+                    slice(col - hc0, col - hc0 + win.width),
+                )
+                labels = labels.ravel()
+                z, slope, aspect = (a[crop].ravel() for a in (z, slope, aspect))
+
+                valid = ~np.isnan(z)
+                sums[0] += np.bincount(labels[valid], z[valid], n + 1)
+                sums[1] += np.bincount(labels[valid], None, n + 1)
+
+                valid = ~np.isnan(slope)
+                sums[2] += np.bincount(labels[valid], slope[valid], n + 1)
+                sums[3] += np.bincount(labels[valid], None, n + 1)
+
+                # The mean aspect is computed from the mean of its sine and cosine.
+                valid = ~np.isnan(aspect)
+                angles = np.radians(aspect[valid])
+                sums[4] += np.bincount(labels[valid], np.sin(angles), n + 1)
+                sums[5] += np.bincount(labels[valid], np.cos(angles), n + 1)
+                sums[6] += np.bincount(labels[valid], None, n + 1)
+
+    sums = sums[:, 1:]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        elevation = sums[0] / sums[1]
+        slope = sums[2] / sums[3]
+    aspect = np.degrees(np.arctan2(sums[4], sums[5])) % 360
+    aspect[sums[6] == 0] = np.nan
+
+    return {"elevation": elevation, "slope": slope, "aspect": aspect}
+
+
+def horn_slope_aspect(z: np.ndarray, xres: float, yres: float):
+    """Return the slope and aspect of the terrain using Horn's method, as computed by GDAL.
+
+    Parameters
+    ----------
+    z : np.ndarray
+      Elevation, with rows going from north to south. Missing values are NaN.
+    xres, yres : float
+      Size of the pixels along x and y, in the units of the elevation.
+
+    Returns
+    -------
+    slope, aspect : np.ndarray
+      Slope [deg] and aspect [deg] (0: North, 90: East, 180: South, 270: West). Values are NaN on the edges of the
+      array, where the 3x3 window is incomplete, and the aspect is NaN over flat terrain.
+    """
+    z = np.asarray(z, dtype=float)
+    slope = np.full(z.shape, np.nan)
+    aspect = np.full(z.shape, np.nan)
+    ny, nx = z.shape
+    if ny < 3 or nx < 3:
+        return slope, aspect
+
+    def w(i, j):
+        return z[i : ny - 2 + i, j : nx - 2 + j]
+
+    dx = ((w(0, 2) + 2 * w(1, 2) + w(2, 2)) - (w(0, 0) + 2 * w(1, 0) + w(2, 0))) / (
+        8 * abs(xres)
+    )
+    dy = ((w(2, 0) + 2 * w(2, 1) + w(2, 2)) - (w(0, 0) + 2 * w(0, 1) + w(0, 2))) / (
+        8 * abs(yres)
+    )
+
+    slope[1:-1, 1:-1] = np.degrees(np.arctan(np.hypot(dx, dy)))
+
+    with np.errstate(invalid="ignore"):
+        a = np.degrees(np.arctan2(dy, -dx))
+        a = np.where(a > 90, 450 - a, 90 - a)
+        a[a == 360] = 0
+        a[(dx == 0) & (dy == 0)] = np.nan
+    aspect[1:-1, 1:-1] = a
+
+    return slope, aspect
+
+
 def gdal_slope_analysis(
     dem: Union[str, Path],
     set_output: Optional[Union[str, Path]] = None,
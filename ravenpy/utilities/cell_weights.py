@@ -0,0 +1,215 @@
+"""
+Tools to average gridded data over polygons.
+
+Each grid cell is weighted by the area of its intersection with the polygon, so that cells partially covered by a
+polygon contribute in proportion to their coverage. Weights are computed once for a given grid and set of polygons
+and cached, keyed by a fingerprint of the grid coordinates and of the polygons. Averaging over many polygons is then a
+single sparse matrix product over the grid::
+
+    weights = cell_weights(geometries, ds.lon.values, ds.lat.values)
+    averages = weighted_mean(ds, weights, x_dim="lon", y_dim="lat")
+"""
+
+import collections
+import hashlib
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+import xarray as xr
+from scipy import sparse
+
+from . import gis_import_error_message
+
+try:
+    from shapely.geometry import box, shape
+    from shapely.prepared import prep
+except (ImportError, ModuleNotFoundError) as e:
+    msg = gis_import_error_message.format(Path(__file__).stem)
+    raise ImportError(msg) from e
+
+# Maximum number of weight tables kept in memory by `cell_weights`.
+CACHE_SIZE = 16
+
+_cache = collections.OrderedDict()
+
+
+def cell_edges(centers: np.ndarray) -> np.ndarray:
+    """Return the edges of grid cells given their centers, assuming edges are halfway between centers.
+
+    Parameters
+    ----------
+    centers : array
+      Monotonic 1D array of cell centers.
+
+    Returns
+    -------
+    array
+      Cell edges, with one more element than `centers`.
+    """
+    c = np.asarray(centers, dtype=float)
+    if c.size == 1:
+        return np.array([c[0] - 0.5, c[0] + 0.5])
+    mid = (c[1:] + c[:-1]) / 2
+    return np.concatenate([[2 * c[0] - mid[0]], mid, [2 * c[-1] - mid[-1]]])
+
+
+def grid_fingerprint(x: np.ndarray, y: np.ndarray) -> str:
+    """Return a hash identifying a grid from its cell center coordinates."""
+    h = hashlib.sha1()
+    for c in (x, y):
+        c = np.ascontiguousarray(c, dtype=float)
+        h.update(str(c.shape).encode())
+        h.update(c.tobytes())
+    return h.hexdigest()
+
+
+def _geometries_fingerprint(geoms) -> str:
+    h = hashlib.sha1()
+    for g in geoms:
+        h.update(g.wkb)
+    return h.hexdigest()
+
+
+def compute_cell_weights(geometries: Sequence, x: np.ndarray, y: np.ndarray):
+    """Return the area of the intersection of each polygon with each grid cell.
+
+    Parameters
+    ----------
+    geometries : sequence
+      Polygons, as shapely geometries or GeoJSON-like mappings, in the coordinates of the grid.
+    x, y : array
+      1D arrays of the cell centers along the x and y dimensions.
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix
+      Intersection areas (polygon, cell), with cells ordered as in an array of shape (y, x).
+    """
+    geoms = [g if hasattr(g, "wkb") else shape(g) for g in geometries]
+    xe, ye = cell_edges(x), cell_edges(y)
+
+    # Work with increasing edges, and map the indices back to the original order.
+    xi = np.arange(len(x)) if xe[0] < xe[-1] else np.arange(len(x))[::-1]
+    yi = np.arange(len(y)) if ye[0] < ye[-1] else np.arange(len(y))[::-1]
+    xe, ye = np.sort(xe), np.sort(ye)
+
+    rows, cols, vals = [], [], []
+    for k, geom in enumerate(geoms):
+        minx, miny, maxx, maxy = geom.bounds
+        i0, i1 = np.searchsorted(xe, [minx, maxx])
+        j0, j1 = np.searchsorted(ye, [miny, maxy])
+        prepared = prep(geom)
+
+        for j in range(max(j0 - 1, 0), min(j1, len(y))):
+            for i in range(max(i0 - 1, 0), min(i1, len(x))):
+                cell = box(xe[i], ye[j], xe[i + 1], ye[j + 1])
+                if prepared.contains(cell):
+                    area = cell.area
+                elif prepared.intersects(cell):
+                    area = geom.intersection(cell).area
+                else:
+                    continue
+                if area > 0:
+                    rows.append(k)
+                    cols.append(yi[j] * len(x) + xi[i])
+                    vals.append(area)
+
+    return sparse.csr_matrix((vals, (rows, cols)), shape=(len(geoms), len(x) * len(y)))
+
+
+def cell_weights(geometries: Sequence, x: np.ndarray, y: np.ndarray):
+    """Return the normalized weights of the grid cells for each polygon.
+
+    Weights are proportional to the area of the intersection of the cells with the polygon, and sum to one for each
+    polygon. Results are cached, keyed by the grid coordinates and the polygons.
+
+    Parameters
+    ----------
+    geometries : sequence
+      Polygons, as shapely geometries or GeoJSON-like mappings, in the coordinates of the grid.
+    x, y : array
+      1D arrays of the cell centers along the x and y dimensions.
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix
+      Weights (polygon, cell), with cells ordered as in an array of shape (y, x).
+    """
+    geoms = [g if hasattr(g, "wkb") else shape(g) for g in geometries]
+    key = (grid_fingerprint(x, y), _geometries_fingerprint(geoms))
+
+    w = _cache.get(key)
+    if w is None:
+        areas = compute_cell_weights(geoms, x, y)
+        total = np.asarray(areas.sum(axis=1)).ravel()
+        if (total == 0).any():
+            raise ValueError(
+                f"Polygons {np.flatnonzero(total == 0).tolist()} do not intersect the grid."
+            )
+        w = sparse.diags(1 / total) @ areas
+        w = w.tocsr()
+        _cache[key] = w
+    _cache.move_to_end(key)
+
+    while len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+
+    return w
+
+
+def clear_cache():
+    """Empty the cache of weights used by `cell_weights`."""
+    _cache.clear()
+
+
+def weighted_mean(
+    ds, weights, x_dim: str = "lon", y_dim: str = "lat", dim: str = "region"
+):
+    """Average gridded data over polygons in a single pass.
+
+    Parameters
+    ----------
+    ds : xarray.Dataset or xarray.DataArray
+      Gridded data. Variables that do not have both spatial dimensions are left unchanged.
+    weights : scipy.sparse matrix
+      Weights (polygon, cell), as returned by `cell_weights`.
+    x_dim, y_dim : str
+      Names of the spatial dimensions.
+    dim : str
+      Name of the polygon dimension of the output.
+
+    Returns
+    -------
+    xarray.Dataset or xarray.DataArray
+      Averages over each polygon, with the spatial dimensions replaced by `dim`. Missing values are excluded from the
+      average, and the weights of the remaining cells are normalized.
+    """
+    if isinstance(ds, xr.Dataset):
+        gridded = [v for v in ds.data_vars if {x_dim, y_dim} <= set(ds[v].dims)]
+        spatial = [k for (k, c) in ds.coords.items() if {x_dim, y_dim} & set(c.dims)]
+        out = ds.drop_vars(gridded + spatial)
+        for name in gridded:
+            out[name] = weighted_mean(ds[name], weights, x_dim, y_dim, dim)
+        return out
+
+    da = ds
+    other = [d for d in da.dims if d not in (x_dim, y_dim)]
+    values = da.transpose(*other, y_dim, x_dim).values
+    values = values.reshape(-1, da.sizes[x_dim] * da.sizes[y_dim]).T
+
+    valid = ~np.isnan(values)
+    total = weights @ np.where(valid, values, 0)
+    norm = weights @ valid.astype(float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / norm
+
+    shape = (weights.shape[0],) + tuple(da.sizes[d] for d in other)
+    coords = {k: c for (k, c) in da.coords.items() if not {x_dim, y_dim} & set(c.dims)}
+    return xr.DataArray(
+        mean.reshape(shape),
+        dims=(dim,) + tuple(other),
+        coords=coords,
+        attrs=da.attrs,
+        name=da.name,
+    ).transpose(*other, dim)
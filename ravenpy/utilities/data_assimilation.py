@@ -51,10 +51,10 @@ def assimilate(model, ts, q_obs, keys, basin_states, hru_states, days):
       Perturbed time series.
     keys : tuple
       Name of hru_state attributes to be assimilated, for example ("soil0", "soil1").
-    basin_states : sequence
-      Model initial conditions, BasinStateVariables instances.
-    hru_states : sequence
-      Model initial conditions, HRUStateVariables instances.
+    basin_states : sequence, BasinStateArray
+      Model initial conditions, BasinStateVariables instances or array with one member per ensemble member.
+    hru_states : sequence, HRUStateArray
+      Model initial conditions, HRUStateVariables instances or array with one member per ensemble member.
     ts : str, Path, list
       Input netCDF file names.
     days : datetime
@@ -77,10 +77,8 @@ def assimilate(model, ts, q_obs, keys, basin_states, hru_states, days):
     model(ts, hru_state=hru_states, basin_state=basin_states, nc_index=range(n_members))
 
     # Extract final states (n_states, n_members)
-    f_hru_states, f_basin_states = model.get_final_state()
-    x_matrix = np.array(
-        [[getattr(state, key) for key in keys] for state in f_hru_states]
-    ).T
+    f_hru_states, f_basin_states = model.get_final_state_arrays()
+    x_matrix = f_hru_states.sel(keys, hru=1).T
 
     # Sanity check
     if x_matrix.shape != (len(keys), n_members):
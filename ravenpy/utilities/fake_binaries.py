@@ -0,0 +1,808 @@
+"""
+Stand-in executables for Raven and Ostrich
+------------------------------------------
+
+Light-weight substitutes for the Raven and Ostrich binaries. They read the configuration files written by RavenPy and
+produce output files with the same names, layout and structure as the real executables, but without performing any
+hydrological computation. They are meant to test and benchmark the Python orchestration layer (directory setup,
+parallel launches, output parsing and merging) on machines where the real binaries are not installed.
+
+The stand-ins can be installed as the `ravenpy-fake-raven` and `ravenpy-fake-ostrich` console scripts, or written to
+any directory with :func:`write_fake_binaries`. To use them, point RavenPy to their location before importing
+`ravenpy.models`::
+
+    raven, ostrich = write_fake_binaries("/tmp/fake-bin")
+    os.environ["RAVENPY_RAVEN_BINARY_PATH"] = str(raven)
+    os.environ["RAVENPY_OSTRICH_BINARY_PATH"] = str(ostrich)
+
+The cost of each simulation can be tuned with the `RAVENPY_FAKE_RAVEN_SLEEP` environment variable, giving the number
+of seconds each fake Raven run waits before writing its outputs.
+
+Simulated flows are pseudo-random but deterministic: they only depend on the content of the configuration files, so
+that different parameter sets yield different results and identical parameter sets yield identical results.
+
+This module deliberately depends only on `numpy`, `netCDF4` and `cftime` so that launching a stand-in process stays
+cheap compared to the real models.
+"""
+import argparse
+import datetime as dt
+import os
+import re
+import shutil
+import stat
+import subprocess
+import sys
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cftime
+import netCDF4 as nc4
+import numpy as np
+
+__all__ = ["fake_ostrich", "fake_raven", "write_fake_binaries"]
+
+FAKE_RAVEN_VERSION = "3.0.1 rev#275"
+
+# Column names of the HRU state table, in the same order as `HRUStateVariableTableCommand.Record`.
+HRU_STATE_ATTRIBUTES = (
+    "SURFACE_WATER",
+    "ATMOSPHERE",
+    "ATMOS_PRECIP",
+    "PONDED_WATER",
+    "SOIL[0]",
+    "SOIL[1]",
+    "SOIL[2]",
+    "SOIL[3]",
+    "SNOW_TEMP",
+    "SNOW",
+    "SNOW_COVER",
+    "AET",
+    "CONVOLUTION[0]",
+    "CONVOLUTION[1]",
+) + tuple(f"CONV_STOR[{i}]" for i in range(100))
+
+_wrapper = """#!{python}
+# Stand-in for the {name} executable, generated by ravenpy.utilities.fake_binaries.
+import importlib.util
+import sys
+
+spec = importlib.util.spec_from_file_location("fake_binaries", {module!r})
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+sys.exit(module.{func}())
+"""
+
+
+def write_fake_binaries(path) -> Tuple[Path, Path]:
+    """Write executable stand-ins for Raven and Ostrich in the given directory.
+
+    The scripts load this module directly from its file, bypassing the `ravenpy` package initialization, to keep
+    their start-up time low.
+
+    Parameters
+    ----------
+    path : str or Path
+      Directory where the `raven` and `ostrich` scripts are written. Created if it does not exist.
+
+    Returns
+    -------
+    Path, Path
+      Paths to the Raven and Ostrich stand-in executables.
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+
+    out = []
+    for name, func in (("raven", "fake_raven"), ("ostrich", "fake_ostrich")):
+        fn = path / name
+        fn.write_text(
+            _wrapper.format(
+                python=sys.executable, name=name, module=__file__, func=func
+            )
+        )
+        fn.chmod(fn.stat().st_mode | stat.S_IEXEC)
+        out.append(fn)
+
+    return tuple(out)
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Raven
+# ---------------------------------------------------------------------------------------------------------------------
+
+
+def _commands(text: str):
+    """Yield (command, value) tuples for each `:Command value` line of a Raven configuration file."""
+    for line in text.splitlines():
+        line = line.split("#")[0].strip()
+        if line.startswith(":"):
+            cmd, *value = re.split(r"[\s,]+", line[1:], maxsplit=1)
+            yield cmd, value[0].strip() if value else ""
+
+
+def _table_rows(text: str, section: str) -> List[List[str]]:
+    """Return the data rows of a `:{section}` ... `:End{section}` table."""
+    rows = []
+    inside = False
+    for line in text.splitlines():
+        line = line.split("#")[0].strip()
+        if line.startswith(f":{section}"):
+            inside = True
+        elif line.startswith(f":End{section}"):
+            inside = False
+        elif inside and line and not line.startswith(":"):
+            rows.append(re.split(r"[\s,]+", line))
+    return rows
+
+
+def _parse_date(value: str, calendar: str):
+    return cftime.datetime(*map(int, re.findall(r"\d+", value)[:6]), calendar=calendar)
+
+
+def _time_step_days(value: str) -> float:
+    """Convert a Raven :TimeStep value (days or HH:MM:SS) to days."""
+    if ":" in value:
+        h, m, s = (float(v) for v in value.split(":"))
+        return (h * 3600 + m * 60 + s) / 86400.0
+    return float(value)
+
+
+def _parse_rvi(fn: Path) -> dict:
+    out = dict(
+        RunName="",
+        Calendar="standard",
+        StartDate=None,
+        EndDate=None,
+        Duration=None,
+        TimeStep="1.0",
+        EvaluationMetrics="",
+        SuppressOutput=False,
+        DontWriteWatershedStorage=False,
+    )
+    for cmd, value in _commands(fn.read_text()):
+        if cmd in ("SuppressOutput", "DontWriteWatershedStorage"):
+            out[cmd] = True
+        elif cmd in out:
+            out[cmd] = value
+
+    out["Calendar"] = out["Calendar"].lower() or "standard"
+    return out
+
+
+def _time_axis(rvi: dict):
+    """Return the start date, time step (days) and number of time steps of the simulation."""
+    calendar = rvi["Calendar"]
+    step = _time_step_days(rvi["TimeStep"])
+    start = _parse_date(rvi["StartDate"], calendar)
+
+    if rvi["EndDate"]:
+        end = _parse_date(rvi["EndDate"], calendar)
+        duration = (end - start).total_seconds() / 86400.0
+    else:
+        duration = float(rvi["Duration"] or 1)
+
+    return start, step, int(round(duration / step)) + 1
+
+
+def _read_observations(rvt_text: str, model_dir: Path) -> Dict[int, dict]:
+    """Return the :ObservationData HYDROGRAPH netCDF sources, keyed by subbasin ID."""
+    obs = {}
+    current = None
+    for cmd, value in _commands(rvt_text):
+        if cmd == "ObservationData":
+            kind, site, *_ = value.split()
+            current = dict(site=int(site)) if kind == "HYDROGRAPH" else None
+        elif current is not None and cmd in ("FileNameNC", "VarNameNC", "StationIdx"):
+            current[cmd] = value
+        elif cmd == "EndObservationData":
+            if current is not None and "FileNameNC" in current:
+                path = Path(current["FileNameNC"])
+                current["FileNameNC"] = path if path.is_absolute() else model_dir / path
+                obs[current["site"]] = current
+            current = None
+    return obs
+
+
+def _load_observations(source: dict, start, step: float, n: int) -> np.ndarray:
+    """Return the observed series aligned on the simulation time steps."""
+    out = np.full(n, np.nan)
+    with nc4.Dataset(source["FileNameNC"]) as ds:
+        var = ds.variables[source["VarNameNC"]]
+        data = np.ma.filled(var[:].astype(float), np.nan)
+        if data.ndim > 1:
+            # Time is the last dimension expected by Raven, but use the actual position.
+            axis = var.dimensions.index("time")
+            data = np.moveaxis(data, axis, -1).reshape(-1, data.shape[axis])
+            data = data[int(source.get("StationIdx", 1)) - 1]
+
+        t = ds.variables["time"]
+        calendar = getattr(t, "calendar", "standard")
+        dates = cftime.num2date(t[:], t.units, calendar)
+
+    units = f"days since {start.strftime('%Y-%m-%d %H:%M:%S')}"
+    offsets = cftime.date2num(dates, units, start.calendar) / step
+    i = np.round(offsets).astype(int)
+    valid = (i >= 0) & (i < n)
+    out[i[valid]] = data[valid]
+    return out
+
+
+def _nse(sim, obs):
+    return 1 - np.sum((sim - obs) ** 2) / np.sum((obs - obs.mean()) ** 2)
+
+
+def _kge(sim, obs):
+    r = np.corrcoef(sim, obs)[0, 1]
+    return 1 - np.sqrt(
+        (r - 1) ** 2
+        + (sim.std() / obs.std() - 1) ** 2
+        + (sim.mean() / obs.mean() - 1) ** 2
+    )
+
+
+_metrics = {
+    "NASH_SUTCLIFFE": _nse,
+    "LOG_NASH": lambda sim, obs: _nse(np.log(sim), np.log(obs)),
+    "RMSE": lambda sim, obs: np.sqrt(np.mean((sim - obs) ** 2)),
+    "PCT_BIAS": lambda sim, obs: 100 * np.sum(sim - obs) / np.sum(obs),
+    "ABSERR": lambda sim, obs: np.mean(np.abs(sim - obs)),
+    "ABSMAX": lambda sim, obs: np.max(np.abs(sim - obs)),
+    "PDIFF": lambda sim, obs: 100 * (sim.max() - obs.max()) / obs.max(),
+    "TMVOL": lambda sim, obs: 100 * (sim.mean() - obs.mean()) / obs.mean(),
+    "RCOEFF": lambda sim, obs: np.corrcoef(sim, obs)[0, 1],
+    "NSC": lambda sim, obs: float(np.sum(np.diff(np.sign(sim - obs)) != 0)),
+    "KLING_GUPTA": _kge,
+}
+
+
+def _simulate(rng, n: int, step: float, q_obs: Optional[np.ndarray]) -> np.ndarray:
+    """Return a pseudo-random hydrograph, close to the observations when they are available."""
+    t = np.arange(n) * step
+    seasonal = 1 + 0.8 * np.sin(2 * np.pi * t / 365.25 + rng.uniform(0, 2 * np.pi))
+    q = rng.uniform(5, 50) * seasonal * rng.lognormal(0, 0.1, n)
+
+    if q_obs is not None and np.isfinite(q_obs).any():
+        obs = np.where(np.isfinite(q_obs), q_obs, np.nanmean(q_obs))
+        w = rng.uniform(0.2, 0.9)
+        q = (
+            w * obs * rng.lognormal(0, 0.05, n)
+            + (1 - w) * q * np.nanmean(obs) / q.mean()
+        )
+
+    return q
+
+
+def _write_hydrographs(fn, start, step, q_sim, q_obs, names):
+    n, nb = q_sim.shape
+    with nc4.Dataset(fn, "w") as ds:
+        ds.createDimension("time", n)
+        ds.createDimension("nbasins", nb)
+
+        t = ds.createVariable("time", "f8", ("time",))
+        t.units = f"days since {start.strftime('%Y-%m-%d %H:%M:%S')}"
+        t.calendar = start.calendar
+        t[:] = np.arange(n) * step
+
+        bn = ds.createVariable("basin_name", str, ("nbasins",))
+        bn.long_name = "Name/ID of sub-basins with simulated outflows"
+        for i, name in enumerate(names):
+            bn[i] = name
+
+        v = ds.createVariable("q_sim", "f8", ("time", "nbasins"), fill_value=-9999.0)
+        v.units = "m**3 s**-1"
+        v.long_name = "Simulated outflows"
+        v[:] = q_sim
+
+        if q_obs is not None:
+            v = ds.createVariable(
+                "q_obs", "f8", ("time", "nbasins"), fill_value=-9999.0
+            )
+            v.units = "m**3 s**-1"
+            v.long_name = "Observed outflows"
+            v[:] = np.ma.masked_invalid(q_obs)
+
+        ds.title = "Simulated river discharge"
+        ds.history = f"Created by a Raven stand-in (version {FAKE_RAVEN_VERSION})"
+
+
+def _write_storage(fn, start, step, rng, n):
+    with nc4.Dataset(fn, "w") as ds:
+        ds.createDimension("time", n)
+        t = ds.createVariable("time", "f8", ("time",))
+        t.units = f"days since {start.strftime('%Y-%m-%d %H:%M:%S')}"
+        t.calendar = start.calendar
+        t[:] = np.arange(n) * step
+
+        total = np.zeros(n)
+        for name in ("Surface Water", "Snow", "Soil Water[0]", "Soil Water[1]"):
+            v = ds.createVariable(name, "f8", ("time",))
+            v.units = "mm"
+            v[:] = values = rng.uniform(0, 100) * (1 + 0.1 * rng.standard_normal(n))
+            total += values
+
+        v = ds.createVariable("Total", "f8", ("time",))
+        v.units = "mm"
+        v[:] = total
+
+
+def _write_solution(fn, end, rng, hru_ids, basins, q_last):
+    lines = [f":TimeStamp {end.strftime('%Y-%m-%d %H:%M:%S')}.00"]
+
+    lines.append(":HRUStateVariableTable")
+    lines.append("  :Attributes," + ",".join(HRU_STATE_ATTRIBUTES))
+    lines.append(
+        "  :Units,"
+        + ",".join("C" if a == "SNOW_TEMP" else "mm" for a in HRU_STATE_ATTRIBUTES)
+    )
+    for i in hru_ids:
+        values = np.zeros(len(HRU_STATE_ATTRIBUTES))
+        values[4:8] = rng.uniform(0, 300, 4)  # Soil stores
+        values[9] = rng.uniform(0, 50)  # Snow
+        lines.append(f"  {i}," + ",".join(map(repr, values.tolist())))
+    lines.append(":EndHRUStateVariableTable")
+
+    lines.append(":BasinStateVariables")
+    for (index, name), q in zip(basins, q_last):
+        lines.extend(
+            [
+                f"  :BasinIndex {index},{name}",
+                "    :ChannelStorage, 0.0",
+                "    :RivuletStorage, 0.0",
+                f"    :Qout,1,{q!r},{q!r}",
+                "    :Qlat,3,0.0,0.0,0.0,0.0",
+                "    :Qin ,20," + ",".join(["0.0"] * 20),
+            ]
+        )
+    lines.append(":EndBasinStateVariables")
+
+    Path(fn).write_text("\n".join(lines) + "\n")
+
+
+def _write_diagnostics(fn, metrics: Sequence[str], sources: dict, q_sim, q_obs):
+    header = ["observed data series", "filename"] + [f"DIAG_{m}" for m in metrics]
+    lines = [",".join(header) + ","]
+    for j, source in sources.items():
+        sim, obs = q_sim[:, j], q_obs[:, j]
+        valid = np.isfinite(obs)
+        values = []
+        for m in metrics:
+            func = _metrics.get(m)
+            with np.errstate(all="ignore"):
+                values.append(func(sim[valid], obs[valid]) if func else np.nan)
+        lines.append(
+            ",".join(
+                ["HYDROGRAPH", str(source["FileNameNC"])]
+                + [repr(float(v)) for v in values]
+            )
+            + ","
+        )
+    Path(fn).write_text("\n".join(lines) + "\n")
+
+
+def fake_raven(argv: Optional[Sequence[str]] = None) -> int:
+    """Entry point of the Raven stand-in.
+
+    Mimics the `raven <model name> -o <output directory>` command line.
+    """
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv:
+        print(f"Raven stand-in. Version {FAKE_RAVEN_VERSION} ")
+        return 0
+
+    parser = argparse.ArgumentParser(prog="raven")
+    parser.add_argument(
+        "name", help="Path to the model configuration, without extension."
+    )
+    parser.add_argument("-o", dest="output", default=".", help="Output directory.")
+    args, _ = parser.parse_known_args(argv)
+
+    name = Path(args.name)
+    output = Path(args.output)
+    output.mkdir(parents=True, exist_ok=True)
+    texts = {
+        ext: (name.parent / f"{name.name}.{ext}").read_text()
+        if (name.parent / f"{name.name}.{ext}").exists()
+        else ""
+        for ext in ("rvi", "rvp", "rvh", "rvt", "rvc")
+    }
+
+    # Include the time series files the main rvt redirects to.
+    for cmd, value in _commands(texts["rvt"]):
+        if cmd == "RedirectToFile":
+            fn = name.parent / value
+            if fn.exists():
+                texts["rvt"] += "\n" + fn.read_text()
+
+    rvi = _parse_rvi(name.parent / f"{name.name}.rvi")
+    prefix = f"{rvi['RunName']}_" if rvi["RunName"] else ""
+    start, step, n = _time_axis(rvi)
+
+    subbasins = _table_rows(texts["rvh"], "SubBasins") or [
+        ["1", "watershed", "-1", "NONE", "_AUTO", "1"]
+    ]
+    hru_ids = [int(r[0]) for r in _table_rows(texts["rvh"], "HRUs")] or [1]
+    gauged = [r for r in subbasins if r[-1] == "1"] or subbasins
+
+    # Seed depends on the model configuration, so that different parameters yield different outputs.
+    seed = zlib.crc32("".join(texts[ext] for ext in ("rvp", "rvh", "rvc")).encode())
+    rng = np.random.default_rng(seed)
+
+    sources = _read_observations(texts["rvt"], name.parent)
+    obs_sources = {}
+    q_obs = np.full((n, len(gauged)), np.nan)
+    for j, row in enumerate(gauged):
+        source = sources.get(int(row[0]))
+        if source is not None:
+            q_obs[:, j] = _load_observations(source, start, step, n)
+            obs_sources[j] = source
+
+    q_sim = np.stack(
+        [
+            _simulate(rng, n, step, q_obs[:, j] if j in obs_sources else None)
+            for j in range(len(gauged))
+        ],
+        axis=1,
+    )
+
+    time.sleep(float(os.getenv("RAVENPY_FAKE_RAVEN_SLEEP", 0)))
+
+    if not rvi["SuppressOutput"]:
+        _write_hydrographs(
+            output / f"{prefix}Hydrographs.nc",
+            start,
+            step,
+            q_sim,
+            q_obs if obs_sources else None,
+            [r[1] for r in gauged],
+        )
+        if not rvi["DontWriteWatershedStorage"]:
+            _write_storage(output / f"{prefix}WatershedStorage.nc", start, step, rng, n)
+
+        _write_solution(
+            output / f"{prefix}solution.rvc",
+            start + dt.timedelta(days=(n - 1) * step),
+            rng,
+            hru_ids,
+            [(r[0], r[1]) for r in subbasins],
+            [
+                q_sim[-1, gauged.index(r)] if r in gauged else rng.uniform(1, 10)
+                for r in subbasins
+            ],
+        )
+
+    metrics = rvi["EvaluationMetrics"].split()
+    if obs_sources and metrics:
+        _write_diagnostics(
+            output / f"{prefix}Diagnostics.csv", metrics, obs_sources, q_sim, q_obs
+        )
+
+    (output / "Raven_errors.txt").write_text(
+        f"Raven stand-in (version {FAKE_RAVEN_VERSION}): no hydrological computation performed.\n"
+        "SIMULATION COMPLETE\n"
+    )
+    return 0
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Ostrich
+# ---------------------------------------------------------------------------------------------------------------------
+
+
+def _parse_ostin(fn: Path) -> dict:
+    """Parse the subset of the `ostIn.txt` configuration used by RavenPy."""
+    out = dict(
+        ModelExecutable=None,
+        PreserveBestModel=None,
+        ModelSubdir="",
+        OstrichWarmStart=False,
+        RandomSeed=None,
+        CostFunction=None,
+        MaxIterations=50,
+        PerturbationValue=0.2,
+        UseInitialParamValues=False,
+        ExtraDirs=[],
+        FilePairs=[],
+        Params=[],
+        TiedParams=[],
+        ResponseVars=[],
+        TiedRespVars=[],
+    )
+    section = None
+    for line in fn.read_text().splitlines():
+        line = line.split("#")[0].strip()
+        if not line:
+            continue
+
+        key, *values = line.split()
+        if key.startswith("Begin"):
+            section = key[5:]
+            continue
+        if key.startswith("End"):
+            section = None
+            continue
+
+        if section == "ExtraDirs":
+            out["ExtraDirs"].append(key)
+        elif section == "FilePairs":
+            tpl, target = (v.strip() for v in line.split(";"))
+            out["FilePairs"].append((tpl, target))
+        elif section == "Params":
+            init, low, high = values[:3]
+            out["Params"].append((key, init, float(low), float(high)))
+        elif section == "TiedParams":
+            n = int(values[0])
+            parents = values[1 : n + 1]
+            kind = values[n + 1]
+            coefs = [float(c) for c in values[n + 2 :] if c != "free"]
+            out["TiedParams"].append((key, parents, kind, coefs))
+        elif section == "ResponseVars":
+            left, right = line.split(";", 1)
+            keyword, row, col, *token = right.split(maxsplit=3)
+            token = token[0].strip("'") if token else " "
+            out["ResponseVars"].append(
+                (key, left.split()[1], keyword, int(row), int(col), token)
+            )
+        elif section == "TiedRespVars":
+            n = int(values[0])
+            parents = values[1 : n + 1]
+            weights = [float(w) for w in values[n + 2 :]]
+            out["TiedRespVars"].append((key, parents, weights))
+        elif key in ("CostFunction", "MaxIterations", "PerturbationValue"):
+            out[key] = values[0]
+        elif key == "UseInitialParamValues":
+            out[key] = True
+        elif key in (
+            "ModelExecutable",
+            "PreserveBestModel",
+            "ModelSubdir",
+            "RandomSeed",
+        ):
+            out[key] = values[0] if values else ""
+        elif key == "OstrichWarmStart":
+            out[key] = values[0].lower() == "yes"
+
+    out["MaxIterations"] = int(out["MaxIterations"])
+    out["PerturbationValue"] = float(out["PerturbationValue"])
+    return out
+
+
+def _tied_value(kind: str, coefs: Sequence[float], x: Sequence[float]) -> float:
+    """Compute the value of a tied parameter from its parents, following Ostrich conventions."""
+    if kind == "linear":
+        if len(x) == 1:
+            c1, c0 = coefs
+            return c1 * x[0] + c0
+        c3, c2, c1, c0 = coefs
+        return c3 * x[0] * x[1] + c2 * x[1] + c1 * x[0] + c0
+    if kind == "ratio":
+        if len(coefs) == 4:
+            c3, c2, c1, c0 = coefs
+            return (c3 * x[0] + c2) / (c1 * x[0] + c0)
+        c5, c4, c3, c2, c1, c0 = coefs
+        return (c5 * x[0] + c4 * x[1] + c3) / (c2 * x[0] + c1 * x[1] + c0)
+    raise ValueError(f"Tied parameter type {kind} is not supported.")
+
+
+class _Evaluator:
+    """Write model input files from templates, run the model and read its responses."""
+
+    def __init__(self, config: dict, workdir: Path, log):
+        self.config = config
+        self.workdir = workdir
+        self.log = log
+        self.names = [p[0] for p in config["Params"]]
+        self.templates = [
+            ((workdir / tpl).read_text(), target) for tpl, target in config["FilePairs"]
+        ]
+
+        # Replace longer names first, so that `par_x1` does not match inside `par_x10`.
+        names = self.names + [t[0] for t in config["TiedParams"]]
+        self._pattern = re.compile(
+            "|".join(
+                rf"(?<![\w]){re.escape(n)}(?![\w])"
+                for n in sorted(names, key=len, reverse=True)
+            )
+        )
+
+    def values(self, x) -> Dict[str, float]:
+        values = dict(zip(self.names, map(float, x)))
+        for name, parents, kind, coefs in self.config["TiedParams"]:
+            values[name] = _tied_value(kind, coefs, [values[p] for p in parents])
+        return values
+
+    def __call__(self, x) -> float:
+        values = self.values(x)
+        for text, target in self.templates:
+            content = self._pattern.sub(lambda m: f"{values[m.group(0)]:.10g}", text)
+            (self.workdir / target).write_text(content)
+
+        subprocess.run(
+            self.config["ModelExecutable"],
+            shell=True,
+            cwd=self.workdir,
+            stdout=self.log,
+            stderr=subprocess.STDOUT,
+            check=True,
+        )
+        return self.cost()
+
+    def cost(self) -> float:
+        responses = {}
+        for name, filename, keyword, row, col, token in self.config["ResponseVars"]:
+            lines = (self.workdir / filename).read_text().splitlines()
+            start = 0
+            if keyword != "OST_NULL":
+                start = next(i for i, line in enumerate(lines) if keyword in line)
+            fields = (
+                lines[start + row].split(token)
+                if token.strip()
+                else lines[start + row].split()
+            )
+            responses[name] = float(fields[col - 1])
+
+        for name, parents, weights in self.config["TiedRespVars"]:
+            responses[name] = sum(w * responses[p] for p, w in zip(parents, weights))
+
+        return responses[self.config["CostFunction"]]
+
+
+def _dds(evaluate, low, high, x0, max_iterations, r, rng, history=()):
+    """Dynamically Dimensioned Search (Tolson & Shoemaker, 2007).
+
+    Yields the (parameters, cost) of each evaluation. The `history` of previous evaluations, if any, is used to
+    resume the search from the best parameter set found so far.
+    """
+    history = list(history)
+    if history:
+        x_best, f_best = min(history, key=lambda h: h[1])
+    else:
+        x_best, f_best = x0, evaluate(x0)
+        history.append((x_best, f_best))
+        yield x_best, f_best
+
+    span = high - low
+    n = len(low)
+    for i in range(len(history), max_iterations):
+        p = 1 - np.log(i) / np.log(max_iterations)
+        mask = rng.random(n) < p
+        if not mask.any():
+            mask[rng.integers(n)] = True
+
+        x = x_best.copy()
+        x[mask] += r * span[mask] * rng.standard_normal(mask.sum())
+
+        # Reflect perturbations that fall outside the bounds.
+        x = np.where(x < low, low + (low - x), x)
+        x = np.where(x > high, high - (x - high), x)
+        x = np.clip(x, low, high)
+
+        f = evaluate(x)
+        if f <= f_best:
+            x_best, f_best = x, f
+        yield x, f
+
+
+def _read_ostmodel(fn: Path) -> List[Tuple[np.ndarray, float]]:
+    if not fn.exists():
+        return []
+    data = np.atleast_2d(np.loadtxt(fn, skiprows=1))
+    return [(row[2:], row[1]) for row in data if row.size]
+
+
+def fake_ostrich(argv: Optional[Sequence[str]] = None) -> int:
+    """Entry point of the Ostrich stand-in.
+
+    Runs a DDS optimization as configured in the `ostIn.txt` file of the current directory, calling the model
+    executable for each evaluation and writing the `OstModel0.txt`, `OstOutput0.txt` and `OstErrors0.txt` files.
+    """
+    cwd = Path.cwd()
+    config = _parse_ostin(cwd / "ostIn.txt")
+    (cwd / "OstErrors0.txt").write_text("")
+
+    # Each Ostrich worker runs the model in its own copy of the model directory.
+    workdir = cwd
+    if config["ModelSubdir"]:
+        workdir = cwd / f"{config['ModelSubdir']}0"
+        if workdir.exists():
+            shutil.rmtree(workdir)
+        workdir.mkdir()
+        for d in config["ExtraDirs"]:
+            shutil.copytree(cwd / d, workdir / d, symlinks=True)
+        files = [config["ModelExecutable"], config["PreserveBestModel"]]
+        files += [tpl for tpl, _ in config["FilePairs"]]
+        for fn in filter(None, files):
+            shutil.copy2(cwd / fn, workdir / fn)
+
+    names = [p[0] for p in config["Params"]]
+    low = np.array([p[2] for p in config["Params"]])
+    high = np.array([p[3] for p in config["Params"]])
+
+    seed = int(config["RandomSeed"]) if config["RandomSeed"] else None
+    rng = np.random.default_rng(seed)
+
+    if config["UseInitialParamValues"]:
+        x0 = np.array(
+            [
+                float(p[1]) if p[1] != "random" else rng.uniform(p[2], p[3])
+                for p in config["Params"]
+            ]
+        )
+    else:
+        x0 = rng.uniform(low, high)
+
+    model_file = cwd / "OstModel0.txt"
+    history = _read_ostmodel(model_file) if config["OstrichWarmStart"] else []
+
+    best = min(history, key=lambda h: h[1]) if history else (None, np.inf)
+    with open(cwd / "OstExeOut.txt", "a") as log:
+        evaluate = _Evaluator(config, workdir, log)
+
+        def write_row(f, i, x, cost):
+            f.write(f"{i:<6d}{cost:.6E}  " + "  ".join(f"{v:.6E}" for v in x) + "\n")
+            f.flush()
+
+        try:
+            with open(model_file, "a" if history else "w") as f:
+                if not history:
+                    f.write("Run   obj.function  " + "  ".join(names) + "\n")
+                    f.flush()
+
+                i = len(history)
+                for x, cost in _dds(
+                    evaluate,
+                    low,
+                    high,
+                    x0,
+                    config["MaxIterations"],
+                    config["PerturbationValue"],
+                    rng,
+                    history,
+                ):
+                    i += 1
+                    write_row(f, i, x, cost)
+                    if cost <= best[1]:
+                        best = (x, cost)
+                        if config["PreserveBestModel"]:
+                            subprocess.run(
+                                config["PreserveBestModel"],
+                                shell=True,
+                                cwd=workdir,
+                                check=True,
+                            )
+
+                # Like Ostrich, leave the model files in the state of the optimal parameter set.
+                cost = evaluate(best[0])
+                write_row(f, i + 1, best[0], cost)
+
+        except (
+            subprocess.CalledProcessError,
+            OSError,
+            ValueError,
+            StopIteration,
+        ) as err:
+            (cwd / "OstErrors0.txt").write_text(f"OSTRICH ERROR: {err}\n")
+            return 1
+
+    width = max(map(len, names + ["Objective Function"]))
+    lines = [
+        "Ostrich stand-in",
+        f"Model executable : {config['ModelExecutable']}",
+        "Algorithm        : Dynamically Dimensioned Search Algorithm (DDS)",
+        "",
+        "Optimal Parameter Set",
+        f"{'Objective Function':<{width}} : {best[1]:.6E}",
+    ]
+    lines.extend(f"{name:<{width}} : {v:.6E}" for name, v in zip(names, best[0]))
+    lines.extend(
+        [
+            "",
+            "Algorithm Metrics",
+            f"Max Generations  : {config['MaxIterations']}",
+            f"Total Evals      : {i + 1}",
+            "",
+        ]
+    )
+    (cwd / "OstOutput0.txt").write_text("\n".join(lines))
+    return 0
@@ -0,0 +1,202 @@
+"""
+Local cache of forecast data.
+
+Forecasting and hindcasting experiments read the same forecasts over and over, for example the same GEPS forecast
+for every basin of an experiment. `ForecastCache` stores the forecast data subsetted over the bounding box of a
+region, for all members and forecast times, in compressed and chunked netCDF files in a local directory. Files are
+keyed by the source of the data (e.g. the CASPAR archive or the ECCC datamart, whose grids differ), the forecast
+model, the forecast date and the bounding box, and the least recently used files are removed when the cache exceeds
+its maximum size.
+
+The forecasting utilities use the cache set with the `RAVENPY_FORECAST_CACHE` environment variable, if any, with a
+maximum size in bytes set by `RAVENPY_FORECAST_CACHE_SIZE`.
+"""
+
+import datetime as dt
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Callable, Sequence, Union
+
+import pandas as pd
+import xarray as xr
+
+# Default maximum size of the cache [bytes].
+MAX_SIZE = 10 * 2**30
+
+
+class ForecastCache:
+    """Directory of forecast data subsetted over bounding boxes, with least recently used eviction.
+
+    Parameters
+    ----------
+    path : str, Path
+      Cache directory. It is created if it does not exist.
+    max_size : int
+      Maximum size of the files in the cache [bytes].
+    """
+
+    def __init__(self, path: Union[str, Path], max_size: int = MAX_SIZE):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_size = int(max_size)
+
+    def filename(
+        self, source: str, model: str, date: dt.datetime, bbox: Sequence[float]
+    ) -> Path:
+        """Return the path of the file storing a forecast.
+
+        Parameters
+        ----------
+        source : str
+          Source of the forecast data, e.g. "caspar" or "eccc".
+        model : str
+          Forecast model, e.g. "GEPS".
+        date : datetime
+          Forecast date.
+        bbox : sequence
+          Bounding box (min x, min y, max x, max y) of the subsetted forecast.
+        """
+        coords = ",".join(f"{c:.6f}" for c in bbox)
+        h = hashlib.sha1(coords.encode()).hexdigest()[:16]
+        return self.path / f"{source}_{model}_{pd.Timestamp(date):%Y%m%dT%H%M}_{h}.nc"
+
+    def __contains__(self, key) -> bool:
+        return self.filename(*key).exists()
+
+    def get(self, source: str, model: str, date: dt.datetime, bbox: Sequence[float]):
+        """Return a cached forecast loaded in memory, or None if it is not in the cache."""
+        fn = self.filename(source, model, date, bbox)
+        try:
+            with xr.open_dataset(fn) as ds:
+                out = ds.load()
+        except FileNotFoundError:
+            return None
+
+        # The modification time records the last use of the file.
+        try:
+            os.utime(fn)
+        except FileNotFoundError:
+            pass
+        return out
+
+    def put(
+        self,
+        ds: xr.Dataset,
+        source: str,
+        model: str,
+        date: dt.datetime,
+        bbox: Sequence[float],
+    ) -> xr.Dataset:
+        """Store a forecast in the cache and return it, loaded in memory.
+
+        Variables are compressed and chunked by member, so that members can be read independently.
+        """
+        ds = ds.load()
+
+        encoding = {}
+        for name, var in ds.data_vars.items():
+            if var.ndim:
+                encoding[name] = dict(
+                    zlib=True,
+                    complevel=1,
+                    chunksizes=tuple(
+                        1 if d == "member" else n for (d, n) in var.sizes.items()
+                    ),
+                )
+
+        # Write to a temporary file first, so that concurrent readers never see partial files.
+        fn = self.filename(source, model, date, bbox)
+        fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=self.path)
+        os.close(fd)
+        try:
+            out = ds.copy()
+            for var in out.variables.values():
+                var.encoding = {}
+            out.to_netcdf(tmp, encoding=encoding)
+            os.replace(tmp, fn)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+        self.evict(keep=fn)
+        return ds
+
+    def fetch(
+        self,
+        source: str,
+        model: str,
+        date: dt.datetime,
+        bbox: Sequence[float],
+        func: Callable[[], xr.Dataset],
+    ) -> xr.Dataset:
+        """Return a cached forecast, calling `func` to get it and storing the result if it is not in the cache."""
+        out = self.get(source, model, date, bbox)
+        if out is None:
+            out = self.put(func(), source, model, date, bbox)
+        return out
+
+    @property
+    def size(self) -> int:
+        """Total size of the files in the cache [bytes]."""
+        return sum(fn.stat().st_size for fn in self.path.glob("*.nc"))
+
+    def evict(self, keep: Path = None):
+        """Remove the least recently used files until the cache is smaller than its maximum size.
+
+        Parameters
+        ----------
+        keep : Path
+          File that should not be removed, e.g. the file that was just written.
+        """
+        files = []
+        for fn in self.path.glob("*.nc"):
+            try:
+                files.append((fn.stat(), fn))
+            except FileNotFoundError:
+                continue
+
+        total = sum(s.st_size for (s, _) in files)
+        for s, fn in sorted(files, key=lambda f: f[0].st_mtime):
+            if total <= self.max_size:
+                break
+            if fn == keep:
+                continue
+            try:
+                fn.unlink()
+            except FileNotFoundError:
+                pass
+            total -= s.st_size
+
+    def clear(self):
+        """Remove all files from the cache."""
+        for fn in self.path.glob("*.nc"):
+            fn.unlink()
+
+
+def default_cache():
+    """Return the cache set by the `RAVENPY_FORECAST_CACHE` environment variable, or None if it is not set."""
+    path = os.getenv("RAVENPY_FORECAST_CACHE")
+    if not path:
+        return None
+    return ForecastCache(path, int(os.getenv("RAVENPY_FORECAST_CACHE_SIZE", MAX_SIZE)))
+
+
+def fetch_forecast(cache, source, model, date, bbox, func: Callable[[], xr.Dataset]):
+    """Return `func()`, through `cache` if it is set.
+
+    Parameters
+    ----------
+    cache : ForecastCache, None or False
+      Forecast cache. If None, the default cache is used. If False, or if there is no default cache, `func` is called.
+    source, model, date, bbox
+      Key of the forecast, see `ForecastCache.filename`.
+    func : callable
+      Function returning the forecast.
+    """
+    if cache is None:
+        cache = default_cache()
+    if not cache:
+        return func()
+    return cache.fetch(source, model, date, bbox, func)
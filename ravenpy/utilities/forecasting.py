@@ -8,7 +8,7 @@ Created on Fri Jul 17 09:11:58 2020
 
 import datetime as dt
 import logging
-import re
+import os
 import warnings
 from pathlib import Path
 from typing import List, Tuple
@@ -20,9 +20,10 @@ import xarray as xr
 from climpred import HindcastEnsemble
 
 from . import gis_import_error_message
+from .cell_weights import cell_weights, weighted_mean
+from .forecast_cache import fetch_forecast
 
 try:
-    import rioxarray
     from clisops.core import subset
 except (ImportError, ModuleNotFoundError) as e:
     msg = gis_import_error_message.format(Path(__file__).stem)
@@ -30,6 +31,11 @@ except (ImportError, ModuleNotFoundError) as e:
 
 from ravenpy.models import get_model
 
+# Root of the THREDDS OPeNDAP server providing the forecasts. It can point to a local directory with the same layout.
+THREDDS_URL = os.getenv(
+    "RAVENPY_THREDDS_URL", "https://pavics.ouranos.ca/twitcher/ows/proxy/thredds/dodsC"
+)
+
 LOGGER = logging.getLogger("PYWPS")
 
 
@@ -78,6 +84,62 @@ def perform_forecasting_step(rvc, model, workdir=None, **kwds):
     return m.q_sim
 
 
+def perform_ensemble_forecast(model, rvc, forecast_ds, workdir=None, **kwds):
+    """
+    Run all the members of an ensemble forecast in parallel from the same initial states.
+
+    The forecast is written once to a single forcing file, and each member is run as one of the parallel
+    simulations of the model, selecting its member through `nc_index`.
+
+    Parameters
+    ----------
+    model : str or Raven
+      Model name, e.g. "GR4JCN", or model instance.
+    rvc : str or Path
+      Solution file with the initial states of the forecast, e.g. `model.outputs["solution"]` after warm-up.
+    forecast_ds : xarray.Dataset, str or Path
+      Forecast data with `member` and `time` dimensions, or path to a netCDF file holding it.
+    workdir : str or Path
+      Model working directory, if `model` is a name.
+    kwds : dict
+      Raven model configuration parameters, e.g. the parameters, the duration and the options of the forcing
+      variables (`pr={"deaccumulate": True}`).
+
+    Returns
+    -------
+    xarray.DataArray
+      Simulated streamflow of each member, with dimensions (member, time).
+    """
+    if isinstance(model, str):
+        model = get_model(model)(workdir=workdir)
+
+    if isinstance(forecast_ds, (str, Path)):
+        fn = Path(forecast_ds)
+        with xr.open_dataset(fn) as ds:
+            members = ds["member"].values
+    else:
+        extra = set(forecast_ds.dims) - {"member", "time"}
+        if extra:
+            raise ValueError(
+                f"Forecast should only have member and time dimensions, not {extra}."
+            )
+        members = forecast_ds["member"].values
+
+        # Write the forecast once, for all members.
+        model.workdir.mkdir(parents=True, exist_ok=True)
+        fn = model.workdir / "ensemble_forecast.nc"
+        forecast_ds.to_netcdf(fn)
+
+    # Force the initial conditions
+    model.resume(rvc)
+
+    # One parallel simulation per member, each one reading a different member of the forcing file.
+    model(ts=(fn,), nc_index=np.arange(len(members)), overwrite=True, **kwds)
+
+    q = model.q_sim.rename(nbasins="member")
+    return q.assign_coords(member=members).transpose("member", "time")
+
+
 def perform_climatology_esp(
     model_name, forecast_date, forecast_duration, workdir=None, **kwds
 ):
@@ -199,7 +261,7 @@ def perform_climatology_esp(
     return qsims
 
 
-def get_hindcast_day(region_coll, date, climate_model="GEPS"):
+def get_hindcast_day(region_coll, date, climate_model="GEPS", cache=None):
     """
     This function generates a forecast dataset that can be used to run raven.
     Data comes from the CASPAR archive and must be aggregated such that each file
@@ -208,12 +270,20 @@ def get_hindcast_day(region_coll, date, climate_model="GEPS"):
 
     The code takes the region shapefile, the forecast date required, and the
     climate_model to use, here GEPS by default, but eventually could be GEPS, GDPS, REPS or RDPS.
+
+    The forecast data over the bounding box of the region is stored in the forecast `cache`, so that
+    it is only downloaded once. See `ravenpy.utilities.forecast_cache.fetch_forecast`.
     """
 
-    # Get the file locations and filenames as a function of the climate model and date
-    [ds, times] = get_CASPAR_dataset(climate_model, date)
+    def fetch():
+        # Get the file locations and filenames as a function of the climate model and date
+        [ds, times] = get_CASPAR_dataset(climate_model, date)
+        return subset_forecast(ds, times, region_coll.bounds)
 
-    return get_subsetted_forecast(region_coll, ds, times, True)
+    ds = fetch_forecast(
+        cache, "caspar", climate_model, date, region_coll.bounds, fetch
+    )
+    return _region_average(region_coll, ds, True)
 
 
 def get_CASPAR_dataset(climate_model, date):
@@ -221,7 +291,7 @@ def get_CASPAR_dataset(climate_model, date):
 
     if climate_model == "GEPS":
         d = dt.datetime.strftime(date, "%Y%m%d")
-        file_url = f"https://pavics.ouranos.ca/twitcher/ows/proxy/thredds/dodsC/birdhouse/caspar/daily/GEPS_{d}.nc"
+        file_url = f"{THREDDS_URL}/birdhouse/caspar/daily/GEPS_{d}.nc"
         ds = xr.open_dataset(file_url)
         # Here we also extract the times at 6-hour intervals as Raven must have
         # constant timesteps and GEPS goes to 6 hours
@@ -243,7 +313,7 @@ def get_ECCC_dataset(climate_model):
     """Return latest GEPS forecast Dataset."""
     if climate_model == "GEPS":
         # Eventually the file will find a permanent home, until then let's use the test folder.
-        file_url = "https://pavics.ouranos.ca/twitcher/ows/proxy/thredds/dodsC/datasets/forecasts/eccc_geps/GEPS_latest.ncml"
+        file_url = f"{THREDDS_URL}/datasets/forecasts/eccc_geps/GEPS_latest.ncml"
 
         ds = xr.open_dataset(file_url)
         # Here we also extract the times at 6-hour intervals as Raven must have
@@ -262,7 +332,7 @@ def get_ECCC_dataset(climate_model):
     return ds, times
 
 
-def get_recent_ECCC_forecast(region_coll, climate_model="GEPS"):
+def get_recent_ECCC_forecast(region_coll, climate_model="GEPS", cache=None):
     """
     This function generates a forecast dataset that can be used to run raven.
     Data comes from the ECCC datamart and collected daily. It is aggregated
@@ -278,6 +348,8 @@ def get_recent_ECCC_forecast(region_coll, climate_model="GEPS"):
       The region vectors.
     climate_model : str
       Type of climate model, for now only "GEPS" is supported.
+    cache : ForecastCache, optional
+      Cache of the forecast data. See `ravenpy.utilities.forecast_cache.fetch_forecast`.
 
     Returns
     -------
@@ -288,7 +360,16 @@ def get_recent_ECCC_forecast(region_coll, climate_model="GEPS"):
 
     [ds, times] = get_ECCC_dataset(climate_model)
 
-    return get_subsetted_forecast(region_coll, ds, times, False)
+    # The latest forecast is identified by its first time step.
+    ds = fetch_forecast(
+        cache,
+        "eccc",
+        climate_model,
+        times[0],
+        region_coll.bounds,
+        lambda: subset_forecast(ds, times, region_coll.bounds),
+    )
+    return _region_average(region_coll, ds, False)
 
 
 def get_subsetted_forecast(region_coll, ds, times, is_caspar):
@@ -296,6 +377,10 @@ def get_subsetted_forecast(region_coll, ds, times, is_caspar):
     This function takes a dataset, a region and the time sampling array and returns
     the subsetted values for the given region and times
 
+    Values are averaged over each region, weighting the grid cells by the area of their intersection
+    with the region. The weights are cached, so that successive forecasts on the same grid and regions
+    do not need to compute them again.
+
     Parameters
     ----------
     region_coll : fiona.collection.Collection
@@ -311,46 +396,59 @@ def get_subsetted_forecast(region_coll, ds, times, is_caspar):
     Returns
     -------
     forecast : xararray.Dataset
-      The forecast dataset.
+      The forecast dataset. If the collection holds more than one region, the forecast has a `region`
+      dimension, following the order of the regions in the collection.
 
     """
+    ds = subset_forecast(ds, times, region_coll.bounds)
+    return _region_average(region_coll, ds, is_caspar)
+
+
+def subset_forecast(ds, times, bounds):
+    """
+    Subset the forecast data over a bounding box and the forecast times.
+
+    Parameters
+    ----------
+    ds : xarray.Dataset
+      The dataset containing the raw, worldwide forecast data
+    times: dt.datetime
+      The array of times required to do the forecast.
+    bounds : sequence
+      The bounding box (lon_min, lat_min, lon_max, lat_max) of the region.
+
+    Returns
+    -------
+    xarray.Dataset
+      The precipitation and temperature forecasts over the bounding box.
+    """
     # Extract the bounding box to subset the entire forecast grid to something
     # more manageable
-    lon_min = region_coll.bounds[0]
-    lon_max = region_coll.bounds[2]
-    lat_min = region_coll.bounds[1]
-    lat_max = region_coll.bounds[3]
+    lon_min = bounds[0]
+    lon_max = bounds[2]
+    lat_min = bounds[1]
+    lat_max = bounds[3]
 
     # Subset the data to the desired location (bounding box) and times
-    ds = subset.subset_bbox(
-        ds, lon_bnds=[lon_min, lon_max], lat_bnds=[lat_min, lat_max]
+    return subset.subset_bbox(
+        ds[["tas", "pr"]], lon_bnds=[lon_min, lon_max], lat_bnds=[lat_min, lat_max]
     ).sel(time=times)
 
-    # Rioxarray requires CRS definitions for variables
-    # Get CRS, e.g. 4326
-    crs = int(re.match(r"epsg:(\d+)", region_coll.crs["init"]).group(1))
 
-    # Here the name of the variable could differ based on the Caspar file processing
-    tas = ds.tas.rio.write_crs(crs)
-    pr = ds.pr.rio.write_crs(crs)
-    ds = xr.merge([tas, pr])
+def _region_average(region_coll, ds, is_caspar):
+    """Average the forecast over the regions."""
+    # Average the values over the basin contour, weighting each grid cell by the fraction of its area within the
+    # basin. The weights are only computed the first time a grid and basin are seen.
+    xdim, ydim = ("rlon", "rlat") if is_caspar else ("lon", "lat")
+    ds = ds.copy()
+    ds[xdim] = ds[xdim] - 360
 
-    # Now apply the mask of the basin contour and average the values to get a single time series
-    if is_caspar:
-        ds.rio.set_spatial_dims("rlon", "rlat")
-        ds["rlon"] = ds["rlon"] - 360
-        # clip the netcdf and average across space.
-        shdf = [next(iter(region_coll))["geometry"]]
-        forecast = ds.rio.clip(shdf, crs=crs)
-        forecast = forecast.mean(dim={"rlat", "rlon"}, keep_attrs=True)
+    geoms = [f["geometry"] for f in region_coll]
+    weights = cell_weights(geoms, ds[xdim].values, ds[ydim].values)
+    forecast = weighted_mean(ds, weights, x_dim=xdim, y_dim=ydim, dim="region")
 
-    else:
-        ds.rio.set_spatial_dims("lon", "lat")
-        ds["lon"] = ds["lon"] - 360
-        # clip the netcdf and average across space.
-        shdf = [next(iter(region_coll))["geometry"]]
-        forecast = ds.rio.clip(shdf, crs=crs)
-        forecast = forecast.mean(dim={"lat", "lon"}, keep_attrs=True)
+    if len(geoms) == 1:
+        forecast = forecast.isel(region=0, drop=True)
 
     return forecast
 
@@ -3,20 +3,30 @@ Tools for performing geospatial translations and transformations.
 """
 
 import collections
+import contextlib
+import functools
 import json
 import logging
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Union
+from typing import Callable, List, Sequence, Union
+
+import numpy as np
 
 from . import gis_import_error_message
 
 try:
     import fiona
     import rasterio
+    import rasterio.features
     import rasterio.mask
     import rasterio.vrt
     import rasterio.warp
-    from pyproj import CRS
+    import shapely
+    from pyproj import CRS, Transformer
+    from rasterio.windows import Window
     from shapely.geometry import (
         GeometryCollection,
         MultiPolygon,
@@ -33,6 +43,41 @@ RASTERIO_TIFF_COMPRESSION = "lzw"
 LOGGER = logging.getLogger("RavenPy")
 WGS84 = 4326
 
+# Maximum number of CRS transformers kept in memory by `get_transformer`.
+TRANSFORMER_CACHE_SIZE = 32
+
+
+@functools.lru_cache(maxsize=TRANSFORMER_CACHE_SIZE)
+def _transformer(source, target) -> Transformer:
+    return Transformer.from_crs(source, target, always_xy=True)
+
+
+def get_transformer(
+    source_crs: Union[str, int, dict, CRS], target_crs: Union[str, int, dict, CRS]
+) -> Transformer:
+    """Return the transformer from one projection to another, with x, y coordinates.
+
+    Transformers are expensive to create, so they are cached by source and target projection and shared by all
+    calls.
+
+    Parameters
+    ----------
+    source_crs : Union[str, int, dict, CRS]
+      Projection identifier of the source coordinates.
+    target_crs : Union[str, int, dict, CRS]
+      Projection identifier of the target coordinates.
+
+    Returns
+    -------
+    Transformer
+    """
+    # Dictionaries are not hashable.
+    source, target = (
+        CRS.from_user_input(c) if isinstance(c, dict) else c
+        for c in (source_crs, target_crs)
+    )
+    return _transformer(source, target)
+
 
 def geom_transform(
     geom: Union[GeometryCollection, shape],
@@ -58,21 +103,7 @@ def geom_transform(
       Reprojected geometry.
     """
     try:
-        from functools import partial
-
-        from pyproj import Transformer  # noqa
-
-        if isinstance(source_crs, int or str):
-            source = CRS.from_epsg(source_crs)
-        else:
-            source = source_crs
-
-        if isinstance(target_crs, int or str):
-            target = CRS.from_epsg(target_crs)
-        else:
-            target = target_crs
-
-        transform_func = Transformer.from_crs(source, target, always_xy=True)
+        transform_func = get_transformer(source_crs, target_crs)
         reprojected = transform(transform_func.transform, geom)
 
         return reprojected
@@ -82,6 +113,52 @@ def geom_transform(
         raise Exception(msg)
 
 
+def geoms_transform(
+    geoms: Sequence,
+    source_crs: Union[str, int, CRS] = WGS84,
+    target_crs: Union[str, int, CRS] = None,
+):
+    """Change the projection of many geometries at once.
+
+    With shapely 2, the coordinates of all two-dimensional geometries are reprojected in a single call to the
+    transformer. Otherwise, geometries are reprojected one by one, with the same transformer.
+
+    Parameters
+    ----------
+    geoms : Sequence
+      Source geometries, e.g. a list of geometries or a `geopandas.GeoSeries`.
+    source_crs : Union[str, int, CRS]
+      Projection identifier (proj4) for the source geometries.
+    target_crs : Union[str, int, CRS]
+      Projection identifier (proj4) for the target geometries.
+
+    Returns
+    -------
+    list or GeoSeries
+      Reprojected geometries. A GeoSeries is returned for a GeoSeries, with the same index and the target CRS.
+    """
+    if target_crs is None:
+        raise ValueError("No target CRS is defined.")
+
+    tr = get_transformer(source_crs, target_crs)
+
+    arr = np.empty(len(geoms), dtype=object)
+    arr[:] = list(geoms)
+
+    if hasattr(shapely, "transform") and not shapely.has_z(arr).any():
+
+        def func(coords):
+            return np.column_stack(tr.transform(coords[:, 0], coords[:, 1]))
+
+        out = list(shapely.transform(arr, func))
+    else:
+        out = [transform(tr.transform, geom) for geom in arr]
+
+    if hasattr(geoms, "crs"):
+        return type(geoms)(out, index=geoms.index, crs=target_crs)
+    return out
+
+
 def generic_raster_clip(
     raster: Union[str, Path],
     output: Union[str, Path],
@@ -90,10 +167,16 @@ def generic_raster_clip(
     fill_with_nodata: bool = True,
     padded: bool = True,
     raster_compression: str = RASTERIO_TIFF_COMPRESSION,
+    tile_size: int = None,
+    workers: int = None,
 ) -> None:
     """
     Crop a raster file to a given geometry.
 
+    By default, the cropped raster is read and written at once. If `tile_size` is set, it is processed in square
+    tiles instead, so that memory use depends on the tile size rather than on the size of the cropped raster, and
+    only the source blocks intersecting the geometry are read.
+
     Parameters
     ----------
     raster : Union[str, Path]
@@ -110,6 +193,10 @@ def generic_raster_clip(
       Whether or not to add a half-pixel buffer to shape before masking
     raster_compression : str
       Level of data compression. Default: 'lzw'.
+    tile_size : int, optional
+      Size of the tiles [pixels], a multiple of 16. The output is written as a tiled GeoTIFF.
+    workers : int, optional
+      Number of threads processing tiles concurrently. Default: 1.
 
     Returns
     -------
@@ -118,6 +205,19 @@ def generic_raster_clip(
     if not isinstance(geometry, collections.abc.Iterable):
         geometry = [geometry]
 
+    if tile_size is not None:
+        return _tiled_raster_clip(
+            raster,
+            output,
+            geometry,
+            touches,
+            fill_with_nodata,
+            padded,
+            raster_compression,
+            tile_size,
+            workers,
+        )
+
     with rasterio.open(raster, "r") as src:
         mask_image, mask_affine = rasterio.mask.mask(
             src,
@@ -148,10 +248,16 @@ def generic_raster_warp(
     output: Union[str, Path],
     target_crs: Union[str, dict, CRS],
     raster_compression: str = RASTERIO_TIFF_COMPRESSION,
+    tile_size: int = None,
+    workers: int = None,
 ) -> None:
     """
     Reproject a raster file.
 
+    By default, the reprojected raster is computed and written at once. If `tile_size` is set, it is computed in
+    square tiles of the target grid instead, each tile reading only the source blocks it covers, so that memory use
+    depends on the tile size rather than on the size of the raster.
+
     Parameters
     ----------
     raster : Union[str, Path]
@@ -162,11 +268,20 @@ def generic_raster_warp(
       Target projection identifier.
     raster_compression: str
       Level of data compression. Default: 'lzw'.
+    tile_size : int, optional
+      Size of the tiles [pixels], a multiple of 16. The output is written as a tiled GeoTIFF.
+    workers : int, optional
+      Number of threads processing tiles concurrently. Default: 1.
 
     Returns
     -------
     None
     """
+    if tile_size is not None:
+        return _tiled_raster_warp(
+            raster, output, target_crs, raster_compression, tile_size, workers
+        )
+
     with rasterio.open(raster, "r") as src:
         # Reproject raster using WarpedVRT class
         with rasterio.vrt.WarpedVRT(src, crs=target_crs) as vrt:
@@ -193,6 +308,182 @@ def generic_raster_warp(
                 dst.write(data)
 
 
+class _ThreadDatasets:
+    """Raster datasets opened once per thread, as rasterio datasets should not be shared between threads.
+
+    Parameters
+    ----------
+    opener : Callable
+      Function opening the datasets, given an `ExitStack` closing them when the `_ThreadDatasets` is closed.
+    """
+
+    def __init__(self, opener: Callable):
+        self._opener = opener
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stack = contextlib.ExitStack()
+
+    def get(self):
+        ds = getattr(self._local, "ds", None)
+        if ds is None:
+            with self._lock:
+                ds = self._local.ds = self._opener(self._stack)
+        return ds
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._stack.close()
+
+
+def _write_tiles(
+    output: Union[str, Path],
+    meta: dict,
+    tile_size: int,
+    read_tile: Callable,
+    workers: int = None,
+) -> None:
+    """Write a raster tile by tile.
+
+    Parameters
+    ----------
+    output : Union[str, Path]
+      Path to output raster.
+    meta : dict
+      Output raster profile.
+    tile_size : int
+      Size of the tiles [pixels].
+    read_tile : Callable
+      Function returning the data of a window of the output raster. With more than one worker, it is called
+      concurrently from different threads.
+    workers : int
+      Number of threads.
+    """
+    if tile_size % 16:
+        raise ValueError("The tile size should be a multiple of 16.")
+
+    # Align the GeoTIFF blocks on the tiles, so that each block is only written once.
+    block = math.gcd(tile_size, 256)
+    meta = dict(meta, driver="GTiff", tiled=True, blockxsize=block, blockysize=block)
+
+    windows = [
+        Window(
+            col,
+            row,
+            min(tile_size, meta["width"] - col),
+            min(tile_size, meta["height"] - row),
+        )
+        for row in range(0, meta["height"], tile_size)
+        for col in range(0, meta["width"], tile_size)
+    ]
+
+    with rasterio.open(output, "w", **meta) as dst:
+        lock = threading.Lock()
+
+        def process(window):
+            data = read_tile(window)
+            with lock:
+                dst.write(data, window=window)
+
+        if workers is None or workers <= 1:
+            for window in windows:
+                process(window)
+        else:
+            with ThreadPoolExecutor(workers) as executor:
+                for _ in executor.map(process, windows):
+                    pass
+
+
+def _tiled_raster_clip(
+    raster,
+    output,
+    geometry,
+    touches,
+    fill_with_nodata,
+    padded,
+    raster_compression,
+    tile_size,
+    workers,
+) -> None:
+    """Crop a raster file to a given geometry, tile by tile. See `generic_raster_clip`."""
+    with rasterio.open(raster, "r") as src:
+        # Same crop window as `rasterio.mask.mask`.
+        pad = 0.5 if padded else 0
+        crop = rasterio.features.geometry_window(src, geometry, pad_x=pad, pad_y=pad)
+        meta = src.meta.copy()
+        meta.update(
+            {
+                "height": int(crop.height),
+                "width": int(crop.width),
+                "transform": src.window_transform(crop),
+                "compress": raster_compression,
+            }
+        )
+        nodata = src.nodata if src.nodata is not None else 0
+
+    def opener(stack):
+        return stack.enter_context(rasterio.open(raster, "r"))
+
+    with _ThreadDatasets(opener) as sources:
+
+        def read_tile(window):
+            src = sources.get()
+            src_window = Window(
+                crop.col_off + window.col_off,
+                crop.row_off + window.row_off,
+                window.width,
+                window.height,
+            )
+            data = src.read(window=src_window)
+            if fill_with_nodata:
+                outside = rasterio.features.geometry_mask(
+                    geometry,
+                    out_shape=data.shape[1:],
+                    transform=src.window_transform(src_window),
+                    all_touched=touches,
+                )
+                data[:, outside] = nodata
+            return data
+
+        _write_tiles(output, meta, tile_size, read_tile, workers)
+
+
+def _tiled_raster_warp(
+    raster, output, target_crs, raster_compression, tile_size, workers
+) -> None:
+    """Reproject a raster file, tile by tile. See `generic_raster_warp`."""
+    with rasterio.open(raster, "r") as src:
+        affine, width, height = rasterio.warp.calculate_default_transform(
+            src.crs, target_crs, src.width, src.height, *src.bounds
+        )
+        meta = src.meta.copy()
+        meta.update(
+            {
+                "height": height,
+                "width": width,
+                "transform": affine,
+                "crs": target_crs,
+                "compress": raster_compression,
+            }
+        )
+
+    def opener(stack):
+        src = stack.enter_context(rasterio.open(raster, "r"))
+        # The virtual raster has the grid of the output, so that reading a window only warps the source blocks it
+        # covers.
+        return stack.enter_context(
+            rasterio.vrt.WarpedVRT(
+                src, crs=target_crs, transform=affine, width=width, height=height
+            )
+        )
+
+    with _ThreadDatasets(opener) as vrts:
+        _write_tiles(
+            output, meta, tile_size, lambda w: vrts.get().read(window=w), workers
+        )
+
+
 def generic_vector_reproject(
     vector: Union[str, Path],
     projected: Union[str, Path],
@@ -228,17 +519,24 @@ def generic_vector_reproject(
     for i, layer_name in enumerate(fiona.listlayers(vector)):
         with fiona.open(vector, "r", layer=i) as src:
             with open(projected, "w") as sink:
-                for feature in src:
-                    # Perform vector reprojection using Shapely on each feature
-                    try:
-                        geom = shape(feature["geometry"])
-                        transformed = geom_transform(geom, source_crs, target_crs)
-                        feature["geometry"] = mapping(transformed)
-                        output["features"].append(feature)
-                    except Exception as err:
-                        LOGGER.exception(
-                            "{}: Unable to reproject feature {}".format(err, feature)
+                features = list(src)
+                # Reproject the geometries of all features at once
+                try:
+                    transformed = geoms_transform(
+                        [shape(feature["geometry"]) for feature in features],
+                        source_crs,
+                        target_crs,
+                    )
+                except Exception as err:
+                    LOGGER.exception(
+                        "{}: Unable to reproject features of layer {}".format(
+                            err, layer_name
                         )
-                        raise
+                    )
+                    raise
+
+                for feature, geom in zip(features, transformed):
+                    feature["geometry"] = mapping(geom)
+                    output["features"].append(feature)
 
                 sink.write(f"{json.dumps(output)}")
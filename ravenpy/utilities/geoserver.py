@@ -15,15 +15,14 @@ from urllib.parse import urljoin
 
 from requests import Request
 
-from . import gis_import_error_message
+from . import gis_import_error_message, http_cache
+from .network import RiverNetwork
 
 try:
     import fiona
     import pandas as pd
     from lxml import etree
     from owslib.fes import PropertyIsLike
-    from owslib.wcs import WebCoverageService
-    from owslib.wfs import WebFeatureService
     from shapely.geometry import Point, shape
 except (ImportError, ModuleNotFoundError) as e:
     msg = gis_import_error_message.format(Path(__file__).stem)
@@ -71,13 +70,27 @@ def _get_location_wfs(
       A GML-encoded vector feature.
 
     """
-    wfs = WebFeatureService(url=urljoin(geoserver, "wfs"), version="1.1.0", timeout=30)
-    resp = wfs.getfeature(
-        typename=layer, bbox=coordinates, srsname="urn:x-ogc:def:crs:EPSG:4326"
+    (left, down, right, up) = coordinates
+
+    # The request is built directly rather than through `owslib`, which fetches the server capabilities first. The
+    # bounding box CRS is given explicitly so that its coordinates are in (lon, lat) order.
+    params = dict(
+        service="WFS",
+        version="1.1.0",
+        request="GetFeature",
+        typename=layer,
+        bbox=f"{left},{down},{right},{up},EPSG:4326",
+        srsname="urn:x-ogc:def:crs:EPSG:4326",
+    )
+    return http_cache.get(
+        urljoin(geoserver, "wfs"), params, timeout=30, check=_check_ows_exception
     )
 
-    data = resp.read()
-    return data
+
+def _check_ows_exception(data: bytes):
+    """Raise an error if a response from the GeoServer is an exception report."""
+    if b"ExceptionReport" in data[:1024]:
+        raise ChildProcessError(data)
 
 
 def _get_feature_attributes_wfs(
@@ -160,35 +173,22 @@ def _determine_upstream_ids(
       Basins ids including `fid` and its upstream contributors.
     """
 
-    def upstream_ids(bdf, bid):
-        return bdf[bdf[downstream_field] == bid][basin_field]
-
     # Note: Hydro Routing `SubId` is a float for some reason and Python float != GeoServer double. Cast them to int.
     if isinstance(fid, float):
         fid = int(fid)
         df[basin_field] = df[basin_field].astype(int)
         df[downstream_field] = df[downstream_field].astype(int)
 
-    # Locate the downstream feature
-    ds = df.set_index(basin_field).loc[fid]
+    # Find upstream basins, using the index of the network links, which is only built once per table.
+    net = RiverNetwork.from_dataframe(df, basin_field, downstream_field)
+    up = df[df[basin_field].isin(net.upstream_ids(fid))]
+
     if basin_family is not None:
-        # Do a first selection on the main basin ID of the downstream feature.
-        sub = df[df[basin_family] == ds[basin_family]]
-    else:
-        sub = None
-
-    # Find upstream basins
-    up = [fid]
-    for b in up:
-        tmp = upstream_ids(sub if sub is not None else df, b)
-        if len(tmp):
-            up.extend(tmp)
-
-    return (
-        sub[sub[basin_field].isin(up)]
-        if sub is not None
-        else df[df[basin_field].isin(up)]
-    )
+        # Only keep basins sharing the main basin ID of the downstream feature.
+        family = df.loc[df[basin_field] == fid, basin_family].iloc[0]
+        up = up[up[basin_family] == family]
+
+    return up
 
 
 def get_raster_wcs(
@@ -226,29 +226,30 @@ def get_raster_wcs(
     else:
         x, y = "E", "N"
 
-    wcs = WebCoverageService(url=urljoin(geoserver, "ows"), version="2.0.1")
-
-    try:
-        resp = wcs.getCoverage(
-            identifier=[layer],
-            format="image/tiff",
-            subsets=[(x, left, right), (y, down, up)],
-            timeout=120,
-        )
-
-    except Exception as e:
-        raise Exception(e)
+    params = [
+        ("service", "WCS"),
+        ("version", "2.0.1"),
+        ("request", "GetCoverage"),
+        ("CoverageID", layer),
+        ("format", "image/tiff"),
+        ("subset", f"{x}({left},{right})"),
+        ("subset", f"{y}({down},{up})"),
+    ]
+    return http_cache.get(
+        urljoin(geoserver, "ows"), params, timeout=120, check=_check_wcs_response
+    )
 
-    data = resp.read()
 
+def _check_wcs_response(data: bytes):
+    """Raise an error if a WCS response is not a raster."""
     try:
         etree.fromstring(data)
-        # The response is an XML file describing the server error.
-        raise ChildProcessError(data)
-
     except etree.XMLSyntaxError:
         # The response is the DEM array.
-        return data
+        return
+
+    # The response is an XML file describing the server error.
+    raise ChildProcessError(data)
 
 
 # ~~~~ HydroBASINS functions ~~~~ #
@@ -5,8 +5,13 @@ The following graphs can be plotted:
     - hydrograph
     - mean_annual_hydrograph
     - spaghetti_annual_hydrograph
+
+Long series are decimated before being drawn (see `decimate`), and ensembles can be drawn as quantile bands instead of
+one line per member.
 """
 
+from typing import Sequence, Tuple
+
 import numpy as np
 import pandas as pd
 import xarray as xr
@@ -18,18 +23,115 @@ from ravenpy.utilities.mk_test import mk_test_calc
 
 # TODO: Review docstrings, ensure numpydoc convention compliance
 
+# Maximum number of points drawn per line, about twice the width of a figure in pixels.
+MAX_POINTS = 4000
+
+
+def decimate(x, y, max_points: int = MAX_POINTS) -> Tuple[np.ndarray, np.ndarray]:
+    """Reduce the number of points of a line without changing its shape on screen.
+
+    The line is split into buckets of consecutive points, about one per pixel, and only the minimum and maximum of each
+    bucket are kept, so that peaks and troughs are still drawn.
+
+    Parameters
+    ----------
+    x : array_like
+      Coordinates along the line, e.g. dates.
+    y : array_like
+      Values, with the coordinate along the first axis. For 2-D values, the extremes of every line are kept.
+    max_points : int
+      Maximum number of points per line. Lines with fewer points are returned unchanged.
+
+    Returns
+    -------
+    x, y
+      Coordinates and values of the points kept.
+    """
+    y = np.asarray(y)
+    n = len(y)
+    if n <= max_points:
+        return x, y
+
+    nb = max(max_points // 2, 1)
+    edges = np.linspace(0, n, nb + 1).astype(int)
+    bucket = np.repeat(np.arange(nb), np.diff(edges))
+
+    keep = [[0, n - 1]]
+    for col in y.reshape(n, -1).T:
+        nan = np.isnan(col)
+        # Sort by bucket, then by value: the minimum comes first in each bucket, and the maximum last.
+        imin = np.lexsort((np.where(nan, np.inf, col), bucket))[edges[:-1]]
+        imax = np.lexsort((np.where(nan, -np.inf, col), bucket))[edges[1:] - 1]
+        keep.extend([imin, imax])
+
+    idx = np.unique(np.concatenate(keep))
+    return x[idx], y[idx]
+
+
+def quantile_bands(da: xr.DataArray, dim, quantiles: Sequence[float]) -> xr.DataArray:
+    """Return the quantiles of an ensemble, computed once to draw them as bands.
+
+    Parameters
+    ----------
+    da : xr.DataArray
+      Ensemble values.
+    dim : str or sequence of str
+      Ensemble dimensions, e.g. "member".
+    quantiles : sequence of float
+      Quantiles, in increasing order.
 
-def hydrograph(file_list):
+    Returns
+    -------
+    xr.DataArray
+      Quantiles, along a `quantile` dimension.
+    """
+    return da.quantile(quantiles, dim=dim, skipna=True)
+
+
+def _plot_bands(ax, x, bands: xr.DataArray, color, label: str = None):
+    """Fill the area between symmetric quantiles, and draw the median quantile, if any, as a line.
+
+    Bands are drawn for each series along the dimensions other than `quantile` and the first remaining one, along
+    `x`. Returns the artist holding the label: the median line, or the outer band, of the first series.
+    """
+    q = bands.transpose("quantile", ...).values
+    n = len(q)
+    q = q.reshape(n, q.shape[1], -1)
+
+    artists = []
+    for k in range(q.shape[2]):
+        for i in range(n // 2):
+            artists.append(
+                ax.fill_between(
+                    x, q[i, :, k], q[n - 1 - i, :, k], color=color, alpha=0.2, lw=0
+                )
+            )
+        if n % 2:
+            artists.extend(ax.plot(x, q[n // 2, :, k], linewidth=2, color=color))
+
+    labelled = artists[n // 2 if n % 2 else 0]
+    labelled.set_label(label)
+    return labelled
+
+
+def _open(file, variables: Sequence[str]) -> xr.Dataset:
+    """Load the given variables of a Raven output file, if present, without reading the others."""
+    with xr.open_dataset(file) as ds:
+        return ds[[v for v in variables if v in ds.data_vars]].load()
+
+
+def hydrograph(file_list, max_points=MAX_POINTS):
     """
     annual_hydrograph
 
     INPUTS:
         file_list -- Raven output files containing simulated streamflows
+        max_points -- Maximum number of points drawn per line, see `decimate`
 
     Create a graphic of the hydrograph for each model simulation.
     """
 
-    ds = [xr.open_dataset(file) for file in file_list]
+    ds = [_open(file, ("q_sim", "q_obs", "basin_name")) for file in file_list]
 
     # Get time data for the plot
     dates = pd.DatetimeIndex(ds[0].time.values)
@@ -43,12 +145,14 @@ def hydrograph(file_list):
     # Plot the observed streamflows if available
     if hasattr(ds[0], "q_obs"):
         q_obs = ds[0].q_obs
-        plt.plot(dates, q_obs, linewidth=2, label="obs")
+        plt.plot(*decimate(dates, q_obs, max_points), linewidth=2, label="obs")
 
     # Plot the simulated streamflows for each hydrological model
     q_sim = [h.q_sim for h in ds]
     for sim in q_sim:
-        plt.plot(dates, sim, linewidth=2, label="sim: " + basin_name)
+        plt.plot(
+            *decimate(dates, sim, max_points), linewidth=2, label="sim: " + basin_name
+        )
 
     # plt.xlim([first_date, last_date])
     plt.ylim(bottom=0, top=None)
@@ -79,7 +183,7 @@ def mean_annual_hydrograph(file_list):
     """
 
     # Time series for the plot
-    ds = [xr.open_dataset(file) for file in file_list]
+    ds = [_open(file, ("q_sim", "q_obs", "basin_name")) for file in file_list]
 
     # Get time data for the plot
     dates = pd.DatetimeIndex(ds[0].time.values)
@@ -139,19 +243,20 @@ def mean_annual_hydrograph(file_list):
     return fig
 
 
-def spaghetti_annual_hydrograph(file):
+def spaghetti_annual_hydrograph(file, quantiles=None):
     """
     spaghetti_annual_hydrograph
 
     INPUTS:
         file -- Raven output file containing simulated streamflows of one model
+        quantiles -- Quantiles of the yearly hydrographs drawn as bands instead of one line per year
 
     Create a spaghetti plot of the mean hydrological cycle for one model
     simulations. The mean simulation is also displayed.
     """
 
     # Time series for the plot
-    ds = xr.open_dataset(file)
+    ds = _open(file, ("q_sim", "q_obs", "basin_name"))
 
     # Get time data for the plot
     dates = pd.DatetimeIndex(ds.time.values)
@@ -168,13 +273,17 @@ def spaghetti_annual_hydrograph(file):
         mah_obs = q_obs.groupby("time.year")
         mah_obs_mean = q_obs.groupby("time.dayofyear").mean()
 
-        for year in mah_obs.groups.keys():
-            plt.plot(
-                np.arange(1, q_obs.values[mah_obs.groups[year]].shape[0] + 1, 1),
-                q_obs.values[mah_obs.groups[year]],
-                linewidth=1,
-                color="C0",
-            )
+        if quantiles is not None:
+            bands = q_obs.groupby("time.dayofyear").quantile(quantiles, skipna=True)
+            _plot_bands(ax, bands.dayofyear, bands, "C0")
+        else:
+            for year in mah_obs.groups.keys():
+                plt.plot(
+                    np.arange(1, q_obs.values[mah_obs.groups[year]].shape[0] + 1, 1),
+                    q_obs.values[mah_obs.groups[year]],
+                    linewidth=1,
+                    color="C0",
+                )
 
         plt.plot(
             mah_obs_mean.dayofyear, mah_obs_mean, linewidth=2, color="C0", label="obs"
@@ -185,13 +294,17 @@ def spaghetti_annual_hydrograph(file):
     mah_sim = q_sim.groupby("time.year")
     mah_sim_mean = q_sim.groupby("time.dayofyear").mean()
 
-    for year in mah_sim.groups.keys():
-        plt.plot(
-            np.arange(1, q_sim.values[mah_sim.groups[year]].shape[0] + 1, 1),
-            q_sim.values[mah_sim.groups[year]],
-            linewidth=1,
-            color="C1",
-        )
+    if quantiles is not None:
+        bands = q_sim.groupby("time.dayofyear").quantile(quantiles, skipna=True)
+        _plot_bands(ax, bands.dayofyear, bands, "C1")
+    else:
+        for year in mah_sim.groups.keys():
+            plt.plot(
+                np.arange(1, q_sim.values[mah_sim.groups[year]].shape[0] + 1, 1),
+                q_sim.values[mah_sim.groups[year]],
+                linewidth=1,
+                color="C1",
+            )
 
     plt.plot(
         mah_sim_mean.dayofyear,
@@ -367,7 +480,7 @@ def ts_fit_graph(ts, params):
     return fig
 
 
-def forecast(file, fcst_var="q_sim"):
+def forecast(file, fcst_var="q_sim", quantiles=None):
     """Return forecast graphic.
     Create a graphic of the hydrograph for each member
 
@@ -377,9 +490,11 @@ def forecast(file, fcst_var="q_sim"):
       Raven output file containing simulated streamflows.
     fcst_var : str
       Name of the streamflow variable.
+    quantiles : sequence of float, optional
+      Quantiles of the members drawn as bands instead of one line per member.
     """
 
-    ds = xr.open_dataset(file)
+    ds = _open(file, (fcst_var,))
 
     # Get time data for the plot
     dates = pd.DatetimeIndex(ds.time.values)
@@ -389,7 +504,12 @@ def forecast(file, fcst_var="q_sim"):
     fig, ax = plt.subplots()  # initialize figure
 
     # Plot the simulated streamflows for each hydrological model
-    ds[fcst_var].plot.line("b", x="time", add_legend=False)
+    da = ds[fcst_var]
+    if quantiles is not None:
+        members = [d for d in da.dims if d != "time"]
+        _plot_bands(ax, dates, quantile_bands(da, members, quantiles), "b")
+    else:
+        da.plot.line("b", x="time", add_legend=False)
 
     # plt.xlim([first_date, last_date])
     ax.set_xlabel("Time")
@@ -403,7 +523,7 @@ def forecast(file, fcst_var="q_sim"):
     return fig
 
 
-def hindcast(file, fcst_var, qobs, qobs_var):
+def hindcast(file, fcst_var, qobs, qobs_var, quantiles=None):
     """Return forecast graphic.
     Create a graphic of the hydrograph for each member
 
@@ -417,10 +537,12 @@ def hindcast(file, fcst_var, qobs, qobs_var):
       Streamflow observation file, with times matching the hindcast
     qobs_var : str
       Nname of the streamflow observation variable.
+    quantiles : sequence of float, optional
+      Quantiles of the members drawn as bands instead of one line per member.
     """
 
-    ds = xr.open_dataset(file)
-    ds2 = xr.open_dataset(qobs)
+    ds = _open(file, (fcst_var,))
+    ds2 = _open(qobs, (qobs_var,))
 
     # Get time data for the plot
     dates = pd.DatetimeIndex(ds.time.values)
@@ -430,7 +552,13 @@ def hindcast(file, fcst_var, qobs, qobs_var):
     fig, ax = plt.subplots()  # initialize figure
 
     # Plot the simulated streamflows for each hydrological model
-    hh = ds[fcst_var].plot.line("b", x="time", label="Hindcasts")
+    da = ds[fcst_var]
+    if quantiles is not None:
+        members = [d for d in da.dims if d != "time"]
+        bands = quantile_bands(da, members, quantiles)
+        hh = [_plot_bands(ax, dates, bands, "b", label="Hindcasts")]
+    else:
+        hh = da.plot.line("b", x="time", label="Hindcasts")
     ho = ds2[qobs_var].plot.line("r", label="Observations")
 
     # plt.xlim([first_date, last_date])
@@ -0,0 +1,147 @@
+"""
+HTTP requests to remote data services.
+
+Requests go through a shared `requests.Session`, so that connections to a server are kept alive and reused across
+requests instead of being opened for each request. Responses can also be stored in an on-disk `ResponseCache`,
+keyed by the request URL and parameters, so that requests repeated within the cache lifetime are not sent again.
+
+The response cache is opt-in: it is used when passed explicitly, or when the `RAVENPY_HTTP_CACHE` environment variable
+is set to the cache directory. The lifetime of cached responses is set in seconds by `RAVENPY_HTTP_CACHE_TTL`.
+"""
+
+import functools
+import hashlib
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Mapping, Optional, Sequence, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Default lifetime of cached responses [s].
+TTL = 24 * 3600
+
+# Maximum number of connections kept alive per host.
+POOL_SIZE = 16
+
+
+@functools.lru_cache(maxsize=None)
+def session() -> requests.Session:
+    """Return the session shared by all requests."""
+    s = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    return s
+
+
+def request_url(url: str, params: Union[Mapping, Sequence, None] = None) -> str:
+    """Return the URL of a GET request, with the parameters sorted so that identical requests share their URL."""
+    items = sorted(params.items() if isinstance(params, Mapping) else params or ())
+    return requests.Request("GET", url=url, params=items).prepare().url
+
+
+class ResponseCache:
+    """Directory of HTTP response bodies, expiring after a given time.
+
+    Parameters
+    ----------
+    path : str, Path
+      Cache directory. It is created if it does not exist.
+    ttl : float
+      Lifetime of the cached responses [s].
+    """
+
+    def __init__(self, path: Union[str, Path], ttl: float = TTL):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+
+    def filename(self, url: str, params: Union[Mapping, Sequence, None] = None) -> Path:
+        """Return the path of the file storing the response to a request."""
+        h = hashlib.sha256(request_url(url, params).encode()).hexdigest()
+        return self.path / h
+
+    def get(
+        self, url: str, params: Union[Mapping, Sequence, None] = None
+    ) -> Optional[bytes]:
+        """Return the cached response to a request, or None if it is not in the cache or has expired."""
+        fn = self.filename(url, params)
+        try:
+            if time.time() - fn.stat().st_mtime > self.ttl:
+                return None
+            return fn.read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def put(self, url: str, params: Union[Mapping, Sequence, None], data: bytes):
+        """Store the response to a request."""
+        fn = self.filename(url, params)
+
+        # Write to a temporary file first, so that concurrent readers never see partial files.
+        fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=self.path)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, fn)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def clear(self):
+        """Remove all responses from the cache."""
+        for fn in self.path.iterdir():
+            fn.unlink()
+
+
+def default_cache() -> Optional[ResponseCache]:
+    """Return the cache set by the `RAVENPY_HTTP_CACHE` environment variable, or None if it is not set."""
+    path = os.getenv("RAVENPY_HTTP_CACHE")
+    if not path:
+        return None
+    return ResponseCache(path, float(os.getenv("RAVENPY_HTTP_CACHE_TTL", TTL)))
+
+
+def get(
+    url: str,
+    params: Union[Mapping, Sequence, None] = None,
+    timeout: float = 30,
+    cache: Union[ResponseCache, None, bool] = None,
+    check: Callable[[bytes], None] = None,
+) -> bytes:
+    """Return the body of the response to a GET request.
+
+    Parameters
+    ----------
+    url : str
+      Request URL.
+    params : mapping or sequence
+      Request parameters, as a mapping or as a sequence of (name, value) pairs if a name is repeated.
+    timeout : float
+      Time to wait for the server [s].
+    cache : ResponseCache, None or False
+      Response cache. If None, the default cache is used, if any. If False, the response is not cached.
+    check : callable
+      Function raising an error if the response is invalid, e.g. when a server reports errors with a successful HTTP
+      status. Invalid responses are not cached.
+    """
+    if cache is None:
+        cache = default_cache()
+
+    if cache:
+        data = cache.get(url, params)
+        if data is not None:
+            return data
+
+    resp = session().get(url, params=params, timeout=timeout)
+    resp.raise_for_status()
+    data = resp.content
+
+    if check is not None:
+        check(data)
+
+    if cache:
+        cache.put(url, params, data)
+    return data
@@ -53,48 +53,115 @@ def mk_test_calc(x: np.array, alpha: float = 0.05) -> Tuple[str, float, float, f
     Examples
     --------
     >>> x = np.random.rand(100)
-    >>> trend, h, p, z = mk_test(x,0.05)
+    >>> trend, h, p, z = mk_test_calc(x,0.05)
     """
-    n = len(x)
-
-    # calculate S
-    s = 0
-    for k in range(n - 1):
-        for j in range(k + 1, n):
-            s += np.sign(x[j] - x[k])
-
-    # calculate the unique data
-    unique_x = np.unique(x)
-    g = len(unique_x)
-
-    # calculate the var(s)
-    if n == g:  # there is no tie
-        var_s = (n * (n - 1) * (2 * n + 5)) / 18
-    else:  # there are some ties in data
-        tp = np.zeros(unique_x.shape)
-        for i in range(len(unique_x)):
-            tp[i] = sum(x == unique_x[i])
-        var_s = (n * (n - 1) * (2 * n + 5) - np.sum(tp * (tp - 1) * (2 * tp + 5))) / 18
-
-    if s > 0:
-        z = (s - 1) / np.sqrt(var_s)
-    elif s < 0:
-        z = (s + 1) / np.sqrt(var_s)
-    else:  # s == 0:
-        z = 0
+    trend, h, p, z = mk_test_batch(np.asarray(x)[np.newaxis], alpha=alpha)
+    return str(trend[0]), h[0], p[0], z[0]
+
+
+def mk_test_batch(
+    x: np.array, alpha: float = 0.05, axis: int = -1
+) -> Tuple[np.array, np.array, np.array, np.array]:
+    """Mann-Kendall test of many series at once.
+
+    The series are tested in one pass, for example the streamflow statistics of every basin or every ensemble member.
+    See `mk_test_calc` for details on the test.
+
+    Parameters
+    ----------
+    x: np.array
+      Series along `axis`.
+    alpha: float
+      significance level (0.05 default)
+    axis: int
+      Axis along which the series are tested (last axis by default).
+
+    Returns
+    -------
+    Tuple[np.array, np.array, np.array, np.array]
+      trend, h, p and z arrays, of the shape of `x` without `axis`.
+    """
+    x = np.moveaxis(np.asarray(x), axis, -1)
+    shape = x.shape[:-1]
+    x = x.reshape(-1, x.shape[-1])
+    n = x.shape[1]
+
+    s, tp = kendall_s(x)
+
+    # calculate the var(s), removing the contribution of ties
+    ties = np.sum(tp * (tp - 1) * (2 * tp + 5), axis=1)
+    var_s = (n * (n - 1) * (2 * n + 5) - ties) / 18
+
+    z = np.zeros(len(x))
+    np.divide(s - np.sign(s), np.sqrt(var_s), out=z, where=s != 0)
 
     # calculate the p_value
     p = 2 * (1 - norm.cdf(abs(z)))  # two tail test
     h = abs(z) > norm.ppf(1 - alpha / 2)
 
-    if (z < 0) and h:
-        trend = "decreasing"
-    elif (z > 0) and h:
-        trend = "increasing"
-    else:
-        trend = "no trend"
+    trend = np.full(len(x), "no trend", dtype="<U10")
+    trend[(z < 0) & h] = "decreasing"
+    trend[(z > 0) & h] = "increasing"
+
+    return tuple(a.reshape(shape) for a in (trend, h, p, z))
+
+
+def kendall_s(x: np.array) -> Tuple[np.array, np.array]:
+    """Compute the Mann-Kendall S statistic of series.
+
+    S is the number of pairs of values increasing over time minus the number of pairs decreasing over time. Instead of
+    comparing all pairs, the values of each series are sorted with a bottom-up merge sort, counting the pairs out of
+    order at each merge, which takes O(n log(n)) operations.
+
+    Parameters
+    ----------
+    x: np.array
+      Series along the last axis, 2-D.
+
+    Returns
+    -------
+    Tuple[np.array, np.array]
+      S for each series, and the number of occurrences of each value, 0-padded to the length of the series.
+    """
+    m, n = x.shape
+
+    # Dense ranks of the values, equal for ties, and the number of values of each rank.
+    order = np.argsort(x, axis=1, kind="stable")
+    xs = np.take_along_axis(x, order, axis=1)
+    new = np.ones(xs.shape, dtype=bool)
+    new[:, 1:] = xs[:, 1:] != xs[:, :-1]
+    sorted_ranks = np.cumsum(new, axis=1) - 1
+    ranks = np.empty_like(sorted_ranks)
+    np.put_along_axis(ranks, order, sorted_ranks, axis=1)
+    row = np.arange(m)[:, np.newaxis]
+    tp = np.bincount((sorted_ranks + row * n).ravel(), minlength=m * n).reshape(m, n)
+
+    # Pairs i < j with x[i] > x[j], counted while merging blocks of width w. Series are padded to a power of 2 with a
+    # rank above all others, which adds no such pairs.
+    size = 1 << max(n - 1, 0).bit_length()
+    a = np.full((m, size), n, dtype=np.int64)
+    a[:, :n] = ranks
+    inversions = np.zeros(m, dtype=np.int64)
+    w = 1
+    while w < size:
+        blocks = a.reshape(-1, 2, w)
+        nb = len(blocks)
+        # Offset ranks by block so that the left halves, sorted within blocks, are sorted globally.
+        base = np.arange(nb)[:, np.newaxis] * (n + 1)
+        left = (blocks[:, 0] + base).ravel()
+        right = blocks[:, 1] + base
+        greater = (np.arange(1, nb + 1)[:, np.newaxis] * w) - np.searchsorted(
+            left, right, side="right"
+        )
+        inversions += greater.reshape(m, -1).sum(axis=1)
+        # Merging two sorted runs is linear with the stable sort.
+        a = np.sort(blocks.reshape(nb, 2 * w), axis=1, kind="stable").ravel()
+        w *= 2
 
-    return trend, h, p, z
+    pairs = n * (n - 1) // 2
+    tied = np.sum(tp * (tp - 1) // 2, axis=1)
+    s = pairs - tied - 2 * inversions
+    return s, tp
 
 
 def check_num_samples(
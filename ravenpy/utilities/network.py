@@ -0,0 +1,202 @@
+"""
+River network topology.
+
+Watershed datasets such as HydroBASINS or the hydro routing product describe the river network with one row per
+sub-basin, giving its ID and the ID of the sub-basin it drains into. `RiverNetwork` indexes these links once, as
+compressed sparse row (CSR) adjacency arrays in both directions, so that upstream, downstream and subtree queries only
+visit the sub-basins they return instead of scanning the whole table for each one::
+
+    net = RiverNetwork.from_dataframe(df, "SubId", "DowSubId")
+    net.upstream_ids(fid)
+"""
+
+import collections
+import hashlib
+from typing import Sequence
+
+import numpy as np
+
+# Maximum number of networks kept in memory by `RiverNetwork.from_dataframe`.
+CACHE_SIZE = 8
+
+_cache = collections.OrderedDict()
+
+
+def _as_ids(values) -> np.ndarray:
+    """Return IDs as an array, casting floats holding integers to integers."""
+    a = np.atleast_1d(np.asarray(values))
+    if a.dtype.kind == "f" and np.all(np.mod(a, 1) == 0):
+        a = a.astype(np.int64)
+    return a
+
+
+def _csr(rows: np.ndarray, cols: np.ndarray, n: int):
+    """Return the index pointer and column indices of the CSR adjacency of links `rows` -> `cols`."""
+    order = np.argsort(rows, kind="stable")
+    ptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=ptr[1:])
+    return ptr, cols[order]
+
+
+def _neighbours(ptr: np.ndarray, idx: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+    """Return the concatenated neighbours of `nodes` in a CSR adjacency."""
+    starts = ptr[nodes]
+    counts = ptr[nodes + 1] - starts
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return idx[offsets + np.arange(counts.sum())]
+
+
+class RiverNetwork:
+    """Index of the links between sub-basins of a river network.
+
+    Parameters
+    ----------
+    ids : sequence
+      Sub-basin IDs. IDs can be repeated, for example when a table has one row per HRU.
+    downstream_ids : sequence
+      ID of the sub-basin downstream of each sub-basin. IDs that are not in `ids`, such as 0 or -1, and IDs equal to
+      the sub-basin ID mark outlets.
+
+    Attributes
+    ----------
+    ids : ndarray
+      Sorted unique sub-basin IDs.
+    """
+
+    def __init__(self, ids: Sequence, downstream_ids: Sequence):
+        ids = _as_ids(ids)
+        down = _as_ids(downstream_ids)
+        if ids.shape != down.shape:
+            raise ValueError("There should be one downstream ID per sub-basin.")
+
+        self.ids = np.unique(ids)
+        n = len(self.ids)
+
+        # Only keep links to sub-basins in the network.
+        pos = np.searchsorted(self.ids, down).clip(max=max(n - 1, 0))
+        valid = (self.ids[pos] == down) & (down != ids) if n else pos.astype(bool)
+        src = np.searchsorted(self.ids, ids[valid])
+        dst = pos[valid]
+        links = np.unique(np.stack([src, dst], axis=1), axis=0)
+        src, dst = links[:, 0], links[:, 1]
+
+        self._up_ptr, self._up_idx = _csr(dst, src, n)
+        self._down_ptr, self._down_idx = _csr(src, dst, n)
+        self._order = None
+
+    @classmethod
+    def from_dataframe(
+        cls, df, basin_field: str, downstream_field: str
+    ) -> "RiverNetwork":
+        """Return the network of a table of sub-basins.
+
+        Networks are cached, so that successive queries on the same table do not index it again.
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+          Sub-basin attributes.
+        basin_field : str
+          The field holding the ID of the sub-basins.
+        downstream_field : str
+          The field holding the ID of the downstream sub-basins.
+        """
+        ids = _as_ids(df[basin_field].values)
+        down = _as_ids(df[downstream_field].values)
+
+        h = hashlib.sha1()
+        for a in (ids, down):
+            h.update(str(a.dtype).encode())
+            h.update(np.ascontiguousarray(a).tobytes())
+        key = h.hexdigest()
+
+        net = _cache.get(key)
+        if net is None:
+            net = _cache[key] = cls(ids, down)
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+        return net
+
+    def __len__(self):
+        return len(self.ids)
+
+    def index(self, ids) -> np.ndarray:
+        """Return the position of sub-basins in `ids`, raising a KeyError for unknown sub-basins."""
+        ids = _as_ids(ids)
+        pos = np.searchsorted(self.ids, ids).clip(max=max(len(self) - 1, 0))
+        missing = (self.ids[pos] != ids) if len(self) else np.ones(len(ids), bool)
+        if missing.any():
+            raise KeyError(ids[missing].tolist())
+        return pos
+
+    def upstream(self, fid) -> np.ndarray:
+        """Return the IDs of the sub-basins draining directly into sub-basin `fid`."""
+        return self.ids[_neighbours(self._up_ptr, self._up_idx, self.index(fid))]
+
+    def downstream(self, fid) -> np.ndarray:
+        """Return the ID of the sub-basin downstream of sub-basin `fid`, as an array that is empty for outlets."""
+        return self.ids[_neighbours(self._down_ptr, self._down_idx, self.index(fid))]
+
+    def _traverse(self, ptr, idx, start: np.ndarray) -> np.ndarray:
+        """Return the nodes reachable from `start`, including `start`, in breadth-first order."""
+        visited = np.zeros(len(self), dtype=bool)
+        frontier = np.unique(start)
+        visited[frontier] = True
+        out = [frontier]
+        while len(frontier):
+            nxt = _neighbours(ptr, idx, frontier)
+            frontier = np.unique(nxt[~visited[nxt]])
+            visited[frontier] = True
+            out.append(frontier)
+        return np.concatenate(out)
+
+    def upstream_ids(self, fid, include_self: bool = True) -> np.ndarray:
+        """Return the IDs of the sub-basins upstream of one or more sub-basins.
+
+        Parameters
+        ----------
+        fid : ID or sequence of IDs
+          Sub-basins of interest.
+        include_self : bool
+          Whether to include the sub-basins of interest.
+        """
+        start = self.index(fid)
+        nodes = self._traverse(self._up_ptr, self._up_idx, start)
+        if not include_self:
+            nodes = nodes[~np.isin(nodes, start)]
+        return self.ids[nodes]
+
+    def downstream_ids(self, fid, include_self: bool = True) -> np.ndarray:
+        """Return the IDs of the sub-basins downstream of one or more sub-basins, down to their outlets."""
+        start = self.index(fid)
+        nodes = self._traverse(self._down_ptr, self._down_idx, start)
+        if not include_self:
+            nodes = nodes[~np.isin(nodes, start)]
+        return self.ids[nodes]
+
+    @property
+    def outlets(self) -> np.ndarray:
+        """IDs of the sub-basins without downstream sub-basin."""
+        return self.ids[np.diff(self._down_ptr) == 0]
+
+    @property
+    def topological_order(self) -> np.ndarray:
+        """Sub-basin IDs ordered such that each sub-basin comes after all the sub-basins upstream of it."""
+        if self._order is None:
+            n_up = np.diff(self._up_ptr)
+            frontier = np.flatnonzero(n_up == 0)
+            order = []
+            while len(frontier):
+                order.append(frontier)
+                nxt = _neighbours(self._down_ptr, self._down_idx, frontier)
+                np.subtract.at(n_up, nxt, 1)
+                frontier = np.unique(nxt[n_up[nxt] == 0])
+
+            order = np.concatenate(order) if order else np.array([], dtype=int)
+            if len(order) < len(self):
+                raise ValueError("The river network has cycles.")
+            self._order = order
+
+        return self.ids[self._order]
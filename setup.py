@@ -181,6 +181,8 @@ setup(
     entry_points={
         "console_scripts": [
             "ravenpy=ravenpy.cli:main",
+            "ravenpy-fake-raven=ravenpy.utilities.fake_binaries:fake_raven",
+            "ravenpy-fake-ostrich=ravenpy.utilities.fake_binaries:fake_ostrich",
         ],
     },
     install_requires=requirements,
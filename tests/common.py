@@ -24,15 +24,21 @@ def synthetic_gr4j_inputs(path):
     time = pd.date_range(start="2000-07-01", end="2002-07-01", freq="D")
 
     pr = 3 * np.ones(len(time))
-    pr = xr.DataArray(pr, coords={"time": time}, dims="time", name="pr")
+    pr = xr.DataArray(
+        pr, coords={"time": time}, dims="time", name="pr", attrs={"units": "mm/d"}
+    )
     pr.to_netcdf(Path(path).joinpath("pr.nc"))
 
     tas = 280 + 20 * np.cos(np.arange(len(time)) * 2 * np.pi / 365.0)
-    tas = xr.DataArray(tas, coords={"time": time}, dims="time", name="tas")
+    tas = xr.DataArray(
+        tas, coords={"time": time}, dims="time", name="tas", attrs={"units": "K"}
+    )
     tas.to_netcdf(Path(path).joinpath("tas.nc"))
 
     evap = 3 + 3 * np.cos(-30 + np.arange(len(time)) * 2 * np.pi / 365.0)
-    evap = xr.DataArray(evap, coords={"time": time}, dims="time", name="evap")
+    evap = xr.DataArray(
+        evap, coords={"time": time}, dims="time", name="evap", attrs={"units": "mm/d"}
+    )
     evap.to_netcdf(Path(path).joinpath("evap.nc"))
 
 
@@ -1,9 +1,19 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+import pandas as pd
 import pytest
 import xarray as xr
 from xclim.indicators.land._streamflow import fit, stats
 
+import ravenpy.models.base
+from ravenpy.utilities.fake_binaries import write_fake_binaries
 from ravenpy.utilities.testdata import get_local_testdata
 
+from .common import synthetic_gr4j_inputs
+
 
 @pytest.fixture
 def q_sim_1(tmp_path):
@@ -31,3 +41,62 @@ def params(ts_stats, tmp_path):
     fn = tmp_path / "fit.nc"
     p.to_netcdf(fn)
     return fn
+
+
+@pytest.fixture
+def fake_binaries(tmp_path, monkeypatch):
+    """Use the Raven and Ostrich stand-in executables."""
+    raven, ostrich = write_fake_binaries(tmp_path / "bin")
+    monkeypatch.setattr(ravenpy.models.base, "RAVEN_EXEC_PATH", str(raven))
+    monkeypatch.setattr(ravenpy.models.base, "OSTRICH_EXEC_PATH", str(ostrich))
+    return raven, ostrich
+
+
+@pytest.fixture
+def synthetic_inputs(tmp_path):
+    """Synthetic GR4J forcing files, along with streamflow observations."""
+    synthetic_gr4j_inputs(tmp_path)
+    time = pd.date_range(start="2000-07-01", end="2002-07-01", freq="D")
+    q = 10 + 5 * np.sin(np.arange(len(time)) * 2 * np.pi / 365.0)
+    xr.DataArray(
+        q, coords={"time": time}, dims="time", name="qobs", attrs={"units": "m3 s-1"}
+    ).to_netcdf(tmp_path / "qobs.nc")
+    return [tmp_path / f"{v}.nc" for v in ("pr", "tas", "evap", "qobs")]
+
+
+class _OWSHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        self.server.requests.append((url.path, parse_qsl(url.query)))
+        self.server.clients.add(self.client_address)
+
+        status, body = self.server.responses.get(url.path, (404, b"Not found"))
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def ows_server():
+    """Local HTTP server standing in for the GeoServer.
+
+    The bodies returned for each path are set in `server.responses`, and the requests received are recorded in
+    `server.requests`, along with the addresses of the client connections in `server.clients`.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _OWSHandler)
+    server.responses = {}
+    server.requests = []
+    server.clients = set()
+    server.url = f"http://127.0.0.1:{server.server_port}/"
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -60,6 +60,35 @@ class TestRaven:
         model.run(ts)
 
 
+class TestRoutes:
+    def test_routes(self, fake_binaries):
+        from ravenpy.models import GR4JCN
+        from ravenpy.models.rv import RVC
+
+        model = GR4JCN()
+        routes = model.routes
+        assert routes["params"] == [model.rvp]
+        assert model.routes is routes
+
+        # Parameters are the values of the last object defining each key.
+        params = model.parameters
+        assert params["run_name"] == model.rvi.run_name
+        assert params["params"] is model.rvp.params
+
+        model.assign("area", 100)
+        assert model.rvh.area == 100
+        assert model.routes is routes
+
+        # The table is rebuilt when keys are added or objects replaced.
+        model.rvh.new_key = 1
+        assert model.routes["new_key"] == [model.rvh]
+        model.rvc = RVC()
+        assert model.routes["hru_state"] == [model.rvc]
+
+        with pytest.raises(AttributeError):
+            model.assign("unknown", 1)
+
+
 class TestOstrich:
     def test_gr4j_with_no_tags(self):
         ts = get_local_testdata(
@@ -0,0 +1,192 @@
+import datetime as dt
+
+import numpy as np
+import pytest
+
+from ravenpy.models import BLENDED_OST, GR4JCN, GR4JCN_OST, HMETS_OST
+from ravenpy.models.base import natural_sort_key
+from ravenpy.models import calibration
+from ravenpy.models.calibration import (
+    ParallelDDS,
+    ParameterSpace,
+    raven_emulator,
+)
+
+hru = dict(area=4250.6, elevation=843.0, latitude=54.4848, longitude=-123.3659)
+low = (0.01, -15.0, 10.0, 0.0, 1.0, 0.0)
+high = (2.5, 10.0, 700.0, 7.0, 30.0, 1.0)
+
+
+class TestParameterSpace:
+    def test_gr4jcn(self, fake_binaries):
+        model = GR4JCN_OST()
+        model.assign("lowerBounds", low)
+        model.assign("upperBounds", high)
+
+        space = ParameterSpace.from_ostrich(model)
+        assert space.names == [
+            "par_x1",
+            "par_x2",
+            "par_x3",
+            "par_x4",
+            "par_x5",
+            "par_x6",
+        ]
+        np.testing.assert_array_equal(space.low, low)
+        np.testing.assert_array_equal(space.high, high)
+
+        values = space.values([1, 2, 3, 4, 5, 0.25])
+        assert values["par_half_x1"] == 500
+        assert values["par_1_minus_x6"] == 0.75
+        assert model.ost2raven(values) == GR4JCN.params(1, 2, 3, 4, 5, 0.25)
+
+    def test_tied(self, fake_binaries):
+        model = BLENDED_OST()
+        n = len(model.params._fields)
+        model.assign("lowerBounds", [0] * n)
+        model.assign("upperBounds", [1] * n)
+
+        space = ParameterSpace.from_ostrich(model)
+        values = space.values(np.full(len(space), 0.5))
+        assert values["pow_x04"] == pytest.approx(10**0.5)
+        assert values["sum_x09_x10"] == 1.0
+        assert model.ost2raven(values).par_x04 == pytest.approx(10**0.5)
+
+    def test_reflect(self):
+        space = ParameterSpace(["a", "b"], [0, 0], [1, 10])
+        np.testing.assert_allclose(
+            space.reflect([[-0.25, 11], [0.5, 5]]), [[0.25, 9], [0.5, 5]]
+        )
+
+        with pytest.raises(ValueError):
+            ParameterSpace(["a"], [1], [0])
+
+    def test_initial(self, fake_binaries):
+        model = HMETS_OST()
+        n = len(model.params._fields)
+        model.assign("lowerBounds", [0] * n)
+        model.assign("upperBounds", [100] * n)
+
+        space = ParameterSpace.from_ostrich(model)
+        x = space.initial(dict(zip(space.names, np.arange(n) - 1)))
+        assert x[0] == 0
+        np.testing.assert_array_equal(x[1:], np.arange(1, len(space)) - 1)
+
+    @pytest.mark.parametrize("cls", [GR4JCN_OST, HMETS_OST, BLENDED_OST])
+    def test_initial_roundtrip(self, fake_binaries, cls):
+        model = cls()
+        n = len(model.params._fields)
+        model.assign("lowerBounds", [-1e4] * n)
+        model.assign("upperBounds", [1e4] * n)
+        space = ParameterSpace.from_ostrich(model)
+
+        # Model parameters are converted to candidates and back.
+        params = np.random.default_rng(0).uniform(1, 2, n) * np.arange(1, n + 1)
+        x = space.initial(model.raven2ost(params))
+        np.testing.assert_allclose(model.ost2raven(space.values(x)), params)
+
+    def test_unsupported_tied(self):
+        space = ParameterSpace(
+            ["a"], [0], [1], [calibration.TiedParameter("b", ["a"], "log", [1, 0])]
+        )
+        with pytest.raises(ValueError):
+            space.values([0.5])
+
+
+def test_raven_emulator(fake_binaries):
+    assert raven_emulator(GR4JCN_OST()) is GR4JCN
+    assert raven_emulator(HMETS_OST()).identifier == "hmets"
+
+
+def test_natural_sort_key():
+    fns = ["model/p10/a.csv", "model/p2/a.csv", "model/p100/a.csv"]
+    assert sorted(fns, key=natural_sort_key) == [
+        "model/p2/a.csv",
+        "model/p10/a.csv",
+        "model/p100/a.csv",
+    ]
+
+
+class TestParallelDDS:
+    def test_calibration(self, fake_binaries, synthetic_inputs, tmp_path, monkeypatch):
+        monkeypatch.setenv("RAVENPY_RESULT_CACHE", str(tmp_path / "cache"))
+        dds = ParallelDDS(GR4JCN_OST(), workdir=tmp_path / "dds", batch_size=4)
+        dds(
+            synthetic_inputs,
+            lowerBounds=low,
+            upperBounds=high,
+            max_iterations=10,
+            random_seed=0,
+            start_date=dt.datetime(2000, 7, 1),
+            duration=200,
+            **hru,
+        )
+
+        # Three batches of 4, 4 and 2 candidates.
+        assert dds.history.shape == (10, 8)
+        np.testing.assert_array_equal(dds.history[:, 0], np.arange(1, 11))
+        x = dds.history[:, 2:]
+        assert ((x >= low) & (x <= high)).all()
+
+        # The model outputs are those of the best parameter set.
+        assert dds.obj_func == dds.history[:, 1].min()
+        assert dds.model.diagnostics["DIAG_NASH_SUTCLIFFE"] == pytest.approx(
+            -dds.obj_func
+        )
+        np.testing.assert_allclose(dds.calibrated_params, dds.optimized_parameters)
+        assert isinstance(dds.calibrated_params, GR4JCN.params)
+
+        # Candidate evaluations are not stored in the result cache.
+        assert not (tmp_path / "cache").exists()
+
+    def test_reproducible(self, fake_binaries, synthetic_inputs, tmp_path):
+        kwds = dict(
+            lowerBounds=low,
+            upperBounds=high,
+            max_iterations=6,
+            random_seed=1,
+            start_date=dt.datetime(2000, 7, 1),
+            duration=60,
+            **hru,
+        )
+        histories = []
+        for i in range(2):
+            dds = ParallelDDS(GR4JCN_OST(), workdir=tmp_path / str(i), batch_size=3)
+            dds(synthetic_inputs, **kwds)
+            histories.append(dds.history)
+
+        np.testing.assert_array_equal(*histories)
+
+    def test_initial_params(self, fake_binaries, synthetic_inputs, tmp_path):
+        params = (0.529, -3.396, 407.29, 1.072, 16.9, 0.947)
+        dds = ParallelDDS(GR4JCN_OST(), workdir=tmp_path / "dds", batch_size=3)
+        assert dds.perturbation == 0.2
+
+        dds(
+            synthetic_inputs,
+            params=params,
+            lowerBounds=low,
+            upperBounds=high,
+            max_iterations=6,
+            random_seed=0,
+            start_date=dt.datetime(2000, 7, 1),
+            duration=30,
+            **hru,
+        )
+
+        # The search starts from the initial parameters.
+        np.testing.assert_allclose(dds.history[0, 2:], params)
+        assert dds.history.shape == (6, 8)
+
+    def test_no_observations(self, fake_binaries, synthetic_inputs, tmp_path):
+        dds = ParallelDDS(GR4JCN_OST(), workdir=tmp_path / "dds", batch_size=2)
+        with pytest.raises(UserWarning):
+            dds(
+                synthetic_inputs[:-1],
+                lowerBounds=low,
+                upperBounds=high,
+                max_iterations=2,
+                start_date=dt.datetime(2000, 7, 1),
+                duration=30,
+                **hru,
+            )
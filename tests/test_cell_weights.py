@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+geometry = pytest.importorskip("shapely.geometry")
+cw = pytest.importorskip("ravenpy.utilities.cell_weights")
+
+
+class TestCellWeights:
+    # Cells are 1 x 1, centered on integers, with latitudes in decreasing order.
+    lon = np.arange(-5.0, 0.0)
+    lat = np.arange(52.0, 48.0, -1)
+
+    def setup_method(self):
+        cw.clear_cache()
+
+    def test_cell_edges(self):
+        np.testing.assert_array_equal(cw.cell_edges([0, 1, 2]), [-0.5, 0.5, 1.5, 2.5])
+        np.testing.assert_array_equal(cw.cell_edges([2, 1]), [2.5, 1.5, 0.5])
+
+    def test_partial_cells(self):
+        # Covers all of cell (lat=51, lon=-4) and half of cell (lat=51, lon=-3).
+        poly = geometry.box(-4.5, 50.5, -3.0, 51.5)
+        w = (
+            cw.cell_weights([poly], self.lon, self.lat)
+            .toarray()
+            .reshape(1, len(self.lat), len(self.lon))
+        )
+        expected = np.zeros_like(w)
+        expected[0, 1, 1] = 2 / 3
+        expected[0, 1, 2] = 1 / 3
+        np.testing.assert_allclose(w, expected)
+
+    def test_cache(self):
+        polys = [geometry.box(-4.5, 49.5, -2.5, 51.5)]
+        w = cw.cell_weights(polys, self.lon, self.lat)
+        assert cw.cell_weights(polys, self.lon, self.lat) is w
+        assert cw.cell_weights(polys, self.lon + 0.1, self.lat) is not w
+
+        # GeoJSON-like mappings are accepted.
+        assert cw.cell_weights([geometry.mapping(polys[0])], self.lon, self.lat) is w
+
+    def test_outside_grid(self):
+        with pytest.raises(ValueError):
+            cw.cell_weights([geometry.box(10, 10, 11, 11)], self.lon, self.lat)
+
+    def test_weighted_mean(self):
+        data = np.random.default_rng(0).random((3, len(self.lat), len(self.lon)))
+        data[1, 1, 1] = np.nan
+        ds = xr.Dataset(
+            {
+                "tas": (("time", "lat", "lon"), data),
+                "station": ("time", [1, 2, 3]),
+            },
+            coords={"time": [0, 1, 2], "lat": self.lat, "lon": self.lon},
+        )
+        polys = [
+            geometry.box(-4.5, 50.5, -2.5, 51.5),
+            geometry.box(-5.5, 48.5, -0.5, 52.5),
+        ]
+        w = cw.cell_weights(polys, self.lon, self.lat)
+        out = cw.weighted_mean(ds, w)
+
+        assert out.tas.dims == ("time", "region")
+        np.testing.assert_array_equal(out.station, ds.station)
+
+        expected = ds.tas.isel(lat=1, lon=[1, 2]).mean("lon")
+        np.testing.assert_allclose(out.tas.isel(region=0), expected)
+        np.testing.assert_allclose(out.tas.isel(region=1), ds.tas.mean(["lat", "lon"]))
@@ -0,0 +1,97 @@
+import datetime as dt
+
+import numpy as np
+import pytest
+
+from ravenpy.models import GR4JCN, GR4JCN_OST
+
+params = (0.529, -3.396, 407.29, 1.072, 16.9, 0.947)
+hru = dict(area=4250.6, elevation=843.0, latitude=54.4848, longitude=-123.3659)
+
+
+class TestFakeRaven:
+    def test_version(self, fake_binaries):
+        model = GR4JCN()
+        assert model.version == "3.0.1"
+
+    def test_simulation(self, fake_binaries, synthetic_inputs):
+        model = GR4JCN()
+        model(
+            synthetic_inputs,
+            params=params,
+            start_date=dt.datetime(2000, 7, 1),
+            end_date=dt.datetime(2001, 7, 1),
+            **hru,
+        )
+
+        assert model.q_sim.shape == (366, 1)
+        assert "q_obs" in model.hydrograph
+        assert "DIAG_NASH_SUTCLIFFE" in model.diagnostics
+
+        hru_state, basin_state = model.get_final_state()
+        assert hru_state.index == 1
+        assert basin_state.qout[0] == pytest.approx(float(model.q_sim[-1, 0]))
+
+    def test_parallel_params(self, fake_binaries, synthetic_inputs):
+        model = GR4JCN()
+        model(
+            synthetic_inputs,
+            params=[params, params[:-1] + (0.5,), params],
+            start_date=dt.datetime(2000, 7, 1),
+            duration=30,
+            **hru,
+        )
+
+        q = model.q_sim
+        assert q.dims == ("params", "time", "nbasins")
+        assert len(q.params) == 3
+
+        # Simulations are deterministic functions of the configuration.
+        np.testing.assert_array_equal(q[0], q[2])
+        assert not np.array_equal(q[0], q[1])
+
+    def test_suppress_output(self, fake_binaries, synthetic_inputs):
+        model = GR4JCN()
+        model.rvi.suppress_output = True
+        model.run(synthetic_inputs, params=params, duration=10, **hru)[0].wait()
+
+        files = [f.name for f in model.output_path.iterdir()]
+        assert "run-0_Diagnostics.csv" in files
+        assert "run-0_Hydrographs.nc" not in files
+
+
+class TestFakeOstrich:
+    def test_calibration(self, fake_binaries, synthetic_inputs):
+        model = GR4JCN_OST()
+        model(
+            synthetic_inputs,
+            params=params,
+            lowerBounds=(0.01, -15.0, 10.0, 0.0, 1.0, 0.0),
+            upperBounds=(2.5, 10.0, 700.0, 7.0, 30.0, 1.0),
+            start_date=dt.datetime(2000, 7, 1),
+            duration=200,
+            max_iterations=10,
+            random_seed=0,
+            **hru,
+        )
+
+        history = np.loadtxt(model.outputs["params_seq"], skiprows=1)
+        assert history.shape == (11, 8)
+
+        # The history is the one of the published output file.
+        np.testing.assert_array_equal(model.history, history)
+        assert model._ostmodel_reader().path == model.outputs["params_seq"]
+
+        # The objective function is the best one found during the search.
+        assert model.obj_func == history[:, 1].min()
+        np.testing.assert_allclose(
+            model.calibrated_params, model.optimized_parameters, rtol=1e-6
+        )
+        assert (model.final_path / "run-0_Diagnostics.csv").exists()
+
+    def test_tied_value(self):
+        from ravenpy.utilities.fake_binaries import _tied_value
+
+        assert _tied_value("linear", (2.0, 1.0), (3.0,)) == 7.0
+        with pytest.raises(ValueError):
+            _tied_value("exp", (1.0, 1.0), (1.0,))
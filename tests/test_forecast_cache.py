@@ -0,0 +1,134 @@
+import datetime as dt
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from ravenpy.utilities.forecast_cache import ForecastCache, fetch_forecast
+
+bbox = (-124.0, 54.0, -123.0, 55.0)
+date = dt.datetime(2018, 6, 1)
+
+
+def forecast(seed=0):
+    data = np.random.default_rng(seed).random((3, 8, 4, 5))
+    dims = ("member", "time", "lat", "lon")
+    coords = dict(
+        member=np.arange(3),
+        time=pd.date_range("2018-06-01", periods=8, freq="6H"),
+        lat=np.linspace(54, 55, 4),
+        lon=np.linspace(236, 237, 5),
+    )
+    return xr.Dataset(
+        {"tas": (dims, data), "pr": (dims, data / 10)},
+        coords=coords,
+        attrs={"source": "test"},
+    )
+
+
+class TestForecastCache:
+    def test_roundtrip(self, tmp_path):
+        cache = ForecastCache(tmp_path)
+        ds = forecast()
+        assert cache.get("caspar", "GEPS", date, bbox) is None
+
+        cache.put(ds, "caspar", "GEPS", date, bbox)
+        assert ("caspar", "GEPS", date, bbox) in cache
+        assert ("caspar", "GEPS", date, (-124.0, 54.0, -123.0, 55.5)) not in cache
+        assert ("caspar", "GEPS", date + dt.timedelta(days=1), bbox) not in cache
+
+        out = cache.get("caspar", "GEPS", date, bbox)
+        xr.testing.assert_identical(out, ds)
+
+        with xr.open_dataset(cache.filename("caspar", "GEPS", date, bbox)) as f:
+            assert f.tas.encoding["chunksizes"] == (1, 8, 4, 5)
+            assert f.tas.encoding["zlib"]
+
+    def test_fetch(self, tmp_path):
+        cache = ForecastCache(tmp_path)
+        calls = []
+
+        def func():
+            calls.append(1)
+            return forecast()
+
+        a = fetch_forecast(cache, "caspar", "GEPS", date, bbox, func)
+        b = fetch_forecast(cache, "caspar", "GEPS", date, bbox, func)
+        assert len(calls) == 1
+        xr.testing.assert_identical(a, b)
+
+        fetch_forecast(False, "caspar", "GEPS", date, bbox, func)
+        assert len(calls) == 2
+
+    def test_sources(self, tmp_path):
+        # CASPAR hindcasts and ECCC forecasts of the same date and region are on different grids.
+        cache = ForecastCache(tmp_path)
+        caspar = forecast(0).rename(lat="rlat", lon="rlon")
+        eccc = forecast(1)
+
+        fetch_forecast(cache, "caspar", "GEPS", date, bbox, lambda: caspar)
+        out = fetch_forecast(cache, "eccc", "GEPS", date, bbox, lambda: eccc)
+        xr.testing.assert_identical(out, eccc)
+        assert len(list(tmp_path.glob("*.nc"))) == 2
+
+        xr.testing.assert_identical(cache.get("caspar", "GEPS", date, bbox), caspar)
+        xr.testing.assert_identical(cache.get("eccc", "GEPS", date, bbox), eccc)
+
+    def test_forecasting(self, tmp_path, monkeypatch):
+        forecasting = pytest.importorskip("ravenpy.utilities.forecasting")
+        cache = ForecastCache(tmp_path)
+        times = list(pd.date_range(date, periods=8, freq="6H"))
+        region = type("Region", (), {"bounds": bbox})()
+
+        monkeypatch.setattr(
+            forecasting,
+            "get_CASPAR_dataset",
+            lambda model, d: (forecast(0).rename(lat="rlat", lon="rlon"), times),
+        )
+        monkeypatch.setattr(
+            forecasting, "get_ECCC_dataset", lambda model: (forecast(1), times)
+        )
+        monkeypatch.setattr(forecasting, "subset_forecast", lambda ds, t, b: ds)
+        monkeypatch.setattr(
+            forecasting, "_region_average", lambda coll, ds, is_caspar: (ds, is_caspar)
+        )
+
+        # Each source reads its own data, on its own grid.
+        ds, is_caspar = forecasting.get_hindcast_day(region, date, cache=cache)
+        assert is_caspar and "rlon" in ds.dims
+        ds, is_caspar = forecasting.get_recent_ECCC_forecast(region, cache=cache)
+        assert not is_caspar and "lon" in ds.dims
+        assert len(list(tmp_path.glob("*.nc"))) == 2
+
+    def test_default(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("RAVENPY_FORECAST_CACHE", str(tmp_path / "cache"))
+        fetch_forecast(None, "caspar", "GEPS", date, bbox, forecast)
+        assert len(list((tmp_path / "cache").glob("*.nc"))) == 1
+
+    def test_eviction(self, tmp_path):
+        cache = ForecastCache(tmp_path)
+        dates = [date + dt.timedelta(days=i) for i in range(3)]
+        for i, d in enumerate(dates):
+            cache.put(forecast(i), "caspar", "GEPS", d, bbox)
+            fn = cache.filename("caspar", "GEPS", d, bbox)
+            os.utime(fn, (i, i))
+        size = cache.filename("caspar", "GEPS", date, bbox).stat().st_size
+
+        # Reading the oldest file makes it the most recently used.
+        cache.get("caspar", "GEPS", dates[0], bbox)
+
+        cache.max_size = 2 * size + size // 2
+        cache.evict()
+        assert ("caspar", "GEPS", dates[0], bbox) in cache
+        assert ("caspar", "GEPS", dates[1], bbox) not in cache
+        assert ("caspar", "GEPS", dates[2], bbox) in cache
+
+        # The file that was just written is kept even if it exceeds the maximum size.
+        cache.max_size = 0
+        cache.put(forecast(5), "caspar", "GEPS", date, bbox)
+        assert [f.name for f in tmp_path.glob("*.nc")] == [
+            cache.filename("caspar", "GEPS", date, bbox).name
+        ]
+        assert cache.size > 0
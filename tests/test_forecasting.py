@@ -0,0 +1,68 @@
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from ravenpy.models import GR4JCN
+
+forecasting = pytest.importorskip("ravenpy.utilities.forecasting")
+
+hru = dict(area=4250.6, elevation=843.0, latitude=54.4848, longitude=-123.3659)
+params = (0.529, -3.396, 407.29, 1.072, 16.9, 0.947)
+
+
+def ensemble(start, members=5, days=10):
+    rng = np.random.default_rng(0)
+    coords = dict(
+        member=np.arange(1, members + 1),
+        time=pd.date_range(start, periods=days, freq="D"),
+    )
+    dims = ("member", "time")
+    return xr.Dataset(
+        {
+            "pr": (dims, rng.gamma(1, 3, (members, days)), {"units": "mm/d"}),
+            "tas": (dims, rng.normal(10, 3, (members, days)), {"units": "degC"}),
+        },
+        coords=coords,
+    )
+
+
+class TestEnsembleForecast:
+    def test_members(self, fake_binaries, synthetic_inputs, tmp_path):
+        warmup = GR4JCN(workdir=tmp_path / "warmup")
+        warmup(
+            synthetic_inputs,
+            start_date=dt.datetime(2000, 7, 1),
+            end_date=dt.datetime(2001, 6, 30),
+            params=params,
+            **hru,
+        )
+        rvc = warmup.outputs["solution"]
+
+        model = GR4JCN(workdir=tmp_path / "forecast")
+        q = forecasting.perform_ensemble_forecast(
+            model,
+            rvc,
+            ensemble("2001-07-01"),
+            start_date=dt.datetime(2001, 7, 1),
+            duration=9,
+            params=params,
+            **hru,
+        )
+
+        assert q.dims == ("member", "time")
+        assert q.shape == (5, 10)
+        np.testing.assert_array_equal(q.member, [1, 2, 3, 4, 5])
+
+        # All members are read from the same forcing file.
+        assert len(model.ind_outputs["hydrograph"]) == 5
+        assert [f.name for f in model.workdir.glob("*.nc")] == ["ensemble_forecast.nc"]
+
+    def test_dimensions(self, fake_binaries, tmp_path):
+        ds = ensemble("2001-07-01").expand_dims(region=2)
+        with pytest.raises(ValueError):
+            forecasting.perform_ensemble_forecast(
+                GR4JCN(workdir=tmp_path), "solution.rvc", ds
+            )
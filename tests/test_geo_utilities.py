@@ -172,6 +172,27 @@ class TestGdalOgrFunctions:
         np.testing.assert_almost_equal(region_dem_properties["elevation"], 145.8899, 4)
         np.testing.assert_almost_equal(region_dem_properties["slope"], 61.26508, 5)
 
+    # Slope values are high due to data values using Geographic CRS
+    def test_dem_zonal_stats(self):
+        with self.analysis.rasterio.open(self.raster_file) as src:
+            raster_box = self.sgeo.box(*src.bounds)
+
+        # Same values as the GDAL terrain analysis over the entire raster.
+        stats = self.analysis.dem_zonal_stats(self.raster_file, [raster_box])
+        np.testing.assert_almost_equal(stats["aspect"], [10.911], 3)
+        np.testing.assert_almost_equal(stats["elevation"], [79.0341], 4)
+        np.testing.assert_almost_equal(stats["slope"], [64.43654], 4)
+
+        with self.fiona.open(self.geojson_file) as gj:
+            geoms = [self.sgeo.shape(f["geometry"]) for f in gj]
+
+        # Results do not depend on the tiling.
+        stats = self.analysis.dem_zonal_stats(self.raster_file, geoms)
+        tiled = self.analysis.dem_zonal_stats(self.raster_file, geoms, tile_size=16)
+        for key in ["elevation", "slope", "aspect"]:
+            assert len(stats[key]) == len(geoms)
+            np.testing.assert_allclose(tiled[key], stats[key])
+
     # Slope values are high due to data values using Geographic CRS
     def test_geom_properties(self):
         with self.fiona.open(self.geojson_file) as gj:
@@ -300,6 +321,70 @@ class TestGenericGeoOperations:
             assert data.max() == 255
             np.testing.assert_almost_equal(data.mean(), 102.8222965)
 
+    @pytest.mark.parametrize("workers", [1, 4])
+    def test_tiled_raster_clip(self, tmp_path, workers):
+        with self.fiona.open(self.geojson_file) as gj:
+            feature = next(iter(gj))
+            geom = self.sgeo.shape(feature["geometry"])
+
+        self.geo.generic_raster_clip(self.raster_file, tmp_path / "ref.tiff", geom)
+        self.geo.generic_raster_clip(
+            self.raster_file,
+            tmp_path / "tiled.tiff",
+            geom,
+            tile_size=32,
+            workers=workers,
+        )
+
+        with self.rasterio.open(tmp_path / "ref.tiff") as ref, self.rasterio.open(
+            tmp_path / "tiled.tiff"
+        ) as gt:
+            assert gt.transform == ref.transform
+            assert gt.is_tiled
+            assert gt.block_shapes[0] == (32, 32)
+            np.testing.assert_array_equal(gt.read(), ref.read())
+
+    @pytest.mark.parametrize("workers", [1, 4])
+    def test_tiled_raster_warp(self, tmp_path, workers):
+        self.geo.generic_raster_warp(
+            self.raster_file, tmp_path / "ref.tiff", target_crs="EPSG:3348"
+        )
+        self.geo.generic_raster_warp(
+            self.raster_file,
+            tmp_path / "tiled.tiff",
+            target_crs="EPSG:3348",
+            tile_size=64,
+            workers=workers,
+        )
+
+        with self.rasterio.open(tmp_path / "ref.tiff") as ref, self.rasterio.open(
+            tmp_path / "tiled.tiff"
+        ) as gt:
+            assert gt.crs.to_epsg() == 3348
+            np.testing.assert_allclose(gt.bounds, ref.bounds)
+            assert gt.is_tiled
+
+            # Resampling near tile edges can differ by a pixel.
+            a, b = gt.read(1), ref.read(1)
+            assert a.shape == b.shape
+            assert (a != b).mean() < 0.01
+
+    def test_transformer_cache(self):
+        a = self.geo.get_transformer(4326, "EPSG:3348")
+        assert self.geo.get_transformer(4326, "EPSG:3348") is a
+        assert self.geo.get_transformer(4326, 3348) is not a
+
+    def test_geoms_transform(self):
+        with self.fiona.open(self.geojson_file) as gj:
+            geoms = [self.sgeo.shape(f["geometry"]) for f in gj]
+
+        expected = [self.geo.geom_transform(g, target_crs="EPSG:3348") for g in geoms]
+        transformed = self.geo.geoms_transform(geoms, target_crs="EPSG:3348")
+        assert len(transformed) == len(geoms)
+        for t, e in zip(transformed, expected):
+            np.testing.assert_allclose(t.bounds, e.bounds)
+            np.testing.assert_allclose(t.area, e.area)
+
     def test_shapely_pyproj_transform(self):
         with self.fiona.open(self.geojson_file) as gj:
             feature = next(iter(gj))
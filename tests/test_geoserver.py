@@ -259,3 +259,47 @@ class TestWCS:
                     )
                     data = src.read()
                     assert np.unique(data).tolist() == [1, 5, 8, 10, 14, 15, 16, 17, 18]
+
+
+class TestLocalServer:
+    geoserver = pytest.importorskip("ravenpy.utilities.geoserver")
+
+    def test_get_location_wfs(self, ows_server):
+        ows_server.responses["/wfs"] = (200, b"<gml/>")
+        for i in range(2):
+            data = self.geoserver._get_location_wfs(
+                (-115.1, 36.1, -115.0, 36.2),
+                layer="public:usa",
+                geoserver=ows_server.url,
+            )
+        assert data == b"<gml/>"
+
+        # No capabilities request, and one connection.
+        assert [path for (path, _) in ows_server.requests] == ["/wfs", "/wfs"]
+        params = dict(ows_server.requests[0][1])
+        assert params["bbox"] == "-115.1,36.1,-115.0,36.2,EPSG:4326"
+        assert len(ows_server.clients) == 1
+
+    def test_get_raster_wcs(self, ows_server, tmp_path, monkeypatch):
+        monkeypatch.setenv("RAVENPY_HTTP_CACHE", str(tmp_path))
+        ows_server.responses["/ows"] = (200, b"II*\x00")
+        for i in range(2):
+            data = self.geoserver.get_raster_wcs(
+                (0, 1, 2, 3),
+                geographic=False,
+                layer="public:dem",
+                geoserver=ows_server.url,
+            )
+        assert data == b"II*\x00"
+        assert len(ows_server.requests) == 1
+        assert [v for (k, v) in ows_server.requests[0][1] if k == "subset"] == [
+            "E(0,2)",
+            "N(1,3)",
+        ]
+
+    def test_wcs_error(self, ows_server):
+        ows_server.responses["/ows"] = (200, b"<ows:ExceptionReport/>")
+        with pytest.raises(ChildProcessError):
+            self.geoserver.get_raster_wcs(
+                (0, 1, 2, 3), layer="public:dem", geoserver=ows_server.url
+            )
@@ -1,4 +1,6 @@
 import numpy as np
+import pandas as pd
+import pytest
 import xarray as xr
 from xclim.indicators.land import fit, stats
 
@@ -18,3 +20,81 @@ def test_ts_fit_graph():
 
     fig = graphs.ts_fit_graph(ts, p)
     return fig
+
+
+@pytest.fixture
+def hydrograph_file(tmp_path):
+    time = pd.date_range("2000-01-01", periods=20 * 365, freq="D")
+    rng = np.random.default_rng(0)
+    q = 10 + 5 * np.sin(2 * np.pi * time.dayofyear / 365) + rng.gamma(1, 1, len(time))
+    ds = xr.Dataset(
+        {
+            "q_sim": (("time", "nbasins"), q[:, np.newaxis]),
+            "q_obs": (("time", "nbasins"), q[:, np.newaxis] + 1),
+            "precip": (("time",), rng.random(len(time))),
+            "basin_name": (("nbasins",), ["sub_001"]),
+        },
+        coords={"time": time},
+    )
+    fn = tmp_path / "Hydrographs.nc"
+    ds.to_netcdf(fn)
+    return fn
+
+
+class TestDecimate:
+    def test_extremes(self):
+        x = np.arange(100000)
+        y = np.sin(x / 1000.0)
+        y[12345] = 10
+        y[54321] = -10
+
+        xd, yd = graphs.decimate(x, y, max_points=1000)
+        assert len(xd) <= 1002
+        np.testing.assert_array_equal(yd, y[xd])
+        assert xd[0] == 0 and xd[-1] == len(x) - 1
+        assert {12345, 54321} <= set(xd)
+        assert np.all(np.diff(xd) > 0)
+
+    def test_short(self):
+        x = np.arange(10)
+        xd, yd = graphs.decimate(x, x * 2.0)
+        np.testing.assert_array_equal(xd, x)
+
+    def test_2d_nan(self):
+        x = np.arange(10000)
+        y = np.random.default_rng(0).random((10000, 2))
+        y[::7, 0] = np.nan
+        y[5000, 1] = 2
+        xd, yd = graphs.decimate(x, y, max_points=100)
+        assert yd.shape[1] == 2
+        assert 5000 in xd
+        assert np.nanmax(yd[:, 0]) == np.nanmax(y[:, 0])
+
+
+class TestGraphs:
+    def test_hydrograph(self, hydrograph_file):
+        fig = graphs.hydrograph([hydrograph_file], max_points=500)
+        lines = fig.axes[0].get_lines()
+        assert len(lines) == 2
+        assert all(len(line.get_xdata()) <= 502 for line in lines)
+
+    def test_spaghetti_quantiles(self, hydrograph_file):
+        fig = graphs.spaghetti_annual_hydrograph(
+            hydrograph_file, quantiles=[0.1, 0.5, 0.9]
+        )
+        ax = fig.axes[0]
+        # One band and one median per series, plus the two means.
+        assert len(ax.collections) == 2
+        assert len(ax.get_lines()) == 4
+
+    def test_forecast_quantiles(self, tmp_path):
+        time = pd.date_range("2000-01-01", periods=10, freq="D")
+        q = np.random.default_rng(0).random((len(time), 50))
+        xr.Dataset({"q_sim": (("time", "member"), q)}, coords={"time": time}).to_netcdf(
+            tmp_path / "fcst.nc"
+        )
+
+        fig = graphs.forecast(tmp_path / "fcst.nc", quantiles=[0.05, 0.25, 0.75, 0.95])
+        ax = fig.axes[0]
+        assert len(ax.collections) == 2
+        assert len(ax.get_lines()) == 0
@@ -0,0 +1,72 @@
+import os
+
+import pytest
+import requests
+
+from ravenpy.utilities import http_cache
+
+
+def check(data):
+    if data.startswith(b"<ExceptionReport"):
+        raise ChildProcessError(data)
+
+
+class TestGet:
+    def test_session(self, ows_server):
+        ows_server.responses["/wfs"] = (200, b"features")
+        for i in range(3):
+            assert http_cache.get(ows_server.url + "wfs", dict(i=i)) == b"features"
+
+        # The connection is kept alive and reused across requests.
+        assert len(ows_server.requests) == 3
+        assert len(ows_server.clients) == 1
+        assert http_cache.session() is http_cache.session()
+
+    def test_http_error(self, ows_server):
+        ows_server.responses["/wfs"] = (500, b"error")
+        with pytest.raises(requests.HTTPError):
+            http_cache.get(ows_server.url + "wfs")
+
+    def test_cache(self, ows_server, tmp_path):
+        cache = http_cache.ResponseCache(tmp_path)
+        ows_server.responses["/ows"] = (200, b"raster")
+        url = ows_server.url + "ows"
+        params = [("service", "WCS"), ("subset", "E(0,1)"), ("subset", "N(2,3)")]
+
+        assert http_cache.get(url, params, cache=cache) == b"raster"
+        assert http_cache.get(url, params[::-1], cache=cache) == b"raster"
+        assert len(ows_server.requests) == 1
+        assert ows_server.requests[0][1] == params
+
+        # Other parameters are another request.
+        http_cache.get(url, [("service", "WCS")], cache=cache)
+        assert len(ows_server.requests) == 2
+
+        # Expired responses are requested again.
+        os.utime(cache.filename(url, params), (0, 0))
+        http_cache.get(url, params, cache=cache)
+        assert len(ows_server.requests) == 3
+
+        http_cache.get(url, params, cache=False)
+        assert len(ows_server.requests) == 4
+
+    def test_invalid_not_cached(self, ows_server, tmp_path):
+        cache = http_cache.ResponseCache(tmp_path)
+        ows_server.responses["/ows"] = (200, b"<ExceptionReport/>")
+        url = ows_server.url + "ows"
+
+        for i in range(2):
+            with pytest.raises(ChildProcessError):
+                http_cache.get(url, cache=cache, check=check)
+        assert len(ows_server.requests) == 2
+        assert list(tmp_path.iterdir()) == []
+
+    def test_default_cache(self, ows_server, tmp_path, monkeypatch):
+        monkeypatch.setenv("RAVENPY_HTTP_CACHE", str(tmp_path))
+        monkeypatch.setenv("RAVENPY_HTTP_CACHE_TTL", "3600")
+        ows_server.responses["/wfs"] = (200, b"features")
+
+        http_cache.get(ows_server.url + "wfs")
+        http_cache.get(ows_server.url + "wfs")
+        assert len(ows_server.requests) == 1
+        assert http_cache.default_cache().ttl == 3600
@@ -0,0 +1,48 @@
+import numpy as np
+
+from ravenpy.utilities.mk_test import kendall_s, mk_test_batch, mk_test_calc
+
+
+def pairwise_s(x):
+    n = len(x)
+    return sum(np.sign(x[j] - x[k]) for k in range(n - 1) for j in range(k + 1, n))
+
+
+class TestMannKendall:
+    def test_kendall_s(self):
+        rng = np.random.default_rng(0)
+        for n in [1, 2, 7, 16, 33]:
+            # Small integers, so that there are ties.
+            x = rng.integers(0, 5, (10, n)).astype(float)
+            s, tp = kendall_s(x)
+            np.testing.assert_array_equal(s, [pairwise_s(row) for row in x])
+
+            _, counts = np.unique(x[0], return_counts=True)
+            np.testing.assert_array_equal(np.sort(tp[0][tp[0] > 0]), np.sort(counts))
+
+    def test_mk_test_calc(self):
+        trend, h, p, z = mk_test_calc(np.arange(10.0))
+        assert trend == "increasing"
+        assert h
+        # S = 45, var(S) = 125
+        np.testing.assert_almost_equal(z, 44 / np.sqrt(125))
+
+        trend, h, p, z = mk_test_calc(np.array([2, 1, 3, 3, 3, 5, 6, 7, 10, 4.0]))
+        # S = 32, var(S) = (2250 - 3 * 2 * 11) / 18 with one triple tie
+        np.testing.assert_almost_equal(z, 31 / np.sqrt((2250 - 66) / 18))
+
+        assert mk_test_calc(np.ones(5)) == ("no trend", False, 1.0, 0.0)
+
+    def test_batch(self):
+        rng = np.random.default_rng(1)
+        x = rng.normal(size=(4, 30, 3)) + np.linspace(0, 2, 30)[:, np.newaxis]
+        trend, h, p, z = mk_test_batch(x, axis=1)
+        assert trend.shape == (4, 3)
+
+        for i in range(4):
+            for j in range(3):
+                t, hh, pp, zz = mk_test_calc(x[i, :, j])
+                assert trend[i, j] == t
+                assert h[i, j] == hh
+                np.testing.assert_almost_equal(p[i, j], pp)
+                np.testing.assert_almost_equal(z[i, j], zz)
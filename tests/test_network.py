@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ravenpy.utilities.network import RiverNetwork
+
+
+class TestRiverNetwork:
+    #   4 -> 2 -> 1 <- 3 <- 5
+    #             3 <- 6
+    #   7 (outlet), 8 (drains into itself)
+    ids = [1, 2, 3, 4, 5, 6, 7, 8]
+    down = [-1, 1, 1, 2, 3, 3, 0, 8]
+
+    def test_links(self):
+        net = RiverNetwork(self.ids, self.down)
+        assert len(net) == 8
+        np.testing.assert_array_equal(net.upstream(1), [2, 3])
+        np.testing.assert_array_equal(net.upstream(4), [])
+        np.testing.assert_array_equal(net.downstream(5), [3])
+        np.testing.assert_array_equal(net.outlets, [1, 7, 8])
+
+        with pytest.raises(KeyError):
+            net.upstream(9)
+
+    def test_subtrees(self):
+        net = RiverNetwork(self.ids, self.down)
+        assert set(net.upstream_ids(1)) == {1, 2, 3, 4, 5, 6}
+        assert set(net.upstream_ids(3, include_self=False)) == {5, 6}
+        assert set(net.upstream_ids([2, 5])) == {2, 4, 5}
+        np.testing.assert_array_equal(net.downstream_ids(5), [5, 3, 1])
+
+    def test_topological_order(self):
+        net = RiverNetwork(self.ids, self.down)
+        order = list(net.topological_order)
+        assert sorted(order) == self.ids
+        for i, d in zip(self.ids, self.down):
+            if d in self.ids and d != i:
+                assert order.index(i) < order.index(d)
+
+        with pytest.raises(ValueError):
+            RiverNetwork([1, 2], [2, 1]).topological_order
+
+    def test_repeated_ids(self):
+        # One row per HRU, with float IDs, as in the hydro routing product.
+        df = pd.DataFrame(
+            {"SubId": [1.0, 2.0, 2.0, 3.0], "DowSubId": [-1.0, 1.0, 1.0, 2.0]}
+        )
+        net = RiverNetwork.from_dataframe(df, "SubId", "DowSubId")
+        assert net is RiverNetwork.from_dataframe(df, "SubId", "DowSubId")
+        np.testing.assert_array_equal(net.ids, [1, 2, 3])
+        assert set(net.upstream_ids(1.0)) == {1, 2, 3}
+
+    def test_random(self):
+        rng = np.random.default_rng(0)
+        n = 500
+        ids = rng.permutation(n) + 100
+        down = np.array([ids[rng.integers(i)] if i else 0 for i in range(n)])
+        net = RiverNetwork(ids, down)
+
+        # Compare with a scan of the whole table for each upstream basin.
+        fid = ids[3]
+        up = [fid]
+        for b in up:
+            up.extend(ids[down == b])
+        assert set(net.upstream_ids(fid)) == set(up)
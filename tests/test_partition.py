@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from ravenpy.models import Routing
+from ravenpy.models.commands import (
+    ChannelProfileCommand,
+    GriddedForcingCommand,
+    GridWeightsCommand,
+    HRUsCommand,
+    SubBasinsCommand,
+)
+from ravenpy.models.partition import Partition, partition_network, run_partitioned
+
+# A watershed of seven sub-basins draining to sub-basin 7, and three isolated sub-basins.
+#
+#   1   2
+#    \ /
+#     3   4
+#      \ /
+#       5   6
+#        \ /
+#         7      10  11  12
+links = {1: 3, 2: 3, 3: 5, 4: 5, 5: 7, 6: 7, 7: -1, 10: -1, 11: -1, 12: -1}
+gauged = (3, 7, 10)
+
+
+def subbasins():
+    return tuple(
+        SubBasinsCommand.Record(
+            subbasin_id=i,
+            name=f"sub_{i}",
+            downstream_id=d,
+            profile=f"chn_{i}",
+            reach_length=1000,
+            gauged=i in gauged,
+        )
+        for (i, d) in links.items()
+    )
+
+
+class TestPartitionNetwork:
+    def test_components(self):
+        parts = partition_network(subbasins())
+        assert [p.subbasin_ids for p in parts] == [
+            (1, 2, 3, 4, 5, 6, 7),
+            (10,),
+            (11,),
+            (12,),
+        ]
+        assert all(p.tier == 0 and p.downstream_id == -1 for p in parts)
+
+    def test_tiers(self):
+        parts = partition_network(subbasins(), max_size=3)
+        assert parts == [
+            Partition((1, 2, 3), (3,), 5, 0),
+            Partition((10, 11, 12), (10, 11, 12), -1, 0),
+            Partition((4, 5), (5,), 7, 1),
+            Partition((6, 7), (7,), -1, 2),
+        ]
+
+        parts = partition_network(subbasins(), max_size=1)
+        assert len(parts) == len(links)
+        assert max(p.tier for p in parts) == 3
+        assert all(len(p.subbasin_ids) == 1 for p in parts)
+
+    def test_errors(self):
+        with pytest.raises(ValueError):
+            partition_network(subbasins(), max_size=0)
+
+        with pytest.raises(ValueError):
+            partition_network(subbasins() + subbasins()[:1])
+
+
+@pytest.fixture
+def routing(fake_binaries, tmp_path):
+    """Routing model of the network, with one HRU per sub-basin, and its forcing file."""
+    time = pd.date_range("2000-01-01", periods=30, freq="D")
+    forcing = xr.Dataset(
+        {
+            "Streaminputs": (
+                ("time", "lat_dim", "lon_dim"),
+                np.random.default_rng(0).random((30, 1, 1)),
+                {"units": "mm/d"},
+            )
+        },
+        coords={"time": time},
+    )
+    fn = tmp_path / "streaminputs.nc"
+    forcing.to_netcdf(fn)
+
+    model = Routing(workdir=tmp_path / "routing")
+    model.rvi.start_date = time[0].to_pydatetime()
+    model.rvi.end_date = time[-1].to_pydatetime()
+    model.rvh.subbasins = subbasins()
+    model.rvh.hrus = tuple(
+        HRUsCommand.Record(hru_id=i, area=10, subbasin_id=i) for i in links
+    )
+    model.rvh.land_subbasins = tuple(links)
+    model.rvp.avg_annual_runoff = 500
+    model.rvp.channel_profiles = tuple(
+        ChannelProfileCommand(name=f"chn_{i}", bed_slope=0.001) for i in links
+    )
+    model.rvt.gridded_forcings = (
+        GriddedForcingCommand(
+            name="StreamInputs",
+            forcing_type="PRECIP",
+            file_name_nc=fn.name,
+            var_name_nc="Streaminputs",
+            dim_names_nc=("lon_dim", "lat_dim", "time"),
+            grid_weights=GridWeightsCommand(
+                number_hrus=len(links),
+                number_grid_cells=1,
+                data=tuple((i, 0, 1.0) for i in links),
+            ),
+        ),
+    )
+    return model, fn
+
+
+class TestRunPartitioned:
+    def test_run(self, routing):
+        model, fn = routing
+        model.max_workers = 2
+
+        hyd = run_partitioned(model, fn, max_size=3)
+        assert hyd.q_sim.dims == ("time", "nbasins")
+        assert hyd.q_sim.shape == (30, 3)
+        assert hyd.subbasin_id.values.tolist() == list(gauged)
+        assert hyd.basin_name.values.tolist() == ["sub_3", "sub_7", "sub_10"]
+        assert model.outputs["hydrograph"].exists()
+        assert len(model.ind_outputs["hydrograph"]) == 4
+
+        # The second tier partition only holds its own sub-basins, and its outlet is gauged.
+        path = model.workdir / "partitions" / "002"
+        rvh = next(path.rglob("*.rvh")).read_text()
+        table = rvh.split(":SubBasins")[1].split(":EndSubBasins")[0]
+        rows = [r.split() for r in table.splitlines()]
+        rows = [r for r in rows if r and r[0].isdigit()]
+        assert [(r[0], r[2], r[-1]) for r in rows] == [
+            ("4", "5", "0"),
+            ("5", "-1", "1"),
+        ]
+
+        rvp = next(path.rglob("*.rvp")).read_text()
+        assert "chn_5" in rvp
+        assert "chn_3" not in rvp
+
+        rvt = next(path.rglob("*.rvt")).read_text()
+        assert ":NumberHRUs 2" in rvt
+        assert ":BasinInflowHydrograph2 5" in rvt
+
+        # The outflow of the upstream partition is passed as an inflow.
+        with xr.open_dataset(path / "inflow_5.nc") as ds:
+            np.testing.assert_allclose(
+                ds.inflow.isel(nstations=0), hyd.q_sim.isel(nbasins=0)
+            )
+
+    def test_ungauged(self, routing):
+        model, fn = routing
+        model.rvh.subbasins = tuple(
+            SubBasinsCommand.Record(
+                subbasin_id=sb.subbasin_id, downstream_id=sb.downstream_id
+            )
+            for sb in model.rvh.subbasins
+        )
+        with pytest.raises(ValueError):
+            run_partitioned(model, fn)
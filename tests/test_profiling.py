@@ -0,0 +1,103 @@
+import datetime as dt
+
+from ravenpy.models import GR4JCN
+from ravenpy.models.profiling import NULL_PHASE, PhaseTiming, Profiler
+
+params = (0.529, -3.396, 407.29, 1.072, 16.9, 0.947)
+hru = dict(area=4250.6, elevation=843.0, latitude=54.4848, longitude=-123.3659)
+
+
+class FakeSpan:
+    def __init__(self, name, spans):
+        self.name = name
+        self.attributes = {}
+        self.ended = False
+        spans.append(self)
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def end(self):
+        self.ended = True
+
+
+class FakeTracer:
+    def __init__(self):
+        self.spans = []
+
+    def start_span(self, name):
+        return FakeSpan(name, self.spans)
+
+
+class TestProfiler:
+    def test_phase(self):
+        records = []
+        p = Profiler(callback=records.append)
+        with p.phase("a", model="m", run=1, key="value"):
+            sum(range(1000))
+
+        (t,) = p.timings
+        assert records == [t]
+        assert t.phase == "a"
+        assert t.run == 1
+        assert t.attributes == {"key": "value"}
+        assert t.wall > 0
+
+    def test_open_close(self):
+        p = Profiler()
+        p.open("subprocess")
+        p.open("subprocess")  # Already pending, ignored
+        t = p.close("subprocess", written_bytes=10, nprocs=2)
+
+        assert t.written_bytes == 10
+        assert t.attributes["nprocs"] == 2
+        assert p.close("subprocess") is None
+        assert len(p.timings) == 1
+
+    def test_summary(self):
+        p = Profiler()
+        for i in range(3):
+            with p.phase("a", run=i):
+                pass
+
+        assert p.summary()["a"]["count"] == 3
+
+
+class TestRavenProfiling:
+    def test_disabled(self, fake_binaries):
+        model = GR4JCN()
+        assert model.timings == []
+        assert model._phase("_dump_rv") is NULL_PHASE
+
+    def test_timings(self, fake_binaries, synthetic_inputs):
+        tracer = FakeTracer()
+        model = GR4JCN()
+        model.enable_profiling(tracer=tracer)
+        model(
+            synthetic_inputs,
+            params=[params, params],
+            start_date=dt.datetime(2000, 7, 1),
+            duration=30,
+            **hru,
+        )
+
+        phases = [t.phase for t in model.timings]
+        for phase in ("_assign_files", "derived_parameters", "_dump_rv"):
+            assert phases.count(phase) == 2
+        assert phases.count("subprocess") == 1
+        assert phases.count("parse_results") == 1
+        assert "_merge_output" in phases
+
+        (sub,) = [t for t in model.timings if t.phase == "subprocess"]
+        assert isinstance(sub, PhaseTiming)
+        assert sub.attributes["nprocs"] == 2
+        assert sub.written_bytes > 0
+        assert {t.run for t in model.timings if t.phase == "_dump_rv"} == {0, 1}
+
+        assert len(tracer.spans) == len(model.timings)
+        assert all(s.ended for s in tracer.spans)
+        assert "ravenpy.wall" in tracer.spans[0].attributes
+
+        # Timings are reset at each call.
+        model(synthetic_inputs, params=params, duration=30, **hru)
+        assert [t.phase for t in model.timings].count("_dump_rv") == 1
@@ -0,0 +1,195 @@
+import datetime as dt
+
+import numpy as np
+
+from ravenpy.models import GR4JCN, GR4JCN_OST
+from ravenpy.models.calibration import ParallelDDS
+from ravenpy.models.progress import (
+    Checkpoint,
+    EarlyStopping,
+    Evaluation,
+    OstModelReader,
+)
+from ravenpy.models.rv import Ost
+
+hru = dict(area=4250.6, elevation=843.0, latitude=54.4848, longitude=-123.3659)
+params = (0.529, -3.396, 407.29, 1.072, 16.9, 0.947)
+bounds = dict(
+    lowerBounds=(0.01, -15.0, 10.0, 0.0, 1.0, 0.0),
+    upperBounds=(2.5, 10.0, 700.0, 7.0, 30.0, 1.0),
+)
+
+
+class TestOstModelReader:
+    def test_incremental(self, tmp_path):
+        fn = tmp_path / "OstModel0.txt"
+        reader = OstModelReader(fn)
+        assert reader.read() == []
+        assert reader.history.shape == (0, 2)
+
+        with open(fn, "w") as f:
+            f.write("Run   obj.function  par_x1  par_x2\n")
+            f.write("1     -1.0E-01  1.0  2.0\n")
+            f.write("2     -2.0E-01  3.0")
+            f.flush()
+
+            new = reader.read()
+            assert len(new) == 1
+            assert new[0].iteration == 1
+            assert new[0].objective == -0.1
+            assert reader.names == ["par_x1", "par_x2"]
+
+            # The incomplete line is parsed once it is complete.
+            f.write("  4.0\n")
+            f.flush()
+            new = reader.read()
+            np.testing.assert_array_equal(new[0].params, [3.0, 4.0])
+
+        h = reader.history
+        assert h.shape == (2, 4)
+        assert reader.history is h
+
+    def test_replaced(self, tmp_path):
+        fn = tmp_path / "OstModel0.txt"
+        fn.write_text("Run obj.function par_x1\n1 0.5 1.0\n2 0.4 2.0\n")
+        reader = OstModelReader(fn)
+        assert len(reader.history) == 2
+
+        fn.unlink()
+        fn.write_text("Run obj.function par_x1\n1 0.3 5.0\n")
+        np.testing.assert_array_equal(reader.history, [[1, 0.3, 5.0]])
+
+
+def test_early_stopping():
+    stop = EarlyStopping(patience=3, min_delta=0.01)
+    history = np.zeros((6, 3))
+    history[:, 0] = np.arange(1, 7)
+
+    history[:, 1] = [5, 4, 3, 2, 1, 0]
+    assert not stop(history)
+    assert not stop(history[:3])
+
+    history[:, 1] = [5, 1, 1.5, 0.995, 2, 3]
+    assert stop(history)
+
+
+class TestOstrichProgress:
+    kwds = dict(
+        params=params,
+        start_date=dt.datetime(2000, 7, 1),
+        duration=30,
+        random_seed=0,
+        **bounds,
+        **hru,
+    )
+
+    def test_callback(self, fake_binaries, synthetic_inputs):
+        evaluations = []
+        model = GR4JCN_OST()
+        model.enable_progress(callback=evaluations.append, interval=0.01)
+        model(synthetic_inputs, max_iterations=8, **self.kwds)
+
+        assert not model.stopped_early
+        assert [e.iteration for e in evaluations] == list(range(1, 10))
+        np.testing.assert_array_equal(
+            model.history[:, 1], [e.objective for e in evaluations]
+        )
+        assert model.obj_func == evaluations[-1].objective
+
+    def test_early_stop(self, fake_binaries, synthetic_inputs):
+        model = GR4JCN_OST()
+        model.enable_progress(stop=lambda h: len(h) >= 3, interval=0.01)
+        model(synthetic_inputs, max_iterations=200, **self.kwds)
+
+        assert model.stopped_early
+        history = model.history
+        assert len(history) < 200
+        assert model.obj_func == history[:, 1].min()
+        assert isinstance(model.calibrated_params, GR4JCN.params)
+        np.testing.assert_allclose(model.calibrated_params, model.optimized_parameters)
+
+    def test_history_cached(self, fake_binaries, synthetic_inputs):
+        model = GR4JCN_OST()
+        model(synthetic_inputs, max_iterations=4, **self.kwds)
+        assert model.history is model.history
+        assert model.history.shape == (5, 8)
+
+
+class TestCheckpoint:
+    def test_append(self, tmp_path):
+        cp = Checkpoint(tmp_path / "checkpoint.txt")
+        e = Evaluation(1, -0.123456789012345, np.array([1 / 3, 2.0]))
+        cp.append([e], ["par_x1", "par_x2"])
+        cp.append([e._replace(iteration=2)], ["par_x1", "par_x2"])
+        # Evaluation numbers wider than the column stay separated from the objective.
+        cp.append([e._replace(iteration=1234567)], ["par_x1", "par_x2"])
+
+        names, history = cp.load()
+        assert names == ["par_x1", "par_x2"]
+        assert len(cp) == 3
+        assert history[:, 0].tolist() == [1, 2, 1234567]
+        assert history[2, 1] == e.objective
+        # Values are stored with full precision.
+        assert history[0, 1] == e.objective
+        assert history[1, 2] == 1 / 3
+
+    def test_warm_start(self):
+        ost = Ost()
+        assert ost.warm_start == ""
+        ost.warm_start = True
+        assert ost.warm_start == "OstrichWarmStart yes"
+
+    def test_ostrich(self, fake_binaries, synthetic_inputs, tmp_path):
+        checkpoint = tmp_path / "checkpoint.txt"
+        kwds = TestOstrichProgress.kwds
+
+        # Interrupted calibration.
+        model = GR4JCN_OST()
+        model.checkpoint = checkpoint
+        model.enable_progress(stop=lambda h: len(h) >= 4, interval=0.01)
+        model(synthetic_inputs, max_iterations=10, **kwds)
+        assert model.stopped_early
+        saved = Checkpoint(checkpoint).load()[1]
+        assert len(saved) >= 4
+
+        # The calibration resumes from the saved evaluations.
+        model = GR4JCN_OST()
+        model.checkpoint = checkpoint
+        model(synthetic_inputs, max_iterations=10, overwrite=True, **kwds)
+        assert "OstrichWarmStart yes" in (model.exec_path / "ostIn.txt").read_text()
+
+        history = model.history
+        assert len(history) == 11
+        np.testing.assert_allclose(history[: len(saved)], saved, rtol=1e-6)
+        np.testing.assert_array_equal(Checkpoint(checkpoint).load()[1], history)
+
+    def test_parallel_dds(self, fake_binaries, synthetic_inputs, tmp_path):
+        checkpoint = tmp_path / "checkpoint.txt"
+        kwds = dict(TestOstrichProgress.kwds)
+        kwds.pop("params")
+
+        dds = ParallelDDS(
+            GR4JCN_OST(), workdir=tmp_path / "a", batch_size=2, checkpoint=checkpoint
+        )
+        dds(synthetic_inputs, max_iterations=4, **kwds)
+        first = dds.history
+
+        # Only the remaining budget is evaluated, plus the final run of the best parameter set.
+        dds = ParallelDDS(
+            GR4JCN_OST(), workdir=tmp_path / "b", batch_size=2, checkpoint=checkpoint
+        )
+        evaluated = []
+        evaluate = dds.evaluate
+
+        def counted(ts, candidates, **kw):
+            evaluated.extend(candidates)
+            return evaluate(ts, candidates, **kw)
+
+        dds.evaluate = counted
+        dds(synthetic_inputs, max_iterations=8, **kwds)
+
+        assert len(evaluated) == 5
+        assert len(dds.history) == 8
+        np.testing.assert_array_equal(dds.history[:4], first)
+        assert len(Checkpoint(checkpoint)) == 8
+        assert dds.obj_func <= first[:, 1].min()
@@ -2,6 +2,7 @@ import datetime as dt
 import zipfile
 
 from ravenpy.models import RavenMultiModel
+from ravenpy.models.base import ProcessLauncher
 from ravenpy.utilities.testdata import get_local_testdata
 
 
@@ -51,3 +52,51 @@ class TestRavenMultiModel:
         assert len(model.q_sim) == 2
         z = zipfile.ZipFile(model.outputs["rv_config"])
         assert len(z.filelist) == 10
+
+
+class TestMultiModelFake:
+    gr4jcn = (0.529, -3.396, 407.29, 1.072, 16.9, 0.947)
+    hmets = (9.5019, 0.2774, 6.3942, 0.6884, 1.2875, 5.4134, 2.3641, 0.0973, 0.0464)
+    hmets += (0.1998, 0.0222, -1.0919, 2.6851, 0.3740, 1.0000, 0.4739, 0.0114)
+    hmets += (0.0243, 0.0069, 310.7211, 916.1947)
+
+    def test_model_dimension(self, fake_binaries, synthetic_inputs):
+        model = RavenMultiModel(models=["gr4jcn", "hmets"])
+        model.max_workers = 2
+        model(
+            synthetic_inputs[:3],
+            start_date=dt.datetime(2000, 7, 1),
+            duration=30,
+            area=4250.6,
+            elevation=843.0,
+            latitude=54.4848,
+            longitude=-123.3659,
+            gr4jcn=[self.gr4jcn] * 3,
+            hmets=self.hmets,
+        )
+
+        # The sub-models share the worker limit of the multi-model.
+        assert all(m.launcher is model.launcher for m in model._models)
+
+        q = model.q_sim
+        assert q.dims == ("model", "params", "time", "nbasins")
+        assert list(q.model.values) == ["gr4jcn", "hmets"]
+        assert q.shape == (2, 3, 31, 1)
+
+        # HMETS has a single parameter set, the other ones are padded.
+        assert q.sel(model="hmets", params=0).notnull().all()
+        assert q.sel(model="hmets", params=[1, 2]).isnull().all()
+        assert q.sel(model="gr4jcn").notnull().all()
+
+
+class TestProcessLauncher:
+    def test_max_workers(self):
+        launcher = ProcessLauncher(max_workers=2)
+        procs = []
+        for i in range(5):
+            procs.append(launcher.popen(["sleep", "0.1"], cwd="."))
+            assert sum(p.poll() is None for p in procs) <= 2
+
+        for p in procs:
+            p.wait()
+        assert all(p.returncode == 0 for p in procs)
@@ -0,0 +1,139 @@
+import datetime as dt
+import os
+import shutil
+
+import pytest
+import xarray as xr
+
+from ravenpy.models import GR4JCN
+from ravenpy.models.result_cache import ResultCache, simulation_key
+
+hru = dict(area=4250.6, elevation=843.0, latitude=54.4848, longitude=-123.3659)
+params = (0.529, -3.396, 407.29, 1.072, 16.9, 0.947)
+dates = dict(start_date=dt.datetime(2000, 7, 1), end_date=dt.datetime(2001, 6, 30))
+
+
+def outputs(path, text="q"):
+    path.mkdir(parents=True, exist_ok=True)
+    (path / "run_Hydrographs.nc").write_text(text * 1000)
+    (path / "Raven_errors.txt").write_text("SIMULATION COMPLETE\n")
+    return path
+
+
+class TestResultCache:
+    def test_roundtrip(self, tmp_path):
+        cache = ResultCache(tmp_path / "cache")
+        assert not cache.get("a", tmp_path / "out")
+
+        cache.put("a", outputs(tmp_path / "run"))
+        assert "a" in cache
+        assert "b" not in cache
+
+        assert cache.get("a", tmp_path / "out")
+        assert sorted(f.name for f in (tmp_path / "out").iterdir()) == [
+            "Raven_errors.txt",
+            "run_Hydrographs.nc",
+        ]
+        assert (tmp_path / "out" / "run_Hydrographs.nc").read_text() == "q" * 1000
+
+    def test_key(self, tmp_path):
+        rvi = tmp_path / "model.rvi"
+        rvi.write_text(
+            ":StartDate 2000-01-01\n:NetCDFAttribute history Created on 2021-01-01\n"
+        )
+        ts = tmp_path / "ts.nc"
+        ts.write_bytes(b"forcing")
+        key = simulation_key([rvi], [ts])
+
+        # The history attribute is not part of the key.
+        rvi.write_text(
+            ":StartDate 2000-01-01\n:NetCDFAttribute history Created on 2021-01-02\n"
+        )
+        assert simulation_key([rvi], [ts]) == key
+
+        ts.write_bytes(b"other forcing")
+        os.utime(ts, ns=(0, 0))
+        assert simulation_key([rvi], [ts]) != key
+
+    def test_eviction(self, tmp_path):
+        cache = ResultCache(tmp_path / "cache")
+        for i, key in enumerate("abc"):
+            cache.put(key, outputs(tmp_path / key, key))
+            os.utime(cache.filename(key), (i, i))
+        size = cache.filename("a").stat().st_size
+
+        # Restoring the oldest results makes them the most recently used.
+        cache.get("a", tmp_path / "out")
+
+        cache.max_size = 2 * size + size // 2
+        cache.evict()
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+
+        cache.max_size = 0
+        cache.put("d", outputs(tmp_path / "d", "d"))
+        assert [f.name for f in cache.path.glob("*.zip")] == ["d.zip"]
+
+
+class TestRaven:
+    def run(self, workdir, ts, cache=None):
+        model = GR4JCN(workdir=workdir)
+        if cache is not None:
+            model.result_cache = cache
+        model(ts, params=params, **hru, **dates)
+        return model
+
+    def test_hit(self, fake_binaries, synthetic_inputs, tmp_path, monkeypatch):
+        cache = ResultCache(tmp_path / "cache")
+        a = self.run(tmp_path / "a", synthetic_inputs, cache)
+        assert len(list(cache.path.glob("*.zip"))) == 1
+
+        # Identical simulations are not run again.
+        model = GR4JCN(workdir=tmp_path / "b")
+        model.result_cache = cache
+
+        def popen(cmd, cwd):
+            raise AssertionError("Raven should not be launched.")
+
+        monkeypatch.setattr(model.launcher, "popen", popen)
+        model(synthetic_inputs, params=params, **hru, **dates)
+        xr.testing.assert_identical(model.hydrograph, a.hydrograph)
+        assert model.outputs["solution"].exists()
+        assert model.outputs["storage"].exists()
+
+        # Different parameters are different simulations.
+        self.run(tmp_path / "c", synthetic_inputs, cache)
+        assert len(list(cache.path.glob("*.zip"))) == 1
+        c = GR4JCN(workdir=tmp_path / "d")
+        c.result_cache = cache
+        c(synthetic_inputs, params=params[:-1] + (0.5,), **hru, **dates)
+        assert len(list(cache.path.glob("*.zip"))) == 2
+
+    def test_moved_inputs(self, fake_binaries, synthetic_inputs, tmp_path, monkeypatch):
+        cache = ResultCache(tmp_path / "cache")
+        a = self.run(tmp_path / "a", synthetic_inputs, cache)
+
+        # The same inputs copied to another directory give the same simulation.
+        (tmp_path / "copy").mkdir()
+        ts = [shutil.copy2(fn, tmp_path / "copy" / fn.name) for fn in synthetic_inputs]
+        model = GR4JCN(workdir=tmp_path / "b")
+        model.result_cache = cache
+
+        def popen(cmd, cwd):
+            raise AssertionError("Raven should not be launched.")
+
+        monkeypatch.setattr(model.launcher, "popen", popen)
+        model(ts, params=params, **hru, **dates)
+        xr.testing.assert_identical(model.hydrograph, a.hydrograph)
+        assert len(list(cache.path.glob("*.zip"))) == 1
+
+    def test_default(self, fake_binaries, synthetic_inputs, tmp_path, monkeypatch):
+        monkeypatch.setenv("RAVENPY_RESULT_CACHE", str(tmp_path / "cache"))
+        self.run(tmp_path / "a", synthetic_inputs)
+        assert len(list((tmp_path / "cache").glob("*.zip"))) == 1
+
+        # The cache can be disabled per model.
+        monkeypatch.setenv("RAVENPY_RESULT_CACHE", str(tmp_path / "other"))
+        self.run(tmp_path / "b", synthetic_inputs, cache=False)
+        assert not (tmp_path / "other").exists()
@@ -1,4 +1,5 @@
 import datetime as dt
+import io
 import re
 from collections import namedtuple
 from pathlib import Path
@@ -6,8 +7,16 @@ from pathlib import Path
 import pytest
 
 import ravenpy
-from ravenpy.models.commands import GriddedForcingCommand, BaseValueCommand, RainCorrection
+from ravenpy.models.commands import (
+    BaseValueCommand,
+    CommandList,
+    GriddedForcingCommand,
+    HRUsCommand,
+    RainCorrection,
+    SubBasinsCommand,
+)
 from ravenpy.models.rv import (  # RVT,
+    HRU,
     RV,
     RVC,
     RVH,
@@ -17,6 +26,7 @@ from ravenpy.models.rv import (  # RVT,
     Ost,
     RavenNcData,
     RVFile,
+    RVTemplate,
     isinstance_namedtuple,
 )
 from ravenpy.utilities.testdata import get_local_testdata
@@ -64,6 +74,66 @@ class TestRVFile:
             RVFile(fn)
 
 
+class TestRVTemplate:
+    def test_render(self):
+        content = "a={a} b={b.x:.2f} c={c[0]!r} d={{d}}"
+        P = namedtuple("P", "x")
+        kwds = dict(a=1, b=P(2), c=["z"])
+
+        t = RVTemplate(content)
+        assert t.fields == {"a", "b", "c"}
+        assert t.substitute(**kwds) == content.format(**kwds)
+
+    def test_cache(self):
+        t = RVTemplate("{a} {b} {c}")
+        b = [1]
+        assert t.substitute(a=1, b=b, c=0.0) == "1 [1] 0.0"
+
+        # Immutable values are cached, mutable values are formatted again.
+        assert {expr for (expr, _, _) in t._cache} == {"a", "c"}
+        b.append(2)
+        assert t.substitute(a=1, b=b, c=-0.0) == "1 [1, 2] -0.0"
+        assert t.substitute(a=1.0, b=b, c=0) == "1.0 [1, 2] 0"
+
+    def test_cache_specs(self):
+        # Each conversion and format spec of a field is cached separately.
+        content = "{x:.2f} {x:.4f} {x!r} {x} {x!r:>12} {x:.2f}"
+        t = RVTemplate(content)
+        assert t.substitute(x=1.23456789) == content.format(x=1.23456789)
+        assert t.substitute(x=1.23456789).startswith("1.23 1.2346 1.23456789 ")
+        assert t.substitute(x=2.5) == content.format(x=2.5)
+
+    def test_missing(self):
+        with pytest.raises(KeyError):
+            RVTemplate("{a} {b}").substitute(a=1)
+
+    def test_write(self, tmp_path):
+        fn = tmp_path / "test.rvi"
+        fn.write_text("{start_date} {params.x}")
+        P = namedtuple("P", "x")
+
+        out = tmp_path / "out"
+        out.mkdir()
+
+        rvf = RVFile(fn)
+        fn = rvf.write(out, start_date=dt.datetime(2000, 1, 1), params=P(1))
+        assert fn.read_text() == "2000-01-01 00:00:00 1"
+
+        # The content is parsed again when it changes.
+        rvf.content = "{params.x}"
+        assert rvf.write(out, params=P(2)).read_text() == "2"
+
+    def test_stream(self):
+        hrus = [HRU(hru_id=i, area=i / 3) for i in range(2500)]
+        t = RVTemplate("a\n{hrus_cmd}\n{reservoirs}\nb")
+        kwds = dict(hrus_cmd=HRUsCommand(hrus), reservoirs=CommandList([]))
+
+        # Tables are written in batches of rows.
+        pieces = list(t.render(kwds))
+        assert len(pieces) > 5
+        assert "".join(pieces) == "a\n{}\n\nb".format(HRUsCommand(hrus).to_rv())
+
+
 class TestRV:
     def test_end_date(self):
         rvi = RVI(
@@ -100,6 +170,28 @@ class TestRV:
         with pytest.raises(ValueError):
             rvi.evaluation_metrics = "JIM"
 
+    def test_keys(self):
+        rvi = RVI(run_name="test")
+        assert "run_name" in rvi.keys()
+        assert "start_date" in rvi.keys()
+        assert "_calendar" not in rvi.keys()
+        assert "_properties_registry" in RVI.__dict__
+        assert RVI._properties() is not RV._properties()
+
+        # Only the addition or removal of keys changes the version.
+        version = rvi.keys_version()
+        rvi.start_date = dt.datetime(2000, 1, 1)
+        rvi.run_name = "other"
+        assert rvi.keys_version() == version
+
+        rvi.new_key = 1
+        assert "new_key" in rvi.keys()
+        assert rvi.keys_version() == version + 1
+
+        del rvi.new_key
+        assert "new_key" not in rvi.keys()
+        assert rvi.keys_version() == version + 2
+
     def test_update(self):
         rv = RV(a=None, b=None)
         rv.update({"a": 1, "b": 2})
@@ -227,8 +319,8 @@ class TestRVH:
     @classmethod
     def setup_class(self):
         shp = get_local_testdata("raven-routing-sample/finalcat_hru_info.zip")
-        importer = self.importers.RoutingProductShapefileImporter(shp)
-        config = importer.extract()
+        self.importer = self.importers.RoutingProductShapefileImporter(shp)
+        config = self.importer.extract()
         config.pop("channel_profiles")
         self.rvh = RVH(**config)
 
@@ -262,6 +354,25 @@ class TestRVH:
 
         assert res.count(":Reservoir") == len(self.rvh.reservoirs)
 
+    def test_write(self):
+        f = io.StringIO()
+        self.rvh.write(f)
+        assert f.getvalue() == self.rvh.to_rv()
+
+    def test_extract_table(self):
+        # Only the needed attributes are read, without the geometries.
+        assert set(self.importer._df.columns) <= set(self.importer.COLUMNS)
+
+        tables = self.importer.extract_table()
+        assert len(tables["subbasins"]) == 46
+        assert len(tables["hrus"]) == 51
+        assert len(tables["reservoirs"]) == 5
+        assert len(tables["channel_profiles"]) == 46
+
+        sb = self.rvh.subbasins[0]
+        assert tables["subbasins"].iloc[0].to_dict() == sb.__dict__
+        assert list(tables["hrus"].hru_id) == [h.hru_id for h in self.rvh.hrus]
+
 
 class TestRVP:
     importers = pytest.importorskip("ravenpy.models.importers")
@@ -269,13 +380,34 @@ class TestRVP:
     @classmethod
     def setup_class(self):
         shp = get_local_testdata("raven-routing-sample/finalcat_hru_info.zip")
-        importer = self.importers.RoutingProductShapefileImporter(shp)
-        config = importer.extract()
+        self.importer = self.importers.RoutingProductShapefileImporter(shp)
+        config = self.importer.extract()
         self.rvp = RVP(channel_profiles=config["channel_profiles"])
 
     def test_import_process(self):
         assert len(self.rvp.channel_profiles) == 46
 
+    def test_deduplicate(self):
+        exact = self.importer.extract(deduplicate_profiles=True)
+        coarse = self.importer.extract(profile_digits=1)
+        assert len(coarse["channel_profiles"]) <= len(exact["channel_profiles"]) <= 46
+
+        for config in (exact, coarse):
+            names = [p.name for p in config["channel_profiles"]]
+            assert len(set(names)) == len(names)
+            assert {sb.profile for sb in config["subbasins"]} == set(names)
+
+        # Sub-basins are given a profile of identical geometry.
+        def geometry(p):
+            return p.bed_slope, p.survey_points, p.roughness_zones
+
+        original = {p.name: p for p in self.rvp.channel_profiles}
+        profiles = {p.name: p for p in exact["channel_profiles"]}
+        sbs = self.importer.extract()["subbasins"]
+        assert len(sbs) == len(exact["subbasins"])
+        for sb, dedup in zip(sbs, exact["subbasins"]):
+            assert geometry(profiles[dedup.profile]) == geometry(original[sb.profile])
+
     def test_format(self):
         res = self.rvp.channel_profile_cmd_list
 
@@ -283,6 +415,49 @@ class TestRVP:
         assert res.count(":EndChannelProfile") == 46
 
 
+class TestDeduplicateProfiles:
+    importers = pytest.importorskip("ravenpy.models.importers")
+    pd = pytest.importorskip("pandas")
+
+    def table(self):
+        base = dict(
+            bed_slope=0.0012,
+            channel_width=4.5,
+            channel_elev=210.0,
+            sidwd=1.25,
+            botwd=2.0,
+            zfld=214.0,
+            zbot=209.5,
+            floodn=0.1,
+            mann=0.035,
+        )
+        rows = [
+            base,
+            base,  # Exact duplicate.
+            dict(base, bed_slope=0.0012 * (1 + 1e-9)),  # Near duplicate.
+            dict(base, channel_width=9.0),
+            dict(base, channel_width=9.0),
+        ]
+        table = self.pd.DataFrame(rows)
+        table.insert(0, "name", [f"chn_{i}" for i in range(1, 6)])
+        return table
+
+    def deduplicate(self, table, digits=None):
+        importer = self.importers.RoutingProductShapefileImporter
+        return importer._deduplicate_profiles(table, digits)
+
+    def test_exact(self):
+        unique, profiles = self.deduplicate(self.table())
+        assert unique["name"].tolist() == ["chn_1", "chn_3", "chn_4"]
+        assert profiles.tolist() == ["chn_1", "chn_1", "chn_3", "chn_4", "chn_4"]
+        assert unique["channel_width"].tolist() == [4.5, 4.5, 9.0]
+
+    def test_digits(self):
+        unique, profiles = self.deduplicate(self.table(), digits=3)
+        assert unique["name"].tolist() == ["chn_1", "chn_4"]
+        assert profiles.tolist() == ["chn_1", "chn_1", "chn_1", "chn_4", "chn_4"]
+
+
 class TestRVT:
     importers = pytest.importorskip("ravenpy.models.importers")
 
@@ -316,3 +491,31 @@ class TestBaseValueCommand:
     def test_raincorrection(self):
         rc = RainCorrection(3)
         assert f"{rc}" == ":RainCorrection 3"
+
+
+class TestStreamingCommands:
+    def test_subbasins(self):
+        recs = [
+            SubBasinsCommand.Record(
+                subbasin_id=i,
+                downstream_id=i - 1,
+                reach_length=i * 0.1,
+                gauged=i % 2,
+            )
+            for i in range(3000)
+        ]
+        cmd = SubBasinsCommand(recs)
+        f = io.StringIO()
+        cmd.write(f)
+        text = f.getvalue()
+        assert text == cmd.to_rv()
+
+        lines = text.strip().splitlines()
+        assert len(lines) == 3000 + 4
+        assert lines[3].split() == ["0", "sub_XXX", "-1", "chn_XXX", "ZERO-", "0"]
+        assert lines[4].split()[-2:] == ["0.1", "1"]
+
+    def test_command_list(self):
+        cmds = CommandList([RainCorrection(1), "x", RainCorrection(2)])
+        assert str(cmds) == ":RainCorrection 1\n\nx\n\n:RainCorrection 2"
+        assert str(CommandList([])) == ""
@@ -0,0 +1,124 @@
+import datetime as dt
+import os
+
+import numpy as np
+import pytest
+
+from ravenpy.models import GR4JCN
+from ravenpy.models.rv import RVC, parse_solution
+from ravenpy.models.solution import Solution, clear_cache, read_solution
+
+params = (0.529, -3.396, 407.29, 1.072, 16.9, 0.947)
+hru = dict(area=4250.6, elevation=843.0, latitude=54.4848, longitude=-123.3659)
+
+rvc = """
+:TimeStamp 2002-01-01 00:00:00.00
+:HRUStateVariableTable
+  :Attributes,SURFACE_WATER,ATMOSPHERE,ATMOS_PRECIP,PONDED_WATER,SOIL[0],SOIL[1]
+  :Units,mm,mm,mm,mm,mm,mm
+  1,0.00000,821.98274,-997.11237,0.00000,313.14023,0.80301
+  2,0.00000,22.57000,-4.50000,0.00000,101.50000,3.25000
+:EndHRUStateVariableTable
+:BasinStateVariables
+  :BasinIndex 1,watershed
+    :ChannelStorage, 0.00000
+    :RivuletStorage, 0.00000
+    :Qout,1,13.21660,13.29232
+    :Qlat,3,13.21660,13.24312,13.15373,13.21660
+    :Qin ,20,0.00000,0.00000,0.00000,0.00000,0.00000,0.00000,0.00000,0.00000,0.00000,0.00000,0.00000,0.00000,0.00000,0.00000,0.00000,0.00000,0.00000,0.00000,0.00000,0.00000
+  :BasinIndex 2,downstream
+    :ChannelStorage, 12.50000
+    :RivuletStorage, 1.00000
+    :Qout,2,3.00000,4.00000,5.00000
+    :Qlat,3,1.00000,2.00000,3.00000,4.00000
+    :Qin ,20,1.00000,0.00000,0.00000,0.00000,0.00000,0.00000,0.00000,0.00000,0.00000,0.00000,0.00000,0.00000,0.00000,0.00000,0.00000,0.00000,0.00000,0.00000,0.00000,0.00000
+:EndBasinStateVariables
+"""
+
+
+class TestSolution:
+    def test_hru_table(self):
+        s = Solution(rvc)
+        assert s.timestamp == "2002-01-01 00:00:00.00"
+        assert s.hru_attributes[-1] == "SOIL[1]"
+        assert s.hru_units == ["mm"] * 6
+        np.testing.assert_array_equal(s.hru_index, [1, 2])
+        assert s.hru_table.shape == (2, 6)
+        assert s.hru_table[0, 1] == 821.98274
+
+        state = s.hru_state(2)
+        assert state.index == 2
+        assert state.soil0 == 101.5
+
+    def test_basin_states(self):
+        s = Solution(rvc)
+        b = s.basin_states
+        np.testing.assert_array_equal(b["index"], [1, 2])
+        np.testing.assert_array_equal(b["nqout"], [1, 2])
+        assert b["qout"].shape == (2, 2)
+        assert np.isnan(b["qout"][0, 1])
+        np.testing.assert_array_equal(b["qoutlast"], [13.29232, 5.0])
+        assert b["qin"].shape == (2, 20)
+
+        # Both basins are parsed.
+        hru_states, basin_states = s.get_states()
+        assert set(hru_states) == {1, 2}
+        assert basin_states[1].qout == [13.2166]
+        assert basin_states[2].name == "downstream"
+        assert basin_states[2].channelstorage == 12.5
+        assert basin_states[2].qout == [3.0, 4.0]
+        assert basin_states[2].qlat == [1.0, 2.0, 3.0]
+        assert basin_states[2].qlatlast == 4.0
+
+    def test_read_only(self):
+        s = Solution(rvc)
+        with pytest.raises(ValueError):
+            s.hru_table[0, 0] = 1
+
+    def test_parse_solution(self):
+        out = parse_solution(rvc)
+        assert out["HRUStateVariableTable"]["data"][1][:3] == [1, 0.0, 821.98274]
+        assert out["BasinStateVariables"]["BasinIndex"][2]["QoutLast"] == 5.0
+
+    def test_rvc(self):
+        r = RVC()
+        r.parse(rvc)
+        assert r.hru_state.atmosphere == 821.98274
+        assert r.basin_state.qoutlast == 13.29232
+        assert ":BasinIndex 2,downstream" in r.basin_states_cmd.to_rv()
+
+    def test_read_solution(self, tmp_path):
+        clear_cache()
+        fn = tmp_path / "solution.rvc"
+        fn.write_text(rvc)
+
+        s = read_solution(fn)
+        assert read_solution(str(fn)) is s
+
+        # The file is parsed again when it is modified.
+        fn.write_text(rvc.replace("821.98274", "1.00000"))
+        st = fn.stat()
+        os.utime(fn, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+        s2 = read_solution(fn)
+        assert s2 is not s
+        assert s2.hru_state(1).atmosphere == 1.0
+
+
+class TestFinalState:
+    def test_get_final_state(self, fake_binaries, synthetic_inputs):
+        model = GR4JCN()
+        model(
+            synthetic_inputs,
+            params=[params, params],
+            start_date=dt.datetime(2000, 7, 1),
+            duration=30,
+            **hru,
+        )
+
+        hru_states, basin_states = model.get_final_state()
+        assert len(hru_states) == 2
+        assert basin_states[0].qout[0] == pytest.approx(float(model.q_sim[0, -1, 0]))
+
+        solutions = model.solution
+        assert len(solutions) == 2
+        assert 1 in solutions[0]["HRUStateVariableTable"]["data"]
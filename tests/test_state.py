@@ -0,0 +1,146 @@
+import datetime as dt
+
+import numpy as np
+import pytest
+
+from ravenpy.models import GR4JCN
+from ravenpy.models.commands import BasinIndexCommand
+from ravenpy.models.rv import RVC, HRUState
+from ravenpy.models.solution import Solution
+from ravenpy.models.state import (
+    BasinStateArray,
+    HRUStateArray,
+    raven_name,
+    state_name,
+)
+
+from .test_solution import rvc
+
+params = (0.529, -3.396, 407.29, 1.072, 16.9, 0.947)
+hru = dict(area=4250.6, elevation=843.0, latitude=54.4848, longitude=-123.3659)
+
+
+def test_names():
+    assert raven_name("soil0") == "SOIL[0]"
+    assert raven_name("conv_stor12") == "CONV_STOR[12]"
+    assert raven_name("snow_temp") == "SNOW_TEMP"
+    assert state_name("CONVOLUTION[1]") == "convolution1"
+
+
+class TestHRUStateArray:
+    def test_from_solutions(self):
+        s = Solution(rvc)
+        h = HRUStateArray.from_solutions([s, s, s])
+        assert h.data.shape == (3, 2, 6)
+        assert h.names[-1] == "soil1"
+        np.testing.assert_array_equal(h.sel("soil0", hru=2), [101.5] * 3)
+        assert h.sel(["soil0", "soil1"]).shape == (3, 2, 2)
+
+        # Round-trip through RVC text.
+        s2 = Solution(h.member(1).to_rv())
+        np.testing.assert_array_equal(s2.hru_table, s.hru_table)
+        assert s2.hru_attributes == s.hru_attributes
+
+    def test_records(self):
+        records = [HRUState(index=1, soil0=i, soil1=2 * i) for i in range(4)]
+        h = HRUStateArray.from_records(records)
+        assert len(h) == 4
+        assert h.record(1, member=3) == records[3]
+        assert h.to_dict(member=2) == {1: records[2]}
+
+        # The default table includes all state variables.
+        assert h.to_rv().splitlines()[3].startswith("  1,0.0,0.0,")
+
+    def test_replace(self):
+        h = HRUStateArray.from_solutions([Solution(rvc)] * 2)
+        h2 = h.replace(soil0=[1, 2], soil1=[[3, 4], [5, 6]])
+        np.testing.assert_array_equal(h2.sel("soil0"), [[1, 1], [2, 2]])
+        np.testing.assert_array_equal(h2.sel("soil1"), [[3, 4], [5, 6]])
+        assert h.sel("soil0", hru=1)[0] == 313.14023
+
+        with pytest.raises(KeyError):
+            h.replace(glacier=[1, 2])
+
+
+class TestBasinStateArray:
+    def test_from_solutions(self):
+        s = Solution(rvc)
+        b = BasinStateArray.from_solutions([s, s])
+        assert len(b) == 2
+        np.testing.assert_array_equal(b.index, [1, 2])
+        np.testing.assert_array_equal(b.sel("qoutlast", basin=2), [5.0, 5.0])
+        assert b.record(2, member=1) == s.basin_state(2)
+
+        s2 = Solution(b.to_rv())
+        assert s2.get_states()[1] == s.get_states()[1]
+
+    def test_records(self):
+        records = [
+            BasinIndexCommand(
+                index=1, name="basin", qout=[i], qoutlast=i, qlat=[0.0] * 3, qin=[]
+            )
+            for i in range(3)
+        ]
+        b = BasinStateArray.from_records(records)
+        assert b.data.shape == (3, 1)
+        assert b.record(1, member=2) == records[2]
+        assert b.data["qin"].shape == (3, 1, 0)
+        assert ":Qout,1,2.0,2.0" in b.member(2).to_rv()
+
+
+class TestRVC:
+    def test_arrays(self):
+        s = Solution(rvc)
+        r = RVC()
+        r.hru_state = HRUStateArray.from_solutions([s])
+        r.basin_state = BasinStateArray.from_solutions([s])
+        assert r.hru_state.atmosphere == 821.98274
+        assert r.basin_state.qoutlast == 13.29232
+        assert "2,0.0,22.57" in str(r.hru_states_cmd)
+
+        # Setting a record converts the array back to records.
+        r.hru_state = HRUState(index=1, soil0=10)
+        assert r.hru_states[2].soil0 == 101.5
+        assert r.hru_state.soil0 == 10
+
+    def test_multiple_members(self):
+        s = Solution(rvc)
+        with pytest.raises(ValueError):
+            RVC().hru_state = HRUStateArray.from_solutions([s, s])
+
+
+class TestParallelStates:
+    def test_run(self, fake_binaries, synthetic_inputs):
+        model = GR4JCN()
+        kwds = dict(params=params, duration=30, **hru)
+        model(synthetic_inputs, start_date=dt.datetime(2000, 7, 1), **kwds)
+
+        hru_states, basin_states = model.get_final_state_arrays()
+        assert len(hru_states) == 1
+
+        soil = hru_states.sel("soil0", hru=1)
+        ens = HRUStateArray(
+            np.repeat(hru_states.data, 3, axis=0), hru_states.index, hru_states.names
+        )
+        ens = ens.replace(soil0=soil * [0.5, 1, 2])
+        model(
+            synthetic_inputs,
+            start_date=dt.datetime(2000, 7, 31),
+            hru_state=ens,
+            basin_state=basin_states,
+            **kwds,
+        )
+
+        assert model.q_sim.dims == ("state", "time", "nbasins")
+        for i, factor in enumerate([0.5, 1, 2]):
+            rvc_fn = (
+                model.exec_path
+                / model.model_dir
+                / f"p{i:02}"
+                / "raven-gr4j-cemaneige.rvc"
+            )
+            initial = Solution(rvc_fn.read_text())
+            assert initial.hru_state(1).soil0 == pytest.approx(soil[0] * factor)
+
+        f_hru, f_basin = model.get_final_state_arrays()
+        assert len(f_hru) == len(f_basin) == 3